@@ -0,0 +1,78 @@
+"""Versanddurchsatz des Broadcasters gegen einen Stub-Bot.
+
+Misst Nachrichten/s und die p99-Latenz vom Einreihen eines Alerts bis zur
+Zustellung an den letzten Empfänger.
+
+    python -m benchmarks.broadcast --subscribers 2000 --alerts 5 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from aiogram.utils.exceptions import BotBlocked, RetryAfter
+
+from broadcast import Broadcaster
+
+
+class StubBot:
+    def __init__(self, latency: float, retry_rate: float, blocked_rate: float):
+        self.latency = latency
+        self.retry_rate = retry_rate
+        self.blocked_rate = blocked_rate
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        await asyncio.sleep(self.latency)
+        roll = random.random()
+        if roll < self.retry_rate:
+            raise RetryAfter(1)
+        if roll < self.retry_rate + self.blocked_rate:
+            raise BotBlocked("Forbidden: bot was blocked by the user")
+        self.sent += 1
+        return SimpleNamespace(message_id=self.sent, chat_id=chat_id)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def main(args):
+    bot = StubBot(args.latency, args.retry_rate, args.blocked_rate)
+    removed = []
+    broadcaster = Broadcaster(
+        bot,
+        concurrency=args.concurrency,
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate,
+        on_unreachable=removed.append,
+    )
+    subscribers = range(args.subscribers)
+
+    start = time.perf_counter()
+    alerts = [broadcaster.enqueue(f"alert {i}", subscribers) for i in range(args.alerts)]
+    await broadcaster.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [a.latency for a in alerts]
+    print(f"messages sent     {bot.sent}")
+    print(f"chats removed     {len(removed)}")
+    print(f"elapsed           {elapsed:.2f} s")
+    print(f"throughput        {bot.sent / elapsed:.1f} msg/s")
+    print(f"p99 alert latency {percentile(latencies, 99):.2f} s")
+    await broadcaster.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--alerts", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated Telegram API latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1)
+    parser.add_argument("--retry-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
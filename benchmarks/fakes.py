@@ -0,0 +1,200 @@
+"""Lokale Fake-Server für Helius und die Telegram Bot API.
+
+Beide laufen in einem eigenen Thread mit eigener Event-Loop, damit Last auf der
+Seite des Bots die Antwortzeiten der Fakes nicht verfälscht. Latenz, Latenzspitzen,
+Fehlerrate (HTTP 500), Drosselung (HTTP 429, zufällig oder oberhalb einer Kapazität in
+Anfragen pro Sekunde) sind pro Server einstellbar und dürfen während eines Laufs geändert werden.
+"""
+import asyncio
+import random
+import threading
+import time
+import zlib
+from collections import deque
+
+from aiohttp import web
+
+import mint_cache
+
+
+class Faults:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = None,
+                 spike_rate: float = 0.0, spike_latency: float = 0.0, capacity: float = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.spike_rate = spike_rate  # Anteil der Antworten mit zusätzlicher Latenz
+        self.spike_latency = spike_latency
+        self.capacity = capacity  # Anfragen pro Sekunde, darüber 429 wie ein Credit-Limit
+        self._window = deque()
+        self.random = random.Random(seed)
+        self.calls = {}
+        self.injected = {"error": 0, "throttle": 0, "spike": 0}
+
+    async def apply(self, endpoint: str):
+        # None = normal antworten, sonst die injizierte Fehlerantwort
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.capacity is not None:
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.capacity:
+                self.injected["throttle"] += 1
+                return "throttle"
+            self._window.append(now)
+        latency = self.latency
+        if self.spike_rate and self.random.random() < self.spike_rate:
+            self.injected["spike"] += 1
+            latency += self.spike_latency
+        if latency:
+            await asyncio.sleep(latency)
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            self.injected["throttle"] += 1
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            self.injected["error"] += 1
+            return "error"
+        return None
+
+
+def mint_age_minutes(mint: str, max_age: int = 120) -> int:
+    # deterministisches Alter pro Mint, damit Läufe vergleichbar bleiben
+    return zlib.crc32(mint.encode()) % max_age
+
+
+def is_pump_mint(mint: str, pump_ratio: float = 0.8) -> bool:
+    return (zlib.crc32(mint.encode()) >> 8) % 100 < pump_ratio * 100
+
+
+def helius_app(faults: Faults, pump_ratio: float = 0.8, transactions=None) -> web.Application:
+    # transactions: signature -> Enhanced Transaction für /v0/transactions/
+    transactions = transactions or {}
+
+    def failure(kind):
+        if kind == "throttle":
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+        return web.json_response({"error": "internal error"}, status=500)
+
+    async def mint_history(request):
+        kind = await faults.apply("address_transactions")
+        if kind:
+            return failure(kind)
+        mint = request.match_info["address"]
+        created = int(time.time()) - mint_age_minutes(mint) * 60
+        return web.json_response([{"signature": f"create-{mint}", "timestamp": created}])
+
+    async def metadata(request):
+        kind = await faults.apply("token_metadata")
+        if kind:
+            return failure(kind)
+        body = await request.json()
+        return web.json_response([
+            {
+                "account": mint,
+                "updateAuthority": mint_cache.PUMP_AUTH if is_pump_mint(mint, pump_ratio) else "other",
+                "symbol": mint[:6].upper(),
+            }
+            for mint in body["mintAccounts"]
+        ])
+
+    async def enhanced_transactions(request):
+        kind = await faults.apply("transactions")
+        if kind:
+            return failure(kind)
+        body = await request.json()
+        return web.json_response([transactions[sig] for sig in body["transactions"] if sig in transactions])
+
+    app = web.Application()
+    app.router.add_get("/v0/addresses/{address}/transactions", mint_history)
+    app.router.add_post("/v0/tokens/metadata", metadata)
+    app.router.add_post("/v0/transactions/", enhanced_transactions)
+    return app
+
+
+def telegram_app(faults: Faults, blocked_rate: float = 0.0) -> web.Application:
+    sent = []  # (chat_id, time, text)
+    edited = []
+
+    async def send_message(request):
+        kind = await faults.apply("sendMessage")
+        if kind == "throttle":
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+        if kind == "error":
+            return web.json_response({"ok": False, "error_code": 500, "description": "Internal Server Error"}, status=500)
+        data = await request.json() if request.content_type == "application/json" else await request.post()
+        chat_id = int(data.get("chat_id", 0))
+        if faults.random.random() < blocked_rate:
+            return web.json_response({
+                "ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user",
+            }, status=403)
+        sent.append((chat_id, time.time(), data.get("text", "")))
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": len(sent),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
+
+    async def edit_message_text(request):
+        kind = await faults.apply("editMessageText")
+        if kind == "throttle":
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+        data = await request.json() if request.content_type == "application/json" else await request.post()
+        chat_id = int(data.get("chat_id", 0))
+        edited.append((chat_id, time.time(), data.get("text", "")))
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": int(data.get("message_id", 0)),
+                "date": int(time.time()),
+                "edit_date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
+
+    async def get_me(request):
+        return web.json_response({
+            "ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"},
+        })
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/getMe", get_me)
+    app.router.add_post("/bot{token}/getme", get_me)
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    app.router.add_post("/bot{token}/sendmessage", send_message)
+    app.router.add_post("/bot{token}/editMessageText", edit_message_text)
+    app.router.add_post("/bot{token}/editmessagetext", edit_message_text)
+    app["sent"] = sent
+    app["edited"] = edited
+    return app
+
+
+def serve_in_thread(app: web.Application) -> str:
+    started = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        loop.run_until_complete(site.start())
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{state['port']}"
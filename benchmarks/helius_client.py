@@ -0,0 +1,78 @@
+"""Handler-Durchsatz mit N gleichzeitigen, langsamen Helius-Aufrufen.
+
+Vergleicht den alten blockierenden Aufruf (synchroner HTTP-Request im async Handler)
+mit dem gemeinsamen aiohttp-Client aus helius.py gegen einen lokalen Fake-Helius.
+
+    python -m benchmarks.helius_client --concurrency 50 --delay 0.2
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+
+from aiohttp import web
+
+from helius import HeliusClient
+
+
+def start_fake_helius(delay: float):
+    # Fake-Server in eigenem Thread/Loop, damit blockierende Aufrufe ihn nicht mit anhalten
+    started = threading.Event()
+    state = {}
+
+    async def transactions(request):
+        await asyncio.sleep(delay)
+        return web.json_response([{"signature": "sig", "timestamp": "2024-01-01T00:00:00Z"}])
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/v0/addresses/{address}/transactions", transactions)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        state["port"] = site._server.sockets[0].getsockname()[1]
+        state["loop"] = loop
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{state['port']}", state["loop"]
+
+
+async def blocking_handler(base_url: str):
+    with urllib.request.urlopen(f"{base_url}/v0/addresses/mint/transactions") as resp:
+        return json.loads(resp.read())
+
+
+async def async_handler(client: HeliusClient):
+    return await client.address_transactions("mint")
+
+
+async def measure(name: str, make_call, concurrency: int):
+    start = time.perf_counter()
+    await asyncio.gather(*(make_call() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {concurrency:>5} handlers  {elapsed:7.3f} s  {concurrency / elapsed:9.1f} handlers/s")
+
+
+async def main(concurrency: int, delay: float):
+    base_url, _ = start_fake_helius(delay)
+    client = HeliusClient(api_key="bench", base_url=base_url, pool_size=concurrency)
+    await client.address_transactions("warmup")
+    await measure("blocking", lambda: blocking_handler(base_url), concurrency)
+    await measure("aiohttp", lambda: async_handler(client), concurrency)
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="upstream latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.delay))
@@ -0,0 +1,167 @@
+"""Helius-Aufrufe unter einem Ausfall: Circuit Breaker, adaptive Nebenläufigkeit und Retry-Budget.
+
+Offene Last (feste Anfragerate, unabhängig von Antwortzeiten) gegen einen Fake-Helius
+in drei Phasen: normal -> Störung (Kapazität unter der Anfragerate, darüber 429 mit
+Retry-After; dazu 500 und Latenzspitzen) -> Erholung.
+Verglichen werden drei Varianten desselben HeliusClient:
+
+  off    ein Versuch pro Aufruf, keine Schutzmechanismen (HELIUS_RESILIENCE=0)
+  naive  bis zu drei Wiederholungen mit fester Pause, ohne Breaker und Budget
+  on     Retries mit Jitter im Budget, Breaker und AIMD-Limit pro Endpoint
+
+Ausgabe pro Phase: Erfolgsquote, Upstream-Aufrufe pro Anfrage (Retries zählen zur Phase,
+in der sie laufen), p50/p99 der Aufrufdauer; dazu Upstream-Aufrufe pro Anfrage über den
+ganzen Lauf und die Zeit ab Ende der Störung, bis die Erfolgsquote wieder dauerhaft >= 95 % liegt.
+
+    python -m benchmarks.helius_resilience --rate 100 --normal 3 --incident 6 --recovery 6
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+from benchmarks.fakes import Faults, helius_app, serve_in_thread
+from helius import HeliusClient, REQUEST_ERRORS
+
+BUCKET = 0.5  # Sekunden je Messfenster für die Erholungszeit
+NAIVE_RETRIES = 3
+NAIVE_DELAY = 0.2
+
+
+def set_incident(faults: Faults, args, active: bool):
+    faults.throttle_rate = args.throttle_rate if active else 0.0
+    faults.error_rate = args.error_rate if active else 0.0
+    faults.spike_rate = args.spike_rate if active else 0.0
+    faults.capacity = args.capacity if active else None
+
+
+async def naive_call(client: HeliusClient, mint: str):
+    for attempt in range(NAIVE_RETRIES + 1):
+        try:
+            return await client.address_transactions(mint)
+        except REQUEST_ERRORS:
+            if attempt == NAIVE_RETRIES:
+                raise
+            await asyncio.sleep(NAIVE_DELAY)
+
+
+async def run_mode(mode: str, base_url: str, faults: Faults, args) -> dict:
+    client = HeliusClient(api_key="bench", base_url=base_url, timeout=args.timeout, resilient=mode == "on")
+    call = (lambda mint: naive_call(client, mint)) if mode == "naive" else client.address_transactions
+    await client.address_transactions("warmup")
+
+    phases = [("normal", args.normal), ("incident", args.incident), ("recovery", args.recovery)]
+    results = []  # (phase, gestartet relativ zum Start, dauer, ok)
+    upstream = {}
+    errors = Counter()
+
+    async def one(phase: str, i: int, issued: float):
+        try:
+            await call(f"{mode}-mint-{i}")
+            ok = True
+        except REQUEST_ERRORS as e:
+            errors[type(e).__name__ if not hasattr(e, "status") else f"{type(e).__name__} {e.status}"] += 1
+            ok = False
+        results.append((phase, issued, time.perf_counter() - start - issued, ok))
+
+    tasks, i = [], 0
+    start = time.perf_counter()
+    phase_start = 0.0
+    for phase, duration in phases:
+        set_incident(faults, args, phase == "incident")
+        calls_before = sum(faults.calls.values())
+        phase_end = phase_start + duration
+        while True:
+            # feste Rate: Anfrage i startet bei i / rate, egal wie lange die vorigen brauchen
+            issued = i / args.rate
+            if issued >= phase_end:
+                break
+            delay = start + issued - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(phase, i, issued)))
+            i += 1
+        upstream[phase] = (calls_before, phase_start)
+        phase_start = phase_end
+    await asyncio.gather(*tasks)
+    total_calls = sum(faults.calls.values())
+    await client.close()
+
+    report = {
+        "mode": mode, "phases": {}, "guards": client.stats(), "errors": errors,
+        "upstream_per_request": (total_calls - upstream["normal"][0]) / len(results),
+    }
+    # Upstream-Aufrufe einer Phase = Zähler bis zum Beginn der nächsten (Retries laufen leicht nach)
+    boundaries = [upstream[p][0] for p, _ in phases] + [total_calls]
+    for n, (phase, _) in enumerate(phases):
+        rows = [r for r in results if r[0] == phase]
+        latencies = sorted(r[2] for r in rows)
+        report["phases"][phase] = {
+            "requests": len(rows),
+            "success": sum(r[3] for r in rows) / len(rows) if rows else 0.0,
+            "upstream_per_request": (boundaries[n + 1] - boundaries[n]) / len(rows) if rows else 0.0,
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p99": latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0,
+        }
+
+    # Erholung: ab Ende der Störung das erste Fenster, ab dem alle Fenster >= 95 % Erfolg haben
+    recovery_start = args.normal + args.incident
+    buckets = {}
+    for phase, issued, _, ok in results:
+        if phase == "recovery":
+            b = int((issued - recovery_start) / BUCKET)
+            total, good = buckets.get(b, (0, 0))
+            buckets[b] = (total + 1, good + ok)
+    recovered = None
+    for b in sorted(buckets, reverse=True):
+        total, good = buckets[b]
+        if good / total < 0.95:
+            break
+        recovered = b * BUCKET
+    report["recovery"] = recovered
+    return report
+
+
+async def main(args):
+    faults = Faults(latency=args.latency, spike_latency=args.spike_latency, seed=1)
+    base_url = serve_in_thread(helius_app(faults))
+
+    reports = []
+    for mode in args.modes.split(","):
+        reports.append(await run_mode(mode, base_url, faults, args))
+
+    print(f"rate {args.rate:.0f}/s, incident: capacity {args.capacity:.0f}/s, {args.throttle_rate:.0%} 429, "
+          f"{args.error_rate:.0%} 500, {args.spike_rate:.0%} +{args.spike_latency:.1f}s")
+    print(f"\n{'mode':<6} {'phase':<9} {'requests':>8} {'success':>8} {'upstream/req':>13} {'p50 ms':>8} {'p99 ms':>8}")
+    for report in reports:
+        for phase, row in report["phases"].items():
+            print(f"{report['mode']:<6} {phase:<9} {row['requests']:>8} {row['success']:>8.1%} "
+                  f"{row['upstream_per_request']:>13.2f} {row['p50'] * 1000:>8.0f} {row['p99'] * 1000:>8.0f}")
+    print("\nupstream calls per request over the whole run")
+    for report in reports:
+        print(f"  {report['mode']:<6} {report['upstream_per_request']:.2f}")
+    print("\nrecovery after incident (success >= 95 % from then on)")
+    for report in reports:
+        recovered = report["recovery"]
+        print(f"  {report['mode']:<6} {'not recovered' if recovered is None else f'{recovered:.1f} s'}")
+        print(f"         errors: {dict(report['errors'])}")
+        for endpoint, stats in report["guards"].items():
+            print(f"         {endpoint}: {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=100, help="requests per second (open loop)")
+    parser.add_argument("--normal", type=float, default=3, help="seconds before the incident")
+    parser.add_argument("--incident", type=float, default=6, help="seconds of throttling, errors and spikes")
+    parser.add_argument("--recovery", type=float, default=6, help="seconds after the incident")
+    parser.add_argument("--latency", type=float, default=0.05, help="normal upstream latency in seconds")
+    parser.add_argument("--capacity", type=float, default=40, help="upstream requests per second during the incident")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="additional random 429s")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--spike-rate", type=float, default=0.1)
+    parser.add_argument("--spike-latency", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=2.0, help="client timeout in seconds")
+    parser.add_argument("--modes", default="off,naive,on")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+"""Versandzeit gegen Anzahl der Broadcast-Shards mit einer Stub-Telegram-API.
+
+Legt eine temporäre Datenbank mit N Abonnenten an, startet einen Stub der Bot-API
+(sendMessage mit fester Latenz) in einem eigenen Prozess und misst für jede
+Shard-Anzahl die Zeit vom Einreihen bis zur Zustellung an den letzten Empfänger.
+Jeder Shard bekommt ein eigenes Token, das Limit gilt pro Token.
+
+    python -m benchmarks.sharded_broadcast --subscribers 20000 --shards 1,2,4 --global-rate 1000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+from aiohttp import web
+
+from shards import ShardedBroadcaster
+from storage import PersistentSet, Store
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_stub_telegram(port: int, latency: float, ready):
+    async def send_message(request):
+        await asyncio.sleep(latency)
+        data = await request.post() if request.content_type != "application/json" else await request.json()
+        chat_id = int(data.get("chat_id", 0))
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            },
+        })
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", send_message)
+        app.router.add_post("/bot{token}/sendmessage", send_message)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        # mehrere Stub-Prozesse auf demselben Port, damit der Stub nicht selbst zum Engpass wird
+        await web.TCPSite(runner, "127.0.0.1", port, backlog=4096, reuse_port=True).start()
+        ready.release()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def create_subscribers(path: str, count: int) -> PersistentSet:
+    store = Store(path)
+    store.conn.executemany("INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", ((uid,) for uid in range(1, count + 1)))
+    return PersistentSet(store, "subscribers")
+
+
+async def measure(subscribers, shards: int, api_server: str, args) -> float:
+    tokens = [f"{100000 + i}:stub-token-{i}" for i in range(shards)]
+    broadcaster = ShardedBroadcaster(
+        subscribers, shards=shards, tokens=tokens, api_server=api_server,
+        concurrency=args.concurrency, global_rate=args.global_rate,
+    )
+    broadcaster.start()
+    await asyncio.sleep(args.warmup)  # Prozessstart nicht mitmessen
+    start = time.perf_counter()
+    alerts = [broadcaster.enqueue(f"alert {i}", subscribers) for i in range(args.alerts)]
+    await asyncio.gather(*(alert.done.wait() for alert in alerts))
+    elapsed = time.perf_counter() - start
+    sent = sum(alert.sent for alert in alerts)
+    await broadcaster.close()
+    print(f"shards {shards:>3}   sent {sent:>8}   elapsed {elapsed:7.2f} s   {sent / elapsed:9.1f} msg/s")
+    return elapsed
+
+
+async def main(args):
+    ctx = multiprocessing.get_context("spawn")
+    port, ready = free_port(), ctx.Semaphore(0)
+    stubs = [
+        ctx.Process(target=run_stub_telegram, args=(port, args.latency, ready), daemon=True)
+        for _ in range(args.stub_workers)
+    ]
+    for stub in stubs:
+        stub.start()
+    for _ in stubs:
+        ready.acquire()
+    api_server = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        subscribers = create_subscribers(os.path.join(tmp, "bench.db"), args.subscribers)
+        print(f"{len(subscribers)} subscribers, {args.alerts} alerts, {args.latency * 1000:.0f} ms API latency")
+        baseline = None
+        for shards in (int(s) for s in args.shards.split(",")):
+            elapsed = await measure(subscribers, shards, api_server, args)
+            baseline = baseline or elapsed
+            print(f"           speedup {baseline / elapsed:.2f}x")
+        subscribers.store.close()
+    for stub in stubs:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=20000)
+    parser.add_argument("--alerts", type=int, default=1)
+    parser.add_argument("--shards", default="1,2,4")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated Telegram API latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel sends per shard")
+    parser.add_argument("--global-rate", type=float, default=1000, help="messages/s per bot token")
+    parser.add_argument("--stub-workers", type=int, default=4, help="processes serving the stub Bot API")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
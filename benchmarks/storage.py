@@ -0,0 +1,94 @@
+"""Kosten für Abo-Toggle und Broadcast-Lesen bei vielen Nutzern.
+
+Vergleicht die alten JSON-/TXT-Dateien (ganze Datei lesen und schreiben pro Ereignis)
+mit dem SQLite-Store aus storage.py. Fremde Schreibzugriffe auf die Abonnenten laden den
+Snapshot neu, solche auf andere Tabellen (State, Mint-Register, Poll-Cursor) nicht.
+
+    python -m benchmarks.storage --users 100000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from storage import PersistentSet, Store
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def legacy(tmp: str, users: int, repeat: int):
+    subs_file = os.path.join(tmp, "whale_subs.json")
+    users_file = os.path.join(tmp, "whale_users.txt")
+    with open(subs_file, "w") as f:
+        json.dump(list(range(users)), f)
+    with open(users_file, "w") as f:
+        f.write("".join(f"{uid}\n" for uid in range(users)))
+
+    def toggle(i):
+        with open(subs_file) as f:
+            subs = set(json.load(f))
+        subs.symmetric_difference_update({users + i})
+        with open(subs_file, "w") as f:
+            json.dump(list(subs), f)
+
+    def read(i):
+        with open(users_file) as f:
+            return [int(line.strip()) for line in f if line.strip().isdigit()]
+
+    return timed(toggle, repeat), timed(read, repeat)
+
+
+def sqlite_store(tmp: str, users: int, repeat: int):
+    path = os.path.join(tmp, "bench.db")
+    store = Store(path)
+    store.conn.executemany("INSERT INTO subscribers (user_id) VALUES (?)", ((uid,) for uid in range(users)))
+    subs = PersistentSet(store, "subscribers")
+    len(subs)
+
+    def toggle(i):
+        subs.add(users + i)
+
+    def read(i):
+        return list(subs)
+
+    # zweiter Prozess (hier: zweite Verbindung) schreibt, der Snapshot muss neu geladen werden
+    other = sqlite3.connect(path, isolation_level=None)
+
+    def read_after_external_write(i):
+        other.execute("INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", (-i - 1,))
+        return list(subs)
+
+    def read_after_unrelated_write(i):
+        other.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"bench-{i}", "x"))
+        return list(subs)
+
+    result = (timed(toggle, repeat), timed(read, repeat), timed(read_after_external_write, max(1, repeat // 10)),
+              timed(read_after_unrelated_write, repeat))
+    other.close()
+    store.close()
+    return result
+
+
+def main(users: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        toggle, read = legacy(tmp, users, repeat)
+        print(f"legacy files  toggle {toggle * 1e3:9.3f} ms   broadcast read {read * 1e3:9.3f} ms")
+        toggle, read, reload, unrelated = sqlite_store(tmp, users, repeat)
+        print(f"sqlite store  toggle {toggle * 1e3:9.3f} ms   broadcast read {read * 1e3:9.3f} ms"
+              f"   read after external write {reload * 1e3:9.3f} ms"
+              f"   read after unrelated write {unrelated * 1e3:9.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.users, args.repeat)
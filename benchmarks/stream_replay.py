@@ -0,0 +1,162 @@
+"""Replay aufgezeichneter logsSubscribe-Nachrichten gegen einen lokalen Websocket.
+
+Startet einen Websocket-Stand-in, der die Nachrichten aus --recording (JSONL, eine
+Websocket-Nachricht pro Zeile) abspielt, plus einen Fake-Helius für Transaktionen,
+Mint-Historie und Metadaten. Gemessen wird die Latenz Notification -> Alert und wie viele
+Käufe aus dem TradeEvent kamen bzw. über Helius nachgeladen wurden. Synthetische Käufe
+haben zu drei Vierteln ein TradeEvent in den Logs, ab und zu ist eine Nachricht unvollständig.
+
+    python -m benchmarks.stream_replay --messages 500 --rate 200
+"""
+import argparse
+import asyncio
+import base64
+import json
+import struct
+import time
+
+from aiohttp import web
+
+import mint_cache
+from helius import helius
+from registry import PUMP_PROGRAM_ID
+from stream import TRADE_EVENT_DISCRIMINATOR, WhaleStream
+from whales import evaluate, evaluate_transaction, threshold
+
+
+def trade_event(n: int) -> str:
+    # TradeEvent wie im Pump.fun-Programm: mint, sol_amount, token_amount, is_buy, user, timestamp
+    data = (
+        TRADE_EVENT_DISCRIMINATOR + f"mint{n % 50}".encode().ljust(32, b"\1")
+        + struct.pack("<QQ?", (5 + n % 20) * 1_000_000_000, 1_000_000, True)
+        + f"buyer{n}".encode().ljust(32, b"\1") + struct.pack("<q", int(time.time()))
+    )
+    return "Program data: " + base64.b64encode(data).decode()
+
+
+def synthetic_recording(count: int):
+    for i in range(count):
+        if i % 50 == 49:
+            yield {"jsonrpc": "2.0", "method": "logsNotification", "params": {"result": {"context": {"slot": 1000 + i}}}}
+            continue
+        logs = [f"Program {PUMP_PROGRAM_ID} invoke [1]"]
+        logs.append("Program log: Instruction: Buy" if i % 2 == 0 else "Program log: Instruction: Sell")
+        if i % 8 != 0:
+            logs.append(trade_event(i))
+        logs.append(f"Program {PUMP_PROGRAM_ID} success")
+        yield {
+            "jsonrpc": "2.0",
+            "method": "logsNotification",
+            "params": {"result": {"context": {"slot": 1000 + i}, "value": {"signature": f"sig{i}", "err": None, "logs": logs}}},
+        }
+
+
+def fake_transaction(signature: str) -> dict:
+    n = int(signature[3:]) if signature[3:].isdigit() else 0
+    return {
+        "signature": signature,
+        "type": "SWAP",
+        "timestamp": int(time.time()),
+        "feePayer": f"buyer{n}",
+        "tokenTransfers": [{"mint": f"mint{n % 50}"}],
+        "nativeTransfers": [{"amount": (5 + n % 20) * 1_000_000_000}],
+    }
+
+
+async def start_servers(messages, rate: float, helius_latency: float):
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.receive()  # logsSubscribe
+        await ws.send_json({"jsonrpc": "2.0", "id": 1, "result": 1})
+        for message in messages:
+            await ws.send_json(message)
+            if rate:
+                await asyncio.sleep(1 / rate)
+        await asyncio.sleep(3600)
+        return ws
+
+    async def transactions(request):
+        await asyncio.sleep(helius_latency)
+        body = await request.json()
+        return web.json_response([fake_transaction(sig) for sig in body["transactions"]])
+
+    async def mint_history(request):
+        await asyncio.sleep(helius_latency)
+        return web.json_response([{"signature": f"{request.match_info['address']}-created", "timestamp": int(time.time()) - 600}])
+
+    async def metadata(request):
+        await asyncio.sleep(helius_latency)
+        body = await request.json()
+        return web.json_response([
+            {"account": mint, "updateAuthority": mint_cache.PUMP_AUTH, "symbol": mint.upper()}
+            for mint in body["mintAccounts"]
+        ])
+
+    app = web.Application()
+    app.router.add_get("/ws", ws_handler)
+    app.router.add_post("/v0/transactions/", transactions)
+    app.router.add_get("/v0/addresses/{address}/transactions", mint_history)
+    app.router.add_post("/v0/tokens/metadata", metadata)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def main(args):
+    if args.recording:
+        with open(args.recording) as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+    else:
+        messages = list(synthetic_recording(args.messages))
+
+    runner, base_url = await start_servers(messages, args.rate, args.helius_latency)
+    helius._base_url = base_url
+    decisions = {}
+
+    async def on_transaction(tx):
+        status, alert = await evaluate_transaction(tx)
+        decisions[status] = decisions.get(status, 0) + 1
+        return alert is not None
+
+    async def on_candidate(c):
+        # wie Pipeline.accept: Schwelle vor jedem Helius-Aufruf
+        status, alert = threshold(c), None
+        if not status:
+            status, alert = await evaluate(c)
+        decisions[status] = decisions.get(status, 0) + 1
+        return alert is not None
+
+    stream = WhaleStream(on_transaction, ws_url=base_url.replace("http", "ws") + "/ws", on_candidate=on_candidate)
+    task = asyncio.ensure_future(stream.run())
+    expected = sum(1 for m in messages if "Instruction: Buy" in json.dumps(m) and "signature" in json.dumps(m))
+    start = time.perf_counter()
+    while sum(decisions.values()) < expected and time.perf_counter() - start < args.timeout:
+        await asyncio.sleep(0.05)
+    task.cancel()
+
+    print(f"notifications replayed  {len(messages)}")
+    print(f"buy candidates          {expected}")
+    print(f"decisions               {decisions}")
+    summary = stream.detection_latency.summary()
+    if summary["count"]:
+        print(f"detection->alert p50    {summary['p50'] * 1e3:.1f} ms")
+        print(f"detection->alert p99    {summary['p99'] * 1e3:.1f} ms")
+    print(f"from TradeEvent         {stream.decoded}")
+    print(f"malformed skipped       {stream.malformed}")
+    print(f"helius tx batches       {stream.tx_loader.batches} for {stream.tx_loader.keys_loaded} signatures")
+    await helius.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recording", help="JSONL file with recorded websocket messages")
+    parser.add_argument("--messages", type=int, default=500, help="synthetic messages if no recording is given")
+    parser.add_argument("--rate", type=float, default=200, help="messages per second, 0 = as fast as possible")
+    parser.add_argument("--helius-latency", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""Telegram-Updates über /telegram: Durchsatz und Reihenfolge pro Chat.
+
+Startet webhook:app im selben Prozess mit TELEGRAM_BOT=whalerider_bot, Telegram ist ein
+lokaler Fake mit einstellbarer Latenz. --chats Chats schicken je --messages Nachrichten
+(/start, eine zu kurze Wallet, /burn, ein TX-Hash ohne Wallet, ...), alle Updates gehen auf
+einmal an /telegram. Die Antworten hängen vom Sitzungszustand ab und stimmen nur, wenn die
+Updates eines Chats in Eingangsreihenfolge bearbeitet wurden.
+Verglichen wird die Bearbeitung nacheinander (ein Update nach dem anderen, wie beim
+Polling mit einem Handler) mit der Bearbeitung parallel über Chats (TELEGRAM_UPDATE_CONCURRENCY).
+
+Ausgabe: Zeit bis alle Antworten verschickt sind, Updates/s, Antwortzeit /telegram und
+ob die Antworten jedes Chats in Eingangsreihenfolge ankamen.
+
+    python -m benchmarks.telegram_updates --chats 200 --messages 5 --telegram-latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.fakes import Faults, helius_app, serve_in_thread, telegram_app
+from benchmarks.webhook_replay import free_port, percentile, start_app
+
+SECRET = "updates-secret"
+# Nachricht -> Anfang der erwarteten Antwort bei Bearbeitung in Reihenfolge
+CONVERSATION = [
+    ("/start", "Bitte sende deine Wallet-Adresse"),
+    ("kurz", "❌ Ungültige Wallet-Adresse"),
+    ("/burn", "🔥 Um 7 Tage Premium"),
+    ("tx", "❌ Wallet nicht gefunden"),
+]
+
+
+def message_update(update_id: int, chat_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+            "text": text,
+            **({"entities": [{"type": "bot_command", "offset": 0, "length": len(text)}]} if text.startswith("/") else {}),
+        },
+    }
+
+
+async def run_mode(name: str, concurrency: int, base_url: str, telegram, args, first_id: int) -> dict:
+    from updates import ChatSerializer, telegram_updates
+
+    telegram_updates.serializer = ChatSerializer(telegram_updates._process, concurrency)
+    sent_before = len(telegram["sent"])
+    updates, expected = [], {}
+    for round_ in range(args.messages):
+        for chat in range(1, args.chats + 1):
+            text, reply = CONVERSATION[round_ % len(CONVERSATION)]
+            updates.append(message_update(first_id + len(updates), chat, text))
+            expected.setdefault(chat, []).append(reply)
+
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        async def post(update):
+            start = time.perf_counter()
+            async with session.post(f"{base_url}/telegram", json=update,
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as resp:
+                assert resp.status == 200, resp.status
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(update) for update in updates))
+        await telegram_updates.serializer.join()
+        elapsed = time.perf_counter() - start
+
+    replies = {}
+    for chat_id, _, text in telegram["sent"][sent_before:]:
+        replies.setdefault(chat_id, []).append(text)
+    in_order = sum(
+        len(replies.get(chat, [])) == len(prefixes)
+        and all(text.startswith(prefix) for text, prefix in zip(replies[chat], prefixes))
+        for chat, prefixes in expected.items()
+    )
+    return {
+        "mode": name, "updates": len(updates), "elapsed": elapsed, "replies": len(telegram["sent"]) - sent_before,
+        "p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+        "in_order": in_order, "chats": len(expected), "errors": telegram_updates.serializer.errors,
+    }
+
+
+async def main(args):
+    telegram = telegram_app(Faults(args.telegram_latency, seed=1))
+    telegram_url = serve_in_thread(telegram)
+    helius_url = serve_in_thread(helius_app(Faults(0.01, seed=1)))
+    tmp = tempfile.TemporaryDirectory()
+    # Konfiguration muss stehen, bevor webhook.py und updates.py importiert werden
+    os.environ.update({
+        "TELEGRAM_BOT": "whalerider_bot",
+        "TELEGRAM_WEBHOOK_SECRET": SECRET,
+        "WHALE_SOURCE": "webhook",
+        "TELEGRAM_API_SERVER": telegram_url,
+        "TELEGRAM_API_TOKEN": "123456:updates-token",
+        "HELIUS_BASE_URL": helius_url,
+        "HELIUS_API_KEY": "updates",
+        "WHALERIDER_DB": os.path.join(tmp.name, "updates.db"),
+    })
+    port = free_port()
+    server, task = await start_app(port)
+    base_url = f"http://127.0.0.1:{port}"
+    from updates import telegram_updates
+    await telegram_updates.load()
+
+    reports, first_id = [], 1
+    for name, concurrency in (("serial", 1), ("per-chat", args.concurrency)):
+        reports.append(await run_mode(name, concurrency, base_url, telegram, args, first_id))
+        first_id += args.chats * args.messages
+
+    print(f"{args.chats} chats x {args.messages} updates, telegram latency {args.telegram_latency * 1000:.0f} ms")
+    print(f"\n{'mode':<9} {'updates':>8} {'elapsed s':>10} {'updates/s':>10} {'replies':>8} "
+          f"{'post p50 ms':>12} {'post p99 ms':>12} {'chats in order':>15}")
+    for r in reports:
+        print(f"{r['mode']:<9} {r['updates']:>8} {r['elapsed']:>10.2f} {r['updates'] / r['elapsed']:>10.1f} "
+              f"{r['replies']:>8} {r['p50'] * 1000:>12.2f} {r['p99'] * 1000:>12.2f} "
+              f"{r['in_order']:>9}/{r['chats']:<5}")
+
+    server.should_exit = True
+    await task
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5, help="updates per chat")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="sendMessage latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="TELEGRAM_UPDATE_CONCURRENCY for the per-chat mode")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+"""Kaltstart des Webhooks wie auf Render free: Importzeit und Zeit bis zur ersten Antwort.
+
+1. `python -X importtime -c "import webhook"` in einem frischen Prozess, Importzeit
+   gesamt und pro Paket (Eigenzeit der Module, nach Wurzelpaket summiert).
+2. uvicorn als eigener Prozess wie im startCommand: Zeit bis /healthz antwortet, bis die
+   erste Helius-Zustellung beantwortet ist und bis das Warm-up im Hintergrund fertig ist.
+   Helius und Telegram sind lokale Fakes.
+
+Mit Exit-Code 1, wenn der Median über dem Budget liegt.
+
+    python -m benchmarks.webhook_coldstart --runs 5 --import-budget-ms 800 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.fakes import Faults, helius_app, serve_in_thread, telegram_app
+
+AUTH = "coldstart-secret"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DELIVERY = {
+    "signature": "coldstart-sig",
+    "type": "SWAP",
+    "timestamp": 0,
+    "feePayer": "coldstart-buyer",
+    "tokenTransfers": [{"mint": "ColdStartMint", "tokenStandard": "Fungible", "amount": 25}],
+    "nativeTransfers": [{"amount": 25_000_000_000}],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def environment(tmp: str, run: int, helius_url: str, telegram_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "AUTH_HEADER": AUTH,
+        "TELEGRAM_API_TOKEN": "123456:coldstart-token",
+        "HELIUS_BASE_URL": helius_url,
+        "HELIUS_API_KEY": "coldstart",
+        "TELEGRAM_API_SERVER": telegram_url,
+        "WHALERIDER_DB": os.path.join(tmp, f"coldstart-{run}.db"),
+    })
+    return env
+
+
+def import_profile(env: dict):
+    # (gesamt in ms, {wurzelpaket: eigenzeit in ms})
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import webhook"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total, packages = 0.0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + int(self_us) / 1000
+        if name == "webhook":
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def request(url: str, body: bytes = None, timeout: float = 5.0):
+    req = urllib.request.Request(url, data=body, headers={"Authorization": AUTH, "Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def cold_start(env: dict, timeout: float = 30.0) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "webhook:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    timings = {}
+    try:
+        while "healthz" not in timings:
+            if time.perf_counter() - start > timeout or process.poll() is not None:
+                raise RuntimeError("webhook did not start")
+            try:
+                health = request(f"{base}/healthz", timeout=1)
+                timings["healthz"] = time.perf_counter() - start
+                timings["warm_at_healthz"] = health["warm"]
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        delivery = dict(DELIVERY, timestamp=int(time.time()))
+        request(f"{base}/pumpwhale", json.dumps(delivery).encode())
+        timings["first_delivery"] = time.perf_counter() - start
+        while not request(f"{base}/healthz")["warm"]:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("warm-up did not finish")
+            time.sleep(0.01)
+        timings["warm"] = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    return timings
+
+
+def main(args):
+    helius_url = serve_in_thread(helius_app(Faults(latency=0.02)))
+    telegram_url = serve_in_thread(telegram_app(Faults(latency=0.02)))
+    tmp = tempfile.TemporaryDirectory()
+
+    imports, packages, starts = [], {}, []
+    for run in range(args.runs):
+        env = environment(tmp.name, run, helius_url, telegram_url)
+        total, by_package = import_profile(env)
+        imports.append(total)
+        for name, ms in by_package.items():
+            packages.setdefault(name, []).append(ms)
+        starts.append(cold_start(environment(tmp.name, run + args.runs, helius_url, telegram_url)))
+
+    import_ms = statistics.median(imports)
+    healthz_ms = statistics.median(s["healthz"] for s in starts) * 1000
+    print(f"runs                      {args.runs}")
+    print(f"import webhook            {import_ms:7.0f} ms  (budget {args.import_budget_ms:.0f} ms)")
+    print(f"process start -> /healthz {healthz_ms:7.0f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"-> first /pumpwhale       {statistics.median(s['first_delivery'] for s in starts) * 1000:7.0f} ms")
+    print(f"-> warm-up finished       {statistics.median(s['warm'] for s in starts) * 1000:7.0f} ms")
+    print(f"warm at first /healthz    {sum(s['warm_at_healthz'] for s in starts)}/{len(starts)}")
+    print("\nimport self time by package (median ms)")
+    ranked = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)
+    for ms, name in ranked[:args.top]:
+        print(f"  {name:<24} {ms:7.1f}")
+    tmp.cleanup()
+
+    over = []
+    if import_ms > args.import_budget_ms:
+        over.append("import")
+    if healthz_ms > args.budget_ms:
+        over.append("healthz")
+    if over:
+        print(f"\nover budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=800, help="median import time of webhook.py")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="median process start to first /healthz")
+    parser.add_argument("--top", type=int, default=12, help="packages to list")
+    main(parser.parse_args())
@@ -0,0 +1,132 @@
+"""Requests/s von /pumpwhale bei überwiegend verworfenen Zustellungen.
+
+Vergleicht den alten Handler (payload: dict, FastAPI parst und validiert jeden Body)
+mit dem Rohbody-Fast-Path aus webhook.py. Die App wird direkt über ASGI aufgerufen,
+damit HTTP-Overhead den Unterschied nicht verdeckt. Die Payloads sind realistisch groß
+(accountData, instructions); --candidates steuert den Anteil an BUY/SWAP-Kandidaten.
+
+    python -m benchmarks.webhook_fastpath --requests 5000 --candidates 0.05 --batch 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from fastapi import FastAPI, Header, HTTPException
+
+AUTH = "bench-secret"
+
+
+def payload(i: int, rng: random.Random, candidate: bool, run: str) -> dict:
+    sol = rng.choice((0.2, 1, 3, 12)) if candidate else 0.5
+    return {
+        "signature": f"bench-{run}-{i}",
+        "type": rng.choice(("SWAP", "BUY")) if candidate else rng.choice(("TRANSFER", "NFT_SALE", "UNKNOWN")),
+        "timestamp": int(time.time()),
+        "feePayer": f"payer{rng.randrange(1000)}",
+        "tokenTransfers": [{"mint": f"BenchMint{rng.randrange(100)}", "tokenStandard": "Fungible", "amount": sol}],
+        "nativeTransfers": [{"amount": int(sol * 1e9), "fromUserAccount": "a" * 44, "toUserAccount": "b" * 44}],
+        "accountData": [
+            {"account": f"{'c' * 40}{k:04d}", "nativeBalanceChange": -k, "tokenBalanceChanges": []}
+            for k in range(30)
+        ],
+        "instructions": [
+            {"programId": "p" * 44, "data": "d" * 120, "accounts": ["e" * 44] * 8, "innerInstructions": []}
+            for _ in range(10)
+        ],
+    }
+
+
+def legacy_app(handle_delivery) -> FastAPI:
+    # Stand vor dem Fast-Path: FastAPI dekodiert und validiert den Body als dict
+    app = FastAPI()
+
+    @app.post("/pumpwhale")
+    async def pump_webhook(payload: dict, authorization: str = Header(None)):
+        if authorization != AUTH:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        return {"status": await handle_delivery(payload)}
+
+    return app
+
+
+async def call(app, body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/pumpwhale", "raw_path": b"/pumpwhale", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"authorization", AUTH.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = {}
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+async def measure(name: str, app, bodies) -> float:
+    start = time.perf_counter()
+    for body in bodies:
+        code = await call(app, body)
+        if code != 200:
+            raise RuntimeError(f"{name}: HTTP {code}")
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {len(bodies) / elapsed:9.0f} req/s   {elapsed / len(bodies) * 1e6:7.1f} us/req")
+    return elapsed
+
+
+async def main(args):
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "AUTH_HEADER": AUTH,
+        "TELEGRAM_API_TOKEN": "123456:bench-token",
+        "WHALERIDER_DB": os.path.join(tmp.name, "bench.db"),
+        "WEBHOOK_QUEUE_SIZE": "100000000",
+    })
+    import fastpath
+    import webhook
+
+    webhook.pipeline.queue.submit = lambda item, weight=None: True  # nur die Annahme messen
+
+    def make_bodies(run: str):
+        # gleiche Verteilung pro Lauf, aber eigene Signaturen (sonst nur "duplicate")
+        rng = random.Random(args.seed)
+        payloads = [payload(i, rng, rng.random() < args.candidates, run) for i in range(args.requests * args.batch)]
+        if args.batch == 1:
+            return [json.dumps(p).encode() for p in payloads]
+        return [json.dumps(payloads[i:i + args.batch]).encode() for i in range(0, len(payloads), args.batch)]
+
+    bodies = make_bodies("fast")
+    print(f"{len(bodies)} requests, {args.batch} transaction(s) each, "
+          f"{sum(map(len, bodies)) / len(bodies) / 1024:.1f} KiB avg body, json parser: "
+          f"{'orjson' if fastpath.orjson else 'stdlib'}")
+    legacy = None
+    if args.batch == 1:  # der alte Handler kannte keine Arrays
+        legacy = await measure("legacy", legacy_app(webhook.handle_delivery), make_bodies("legacy"))
+    fast = await measure("fast path", webhook.app, bodies)
+    if legacy:
+        print(f"speedup    {legacy / fast:.2f}x")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--candidates", type=float, default=0.05, help="share of BUY/SWAP deliveries")
+    parser.add_argument("--batch", type=int, default=1, help="transactions per request (Helius array delivery)")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
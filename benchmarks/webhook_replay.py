@@ -0,0 +1,324 @@
+"""Replay aufgezeichneter Helius-Webhook-Payloads gegen /pumpwhale.
+
+Liest Enhanced-Transaction-Payloads aus --recording (JSONL, ein Payload oder ein
+Array von Payloads pro Zeile) und schickt sie mit --rate Requests/s (0 = so schnell
+wie möglich) an die FastAPI-App. Helius und Telegram sind lokale Fakes mit
+einstellbarer Latenz und Fehlerrate. Ohne --url läuft die App im selben Prozess
+(uvicorn), mit --url wird ein bereits laufender Webhook angesprochen, der auf die
+ausgegebenen Fake-URLs zeigen muss.
+
+Ausgabe: Durchsatz, Antwortzeit-Perzentile, Antwortstatus, Filterentscheidungen
+(aus /metrics) und zugestellte Alerts. --compare stellt die Entscheidungen der gemeinsamen
+Pipeline (whales.py, für Webhook, Stream und beide Bots) den früheren Filtern der Bots
+gegenüber: whalerider_bot.py ab 4 Einheiten Token-Menge, whalerider_bot1.py ab 1 SOL
+whaleVolume ohne Pump.fun-Check, beide ohne Cooldown. --digest-seconds schaltet den
+Digest-Modus ein (digest.py); gesammelte Alerts werden nach dem Replay sofort gesendet, die
+Telegram-Nachrichten lassen sich so mit und ohne Digest vergleichen.
+
+    python -m benchmarks.webhook_replay --payloads 2000 --rate 0 --subscribers 200
+    python -m benchmarks.webhook_replay --recording payloads.jsonl --helius-error-rate 0.05 --compare
+    python -m benchmarks.webhook_replay --payloads 2000 --subscribers 200 --digest-seconds 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+from benchmarks.fakes import Faults, helius_app, serve_in_thread, telegram_app
+
+AUTH = "replay-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def synthetic_payloads(count: int, mints: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        sol = rng.choice((0.5, 2, 5, 8, 12, 25, 60))
+        yield {
+            "signature": f"replay-sig-{i}",
+            "type": rng.choice(("SWAP", "SWAP", "BUY", "TRANSFER")),
+            "timestamp": int(time.time()),
+            "feePayer": f"buyer{rng.randrange(500)}",
+            "tokenTransfers": [{
+                "mint": f"ReplayMint{rng.randrange(mints):06d}",
+                "tokenStandard": "Fungible",
+                "amount": sol,
+            }],
+            "nativeTransfers": [{"amount": int(sol * 1_000_000_000)}],
+        }
+
+
+def load_payloads(path: str):
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            payloads.extend(item if isinstance(item, list) else [item])
+    return payloads
+
+
+def filter_outcomes(metrics_text: str) -> dict:
+    outcomes = {}
+    prefix = 'whalerider_filter_outcomes_total{outcome="'
+    for line in metrics_text.splitlines():
+        if line.startswith(prefix):
+            label, _, value = line[len(prefix):].rpartition('"} ')
+            outcomes[label] = float(value)
+    return outcomes
+
+
+async def start_app(port: int):
+    import uvicorn
+    import webhook
+
+    server = uvicorn.Server(uvicorn.Config(webhook.app, host="127.0.0.1", port=port, log_level="warning"))
+    task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def replay(session, url: str, payloads, rate: float, concurrency: int):
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, json=payload, headers={"Authorization": AUTH}) as resp:
+                    body = await resp.json() if resp.status == 200 else {"status": f"http {resp.status}"}
+            except aiohttp.ClientError as e:
+                body = {"status": type(e).__name__}
+            latencies.append(time.perf_counter() - start)
+            statuses[body.get("status")] = statuses.get(body.get("status"), 0) + 1
+
+    tasks = []
+    start = time.perf_counter()
+    for i, payload in enumerate(payloads):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(post(payload)))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, latencies, statuses
+
+
+async def legacy_bot(tx: dict, now: datetime) -> list:
+    # Filter aus whalerider_bot.py vor der gemeinsamen Pipeline: jeder Token-Transfer ab 4 Einheiten
+    # der Token-Menge (nicht SOL), Alter und Pump.fun, ohne Cooldown
+    from mint_cache import MintLookupError, get_mint_metadata, get_mint_timestamp
+    from whales import matcher
+
+    statuses = []
+    for transfer in tx.get("tokenTransfers", []):
+        mint = transfer.get("mint")
+        if transfer.get("tokenStandard") != "Fungible" or not mint:
+            continue
+        volume = float(transfer.get("amount", 0))
+        if volume < min(4, matcher.min_sol):
+            statuses.append("unter 4")
+            continue
+        try:
+            age = (now - await get_mint_timestamp(mint)).total_seconds() / 60
+        except MintLookupError:
+            statuses.append("mint lookup failed")
+            continue
+        if age > max(60, matcher.max_age):
+            statuses.append("Token zu alt")
+            continue
+        try:
+            meta = await get_mint_metadata(mint)
+        except MintLookupError:
+            statuses.append("meta fetch failed")
+            continue
+        if not meta["pump"]:
+            statuses.append("nicht Pump.fun")
+            continue
+        recipients = matcher.match(mint, tx.get("feePayer"), volume, age, default_ok=volume >= 4 and age <= 60)
+        statuses.append("sent" if recipients else "keine Empfänger")
+    return statuses
+
+
+async def legacy_bot1(tx: dict, now: datetime) -> str:
+    # Filter aus whalerider_bot1.py vor der gemeinsamen Pipeline: /v0/tokens/recent nachgebildet
+    # aus Mint-Alter und SOL-Betrag, whaleVolume ab 1 SOL, kein Pump.fun-Check, ohne Cooldown
+    import whales
+    from mint_cache import MintLookupError, get_mint_timestamp
+
+    status, c = whales.candidate(tx)
+    if status:
+        return status
+    try:
+        age = (now - await get_mint_timestamp(c.mint)).total_seconds() / 60
+    except MintLookupError:
+        return "mint lookup failed"
+    if age > max(60, whales.matcher.max_age):
+        return "Token zu alt"
+    if c.sol < 1:
+        return "unter 1 SOL"
+    recipients = whales.matcher.match(c.mint, None, c.sol, age, default_ok=age <= 60)
+    return "sent" if recipients else "keine Empfänger"
+
+
+async def compare_filters(payloads) -> dict:
+    # Entscheidungen der gemeinsamen Pipeline gegen die früheren Schwellen der beiden Bots;
+    # die gemeinsame Pipeline mit frischem Cooldown-Zustand
+    import whales
+    from state import MemoryState
+
+    whales.state = MemoryState()
+    results = {"pipeline": {}, "legacy bot": {}, "legacy bot1": {}}
+
+    def count(name, status):
+        results[name][status] = results[name].get(status, 0) + 1
+
+    for tx in payloads:
+        now = datetime.now(timezone.utc)
+        status, _ = await whales.evaluate_transaction(tx, now)
+        count("pipeline", status)
+        for status in await legacy_bot(tx, now):
+            count("legacy bot", status)
+        count("legacy bot1", await legacy_bot1(tx, now))
+    return results
+
+
+def print_table(title: str, columns: dict):
+    print(f"\n{title}")
+    names = list(columns)
+    rows = sorted({status for counts in columns.values() for status in counts})
+    print("  " + "".join(f"{name:>18}" for name in ["outcome"] + names))
+    for status in rows:
+        print("  " + f"{status:>18}" + "".join(f"{columns[name].get(status, 0):>18.0f}" for name in names))
+
+
+async def main(args):
+    helius_faults = Faults(args.helius_latency, args.helius_error_rate, args.helius_throttle_rate, seed=args.seed)
+    telegram_faults = Faults(args.telegram_latency, args.telegram_error_rate, args.telegram_throttle_rate, seed=args.seed)
+    helius_url = serve_in_thread(helius_app(helius_faults, pump_ratio=args.pump_ratio))
+    telegram = telegram_app(telegram_faults, blocked_rate=args.blocked_rate)
+    telegram_url = serve_in_thread(telegram)
+
+    payloads = load_payloads(args.recording) if args.recording else list(
+        synthetic_payloads(args.payloads, args.mints, args.seed)
+    )
+
+    tmp = tempfile.TemporaryDirectory()
+    server = task = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        print(f"fake helius    {helius_url}")
+        print(f"fake telegram  {telegram_url}")
+    else:
+        # Konfiguration muss stehen, bevor webhook.py importiert wird
+        os.environ.update({
+            "HELIUS_BASE_URL": helius_url,
+            "HELIUS_API_KEY": "replay",
+            "TELEGRAM_API_SERVER": telegram_url,
+            "TELEGRAM_API_TOKEN": "123456:replay-token",
+            "TELEGRAM_GLOBAL_RATE": str(args.telegram_rate),
+            "TELEGRAM_CHAT_RATE": str(args.chat_rate),
+            "WHALERIDER_DB": os.path.join(tmp.name, "replay.db"),
+            "AUTH_HEADER": AUTH,
+            "ALERT_DIGEST_SECONDS": str(args.digest_seconds),
+        })
+        from storage import subscribers
+        for uid in range(1, args.subscribers + 1):
+            subscribers.add(uid)
+        port = free_port()
+        server, task = await start_app(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/metrics") as resp:
+            before = filter_outcomes(await resp.text())
+        elapsed, latencies, statuses = await replay(
+            session, f"{base_url}/pumpwhale", payloads, args.rate, args.concurrency
+        )
+        if server:
+            import webhook
+            drain_start = time.perf_counter()
+            await webhook.pipeline.join()
+            webhook.digest.flush()
+            await webhook.get_broadcaster().join()
+            drained = time.perf_counter() - drain_start
+        else:
+            await asyncio.sleep(args.drain)
+            drained = args.drain
+        async with session.get(f"{base_url}/metrics") as resp:
+            after = filter_outcomes(await resp.text())
+
+    decisions = {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+    print(f"payloads             {len(payloads)}")
+    print(f"elapsed              {elapsed:.2f} s")
+    print(f"throughput           {len(payloads) / elapsed:.1f} req/s")
+    print(f"response p50         {percentile(latencies, 50) * 1e3:.2f} ms")
+    print(f"response p90         {percentile(latencies, 90) * 1e3:.2f} ms")
+    print(f"response p99         {percentile(latencies, 99) * 1e3:.2f} ms")
+    print(f"drain after replay   {drained:.2f} s")
+    print(f"responses            {statuses}")
+    print(f"filter decisions     {decisions}")
+    print(f"telegram messages    {len(telegram['sent'])}")
+    print(f"telegram edits       {len(telegram['edited'])}")
+    if server:
+        import webhook
+        print(f"digest               {webhook.digest.stats()}")
+    print(f"helius calls         {helius_faults.calls}")
+    print(f"injected faults      helius {helius_faults.injected}, telegram {telegram_faults.injected}")
+
+    if args.compare:
+        if args.url:
+            print("\n--compare braucht den In-Process-Modus (ohne --url)")
+        else:
+            print_table("filter comparison", await compare_filters(payloads))
+
+    if server:
+        server.should_exit = True
+        await task
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recording", help="JSONL file with recorded Helius webhook payloads")
+    parser.add_argument("--payloads", type=int, default=1000, help="synthetic payloads if no recording is given")
+    parser.add_argument("--mints", type=int, default=200, help="distinct mints in synthetic payloads")
+    parser.add_argument("--url", help="replay against a running webhook instead of an in-process app")
+    parser.add_argument("--rate", type=float, default=0, help="requests/s, 0 = as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--helius-latency", type=float, default=0.05)
+    parser.add_argument("--helius-error-rate", type=float, default=0.0)
+    parser.add_argument("--helius-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.03)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-rate", type=float, default=1000, help="TELEGRAM_GLOBAL_RATE for the in-process app")
+    parser.add_argument("--chat-rate", type=float, default=1, help="TELEGRAM_CHAT_RATE, limits the drain time")
+    parser.add_argument("--blocked-rate", type=float, default=0.0)
+    parser.add_argument("--pump-ratio", type=float, default=0.8)
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for deliveries with --url")
+    parser.add_argument("--compare", action="store_true", help="also compare pipeline decisions with the legacy bot/bot1 thresholds")
+    parser.add_argument("--digest-seconds", type=float, default=0, help="ALERT_DIGEST_SECONDS for the in-process app")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
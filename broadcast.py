@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import time
+
+from aiogram.bot.api import TELEGRAM_PRODUCTION, TelegramAPIServer
+from aiogram.utils.exceptions import (
+    BotBlocked,
+    ChatNotFound,
+    MessageCantBeEdited,
+    MessageNotModified,
+    MessageToEditNotFound,
+    RetryAfter,
+    TelegramAPIError,
+    UserDeactivated,
+)
+
+from metrics import ALERT_END_TO_END, BROADCAST_DURATION, TELEGRAM_LATENCY, TELEGRAM_SENDS
+
+# Paralleler Versand von Alerts an alle Abonnenten.
+# Telegram erlaubt ca. 30 Nachrichten/s global und ca. 1 Nachricht/s pro Chat.
+
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", 20))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+TELEGRAM_API_SERVER = os.getenv("TELEGRAM_API_SERVER")  # z.B. lokaler Bot-API-Server oder Stub
+MAX_SEND_ATTEMPTS = 3
+
+UNREACHABLE_ERRORS = (BotBlocked, ChatNotFound, UserDeactivated)
+EDIT_GONE_ERRORS = (MessageToEditNotFound, MessageCantBeEdited)  # dann neu senden
+
+
+def api_server(base_url: str = None) -> TelegramAPIServer:
+    base_url = base_url or TELEGRAM_API_SERVER
+    return TelegramAPIServer.from_base(base_url) if base_url else TELEGRAM_PRODUCTION
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def pause(self, seconds: float):
+        # Nach RetryAfter den ganzen Bucket leeren, damit niemand vorher weitersendet
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class Alert:
+    def __init__(self, text: str, recipients: int, parse_mode=None, origin: float = None, edits: dict = None,
+                 track: bool = False):
+        self.text = text
+        self.parse_mode = parse_mode
+        self.origin = origin  # Block-Zeit der Transaktion (Unix-Sekunden), falls bekannt
+        self.edits = edits or {}  # uid -> message_id: bestehende Nachricht bearbeiten statt neu senden
+        self.message_ids = {} if track else None  # uid -> message_id der zugestellten Nachricht
+        self.pending = recipients
+        self.sent = 0
+        self.failed = 0
+        self.first_sent_at = None  # Unix-Zeit der ersten erfolgreichen Zustellung
+        self.enqueued_at = time.monotonic()
+        self.finished_at = None
+        self.done = asyncio.Event()
+        if not recipients:
+            self._finish()
+
+    def _finish(self):
+        self.finished_at = time.monotonic()
+        self.done.set()
+        BROADCAST_DURATION.observe(self.finished_at - self.enqueued_at)
+
+    def _complete_one(self, ok: bool):
+        if ok:
+            if self.sent == 0:
+                self.first_sent_at = time.time()
+                if self.origin:
+                    ALERT_END_TO_END.observe(self.first_sent_at - self.origin)
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.pending -= 1
+        if self.pending == 0:
+            self._finish()
+
+    @property
+    def latency(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.enqueued_at
+
+
+class Broadcaster:
+    def __init__(self, bot, concurrency=None, global_rate=None, chat_rate=None, on_unreachable=None):
+        self.bot = bot
+        self.concurrency = concurrency or BROADCAST_CONCURRENCY
+        self.global_bucket = TokenBucket(global_rate or TELEGRAM_GLOBAL_RATE)
+        self.chat_interval = 1 / (chat_rate or TELEGRAM_CHAT_RATE)
+        self.on_unreachable = on_unreachable  # callback(uid) für blockierte/gelöschte Chats
+        self._chat_next = {}  # chat_id -> frühester nächster Sendezeitpunkt
+        self._queue = None
+        self._workers = []
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.ensure_future(self._worker()))
+
+    def enqueue(self, text: str, recipients, parse_mode=None, origin: float = None, edits: dict = None,
+                track: bool = False) -> Alert:
+        recipients = list(recipients)
+        self._ensure_workers()
+        alert = Alert(text, len(recipients), parse_mode, origin, edits, track)
+        for uid in recipients:
+            self._queue.put_nowait((alert, uid))
+        return alert
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self, timeout: float = 10):
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Broadcast beim Beenden abgebrochen, %s Nachrichten offen", self.queue_depth)
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def _wait_for_chat(self, uid):
+        now = time.monotonic()
+        next_at = self._chat_next.get(uid, 0)
+        self._chat_next[uid] = max(now, next_at) + self.chat_interval
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+        if len(self._chat_next) > 10_000:
+            self._chat_next = {k: v for k, v in self._chat_next.items() if v > now}
+
+    async def _worker(self):
+        while True:
+            alert, uid = await self._queue.get()
+            try:
+                ok = await self._send(alert, uid)
+            except Exception as e:
+                logging.warning(f"Fehler beim Senden an {uid}: {e}")
+                ok = False
+            alert._complete_one(ok)
+            self._queue.task_done()
+
+    async def _send(self, alert: Alert, uid) -> bool:
+        message_id = alert.edits.get(uid)
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            await self._wait_for_chat(uid)
+            await self.global_bucket.acquire()
+            start = time.perf_counter()
+            try:
+                if message_id:
+                    await self.bot.edit_message_text(alert.text, uid, message_id, parse_mode=alert.parse_mode)
+                    TELEGRAM_SENDS.inc("edited")
+                else:
+                    message = await self.bot.send_message(uid, alert.text, parse_mode=alert.parse_mode)
+                    TELEGRAM_SENDS.inc("ok")
+                    # message_id nur, wenn der Digest die Nachricht später bearbeiten will
+                    message_id = getattr(message, "message_id", None) if alert.message_ids is not None else None
+                if message_id and alert.message_ids is not None:
+                    alert.message_ids[uid] = message_id
+                return True
+            except MessageNotModified:
+                TELEGRAM_SENDS.inc("edited")
+                return True
+            except EDIT_GONE_ERRORS as e:
+                TELEGRAM_SENDS.inc("edit_failed")
+                logging.info(f"Nachricht {message_id} an {uid} nicht bearbeitbar ({e}), sende neu")
+                message_id = None
+                continue
+            except RetryAfter as e:
+                TELEGRAM_SENDS.inc("retry_after")
+                logging.warning(f"Telegram RetryAfter {e.timeout}s beim Senden an {uid}")
+                self.global_bucket.pause(e.timeout)
+                retry_after = e.timeout
+            except UNREACHABLE_ERRORS as e:
+                TELEGRAM_SENDS.inc("unreachable")
+                logging.info(f"Chat {uid} nicht erreichbar ({e}), wird entfernt")
+                if self.on_unreachable:
+                    self.on_unreachable(uid)
+                return False
+            except TelegramAPIError as e:
+                TELEGRAM_SENDS.inc("error")
+                logging.warning(f"Fehler beim Senden an {uid}: {e}")
+                return False
+            finally:
+                TELEGRAM_LATENCY.observe(time.perf_counter() - start)
+            await asyncio.sleep(retry_after)
+        return False
@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import logging
+import os
+import re
+import time
+from datetime import timedelta, timezone
+
+from credits import attribute
+from helius import helius, REQUEST_ERRORS
+from metrics import BURN_VERIFICATIONS, QUEUE_DEPTH
+from storage import burn_redemptions, premium_users
+
+# Asynchrone Prüfung von Burn-Transaktionen für Premium.
+# Der Handler reserviert nur die Signatur und antwortet sofort; ein Hintergrund-Task fragt
+# getSignatureStatuses (gebündelt, mit Backoff) bis die Transaktion finalisiert ist,
+# prüft dann den Transfer über /v0/transactions und benachrichtigt den Nutzer.
+
+BURN_ADDRESS = "11111111111111111111111111111111"
+BURN_MIN_AMOUNT = int(os.getenv("BURN_MIN_AMOUNT", 100_000))
+BURN_PREMIUM_DAYS = int(os.getenv("BURN_PREMIUM_DAYS", 7))
+BURN_COMMITMENT = os.getenv("BURN_COMMITMENT", "finalized")  # oder "confirmed"
+BURN_POLL_DELAY = float(os.getenv("BURN_POLL_DELAY", 2))
+BURN_POLL_MAX_DELAY = float(os.getenv("BURN_POLL_MAX_DELAY", 60))
+BURN_VERIFY_TIMEOUT = float(os.getenv("BURN_VERIFY_TIMEOUT", 900))
+BURN_STATUS_BATCH = 256  # Obergrenze von getSignatureStatuses
+BURN_TX_BATCH = 100  # Obergrenze von /v0/transactions
+
+SIGNATURE_PATTERN = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{64,90}$")
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+class Pending:
+    __slots__ = ("signature", "user_id", "wallet", "deadline", "attempts", "scheduled")
+
+    def __init__(self, signature: str, user_id: int, wallet: str, deadline: float):
+        self.signature = signature
+        self.user_id = user_id
+        self.wallet = wallet
+        self.deadline = deadline
+        self.attempts = 0
+        self.scheduled = True  # im Heap eingeplant; False zwischen _due() und Abschluss/_retry()
+
+
+def burned_amount(tx: dict, wallet: str, token_mint: str) -> float:
+    # Summe der Tokens, die `wallet` in dieser Transaktion an die Burn-Adresse geschickt hat
+    total = 0.0
+    for transfer in tx.get("tokenTransfers", []):
+        if (
+            transfer.get("mint") == token_mint and
+            transfer.get("fromUserAccount") == wallet and
+            transfer.get("toUserAccount") == BURN_ADDRESS
+        ):
+            total += float(transfer.get("tokenAmount", 0))
+    return total
+
+
+class BurnVerifier:
+    def __init__(self, token_mint: str = None, min_amount: float = None, duration: timedelta = None):
+        self.token_mint = token_mint or os.getenv("SPL_TOKEN_ADDRESS")
+        self.min_amount = min_amount if min_amount is not None else BURN_MIN_AMOUNT
+        self.duration = duration or timedelta(days=BURN_PREMIUM_DAYS)
+        self._pending = {}  # signature -> Pending
+        self._schedule = []  # Heap aus (nächste Prüfung, signature)
+        self._wakeup = asyncio.Event()
+        self._notify = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, signature: str, user_id: int, wallet: str) -> str:
+        # "accepted", "invalid", "pending" (eigene Prüfung läuft) oder "duplicate" (schon eingelöst/fremd)
+        if not SIGNATURE_PATTERN.match(signature):
+            BURN_VERIFICATIONS.inc("invalid")
+            return "invalid"
+        if not burn_redemptions.claim(signature, user_id, wallet):
+            row = burn_redemptions.get(signature)
+            if row and row[0] == user_id and row[1] == "pending":
+                return "pending"
+            BURN_VERIFICATIONS.inc("duplicate")
+            return "duplicate"
+        self._track(signature, user_id, wallet, time.time() + BURN_VERIFY_TIMEOUT)
+        return "accepted"
+
+    def _track(self, signature: str, user_id: int, wallet: str, deadline: float):
+        self._pending[signature] = Pending(signature, user_id, wallet, deadline)
+        heapq.heappush(self._schedule, (time.monotonic() + BURN_POLL_DELAY, signature))
+        self._wakeup.set()
+
+    def _retry(self, item: Pending):
+        item.attempts += 1
+        item.scheduled = True
+        delay = min(BURN_POLL_MAX_DELAY, BURN_POLL_DELAY * 2 ** item.attempts)
+        heapq.heappush(self._schedule, (time.monotonic() + delay, item.signature))
+
+    def _due(self) -> list:
+        now = time.monotonic()
+        due = []
+        while self._schedule and self._schedule[0][0] <= now and len(due) < BURN_STATUS_BATCH:
+            _, signature = heapq.heappop(self._schedule)
+            item = self._pending.get(signature)
+            if item is not None:
+                item.scheduled = False
+                due.append(item)
+        return due
+
+    async def _finish(self, item: Pending, result: str, text: str):
+        if result != "redeemed":
+            burn_redemptions.release(item.signature)
+        self._pending.pop(item.signature, None)
+        BURN_VERIFICATIONS.inc(result)
+        if self._notify:
+            await self._notify(item.user_id, text)
+
+    async def _statuses(self, items: list) -> list:
+        # ohne RPC_URL gilt jede Signatur als "finalized", /v0/transactions entscheidet dann allein
+        if not helius.rpc_url:
+            return [{"confirmationStatus": "finalized", "err": None}] * len(items)
+        result = await helius.rpc(
+            "getSignatureStatuses", [[item.signature for item in items], {"searchTransactionHistory": True}]
+        )
+        value = result.get("value") if isinstance(result, dict) else None
+        if not isinstance(value, list) or len(value) != len(items):
+            return [None] * len(items)
+        return value
+
+    async def check(self, items: list):
+        # eine Runde für fällige Signaturen; jede endet mit _finish() oder _retry(), auch wenn
+        # unterwegs etwas anderes als ein Helius-Fehler auftritt (sonst bliebe sie ewig "pending")
+        try:
+            await self._check(items)
+        finally:
+            for item in items:
+                if not item.scheduled and item.signature in self._pending:
+                    self._retry(item)
+
+    async def _check(self, items: list):
+        # erst Status, dann Transfers der finalisierten
+        wanted = COMMITMENT_LEVELS.get(BURN_COMMITMENT, 2)
+        try:
+            statuses = await self._statuses(items)
+        except REQUEST_ERRORS as e:
+            logging.warning(f"Burn status check failed: {e}")
+            statuses = [None] * len(items)
+
+        confirmed = []
+        for item, status in zip(items, statuses):
+            if status and status.get("err") is not None:
+                await self._finish(item, "failed", "❌ Die Burn-Transaktion ist on-chain fehlgeschlagen.")
+            elif status and COMMITMENT_LEVELS.get(status.get("confirmationStatus"), -1) >= wanted:
+                confirmed.append(item)
+            else:
+                await self._expire_or_retry(item)
+
+        for i in range(0, len(confirmed), BURN_TX_BATCH):
+            batch = confirmed[i:i + BURN_TX_BATCH]
+            try:
+                transactions = await helius.transactions([item.signature for item in batch])
+            except REQUEST_ERRORS as e:
+                logging.warning(f"Burn tx fetch failed: {e}")
+                transactions = []
+            by_signature = {tx.get("signature"): tx for tx in transactions or [] if isinstance(tx, dict)}
+            for item in batch:
+                tx = by_signature.get(item.signature)
+                if tx is None:
+                    await self._expire_or_retry(item)  # finalisiert, aber noch nicht indexiert
+                elif burned_amount(tx, item.wallet, self.token_mint) >= self.min_amount:
+                    await self._redeem(item)
+                else:
+                    amount = f"{self.min_amount:,.0f}".replace(",", ".")
+                    await self._finish(
+                        item, "rejected",
+                        f"❌ Ungültige Transaktion. Stelle sicher, dass du {amount} Tokens "
+                        f"von deiner verifizierten Wallet an die Burn-Adresse gesendet hast.",
+                    )
+
+    async def _expire_or_retry(self, item: Pending):
+        if time.time() >= item.deadline:
+            await self._finish(
+                item, "timeout", "⌛ Die Transaktion wurde nicht rechtzeitig bestätigt. Sende den TX-Hash später erneut."
+            )
+        else:
+            self._retry(item)
+
+    async def _redeem(self, item: Pending):
+        expiry = burn_redemptions.redeem(item.signature, premium_users, self.duration)
+        if expiry is None:
+            # ein anderer Prozess war schneller; der hat den Nutzer schon benachrichtigt
+            self._pending.pop(item.signature, None)
+            return
+        await self._finish(
+            item, "redeemed", f"✅ Burn bestätigt. Premium aktiv bis {expiry:%d.%m.%Y %H:%M} UTC."
+        )
+
+    def resume(self):
+        # nach einem Neustart offene Reservierungen wieder aufnehmen
+        for signature, user_id, wallet, submitted_at in burn_redemptions.pending():
+            if signature not in self._pending:
+                deadline = submitted_at.replace(tzinfo=timezone.utc).timestamp() + BURN_VERIFY_TIMEOUT
+                self._track(signature, user_id, wallet, max(deadline, time.time() + BURN_POLL_DELAY))
+
+    async def run(self, notify):
+        # notify(user_id, text) schickt das Ergebnis an den Nutzer
+        self._notify = notify
+        self.resume()
+        while True:
+            try:
+                if not self._schedule:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                delay = self._schedule[0][0] - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                due = self._due()
+                if due:
+                    with attribute("burn"):
+                        await self.check(due)
+            except Exception as e:
+                logging.error(f"Burn verifier error: {e}")
+                await asyncio.sleep(BURN_POLL_DELAY)
+
+
+burns = BurnVerifier()
+QUEUE_DEPTH.set_function(lambda: burns.queue_depth, "burns")
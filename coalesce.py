@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+# Bündelt gleichzeitige Lookups: identische Anfragen teilen sich einen Aufruf (Single-Flight),
+# verschiedene Schlüssel innerhalb eines kurzen Fensters gehen als ein Batch-Request raus.
+
+COALESCE_WINDOW_MS = float(os.getenv("COALESCE_WINDOW_MS", 5))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}  # key -> future
+
+    async def do(self, key, fn):
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
+
+
+class BatchLoader:
+    def __init__(self, batch_fn, window_ms=None, max_batch: int = 100):
+        # batch_fn(keys) -> dict key -> value; fehlende Schlüssel werden als KeyError gemeldet
+        self.batch_fn = batch_fn
+        self.window = (window_ms if window_ms is not None else COALESCE_WINDOW_MS) / 1000
+        self.max_batch = max_batch
+        self._pending = {}  # key -> future, bis das Ergebnis da ist
+        self._batch = []
+        self._timer = None
+        self.batches = 0
+        self.keys_loaded = 0
+
+    async def load(self, key):
+        fut = self._pending.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._pending[key] = fut
+            self._batch.append(key)
+            if len(self._batch) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        return await asyncio.shield(fut)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        keys, self._batch = self._batch, []
+        if keys:
+            asyncio.ensure_future(self._run(keys))
+
+    async def _run(self, keys):
+        self.batches += 1
+        self.keys_loaded += len(keys)
+        try:
+            results = await self.batch_fn(keys)
+        except Exception as e:
+            results = None
+            error = e
+        for key in keys:
+            fut = self._pending.pop(key)
+            if fut.done():
+                continue
+            if results is not None and key in results:
+                fut.set_result(results[key])
+                continue
+            fut.set_exception(error if results is None else KeyError(key))
+            # als abgeholt markieren, falls alle Aufrufer inzwischen abgebrochen wurden
+            fut.exception()
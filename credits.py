@@ -0,0 +1,189 @@
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from metrics import HELIUS_BYTES, HELIUS_CREDITS, HELIUS_CREDIT_USAGE, HELIUS_SHED
+
+# Credit-Abrechnung für Helius pro Aufrufstelle.
+# Jede Aufrufstelle setzt ihren Zweck (attribute("metadata") usw.), der Client ordnet jeden
+# Request diesem Zweck zu und zählt Requests, geschätzte Credits und Antwort-Bytes in einem
+# gleitenden Fenster. Budgets pro Zweck und ein Gesamtbudget werden vor dem Senden geprüft;
+# nähert sich das Gesamtbudget dem Limit, fallen zuerst niedrige Prioritäten (Balance) weg.
+# Die Zähler gelten pro Prozess: Bot und Webhook bekommen jeweils eigene Budgets.
+
+HELIUS_CREDIT_WINDOW = float(os.getenv("HELIUS_CREDIT_WINDOW", 86400))  # Sekunden
+HELIUS_CREDIT_BUCKETS = 96  # Auflösung des gleitenden Fensters
+HELIUS_CREDIT_BUDGET = float(os.getenv("HELIUS_CREDIT_BUDGET", 0))  # pro Fenster, 0 = unbegrenzt
+HELIUS_CREDIT_SHED_LOW = float(os.getenv("HELIUS_CREDIT_SHED_LOW", 0.8))  # Anteil, ab dem Balance & Co. wegfallen
+HELIUS_CREDIT_SHED_NORMAL = float(os.getenv("HELIUS_CREDIT_SHED_NORMAL", 0.95))
+
+
+def _parse_mapping(raw: str) -> dict:
+    # "balance=2000,poller=50000" -> {"balance": 2000.0, "poller": 50000.0}
+    mapping = {}
+    for item in raw.split(","):
+        key, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            mapping[key.strip()] = float(value)
+        except ValueError:
+            logging.warning(f"Ungültiger Eintrag in Credit-Konfiguration: {item}")
+    return mapping
+
+
+# Budget pro Zweck und Fenster, z.B. HELIUS_CREDIT_BUDGETS="balance=2000,holder_recheck=5000"
+HELIUS_CREDIT_BUDGETS = _parse_mapping(os.getenv("HELIUS_CREDIT_BUDGETS", ""))
+
+# Geschätzte Credits pro Request nach Endpoint (Helius-Preisliste, per HELIUS_CREDIT_COSTS anpassbar);
+# RPC-Methoden kosten 1 Credit, ein JSON-RPC-Batch so viel wie seine Einzelaufrufe
+CREDIT_COSTS = {
+    "address_transactions": 100,
+    "transactions": 100,
+    "balances": 100,
+    "recent_tokens": 100,
+    "token_metadata": 10,
+    **_parse_mapping(os.getenv("HELIUS_CREDIT_COSTS", "")),
+}
+DEFAULT_COST = 1
+
+# Zweck -> Priorität; 0 wird nie abgewiesen (vom Nutzer bezahlte Burn-Prüfung)
+CRITICAL, DETECTION, NORMAL, LOW = 0, 1, 2, 3
+PRIORITIES = {
+    "burn": CRITICAL,
+    "poller": DETECTION,
+    "stream": DETECTION,
+    "mint_timestamp": DETECTION,
+    "metadata": DETECTION,
+    "holding": NORMAL,
+    "other": NORMAL,
+    "balance": LOW,
+    "holder_recheck": LOW,
+}
+SHED_AT = {DETECTION: 1.0, NORMAL: HELIUS_CREDIT_SHED_NORMAL, LOW: HELIUS_CREDIT_SHED_LOW}
+
+_purpose = contextvars.ContextVar("helius_purpose", default="other")
+
+
+@contextmanager
+def attribute(purpose: str):
+    # alle Helius-Requests in diesem Block (auch in dabei gestarteten Tasks) zählen für `purpose`
+    token = _purpose.set(purpose)
+    try:
+        yield
+    finally:
+        _purpose.reset(token)
+
+
+def current_purpose() -> str:
+    return _purpose.get()
+
+
+class CreditLedger:
+    def __init__(self, budget: float = None, budgets: dict = None, window: float = None):
+        self.budget = budget if budget is not None else HELIUS_CREDIT_BUDGET
+        self.budgets = dict(HELIUS_CREDIT_BUDGETS if budgets is None else budgets)
+        self.window = window or HELIUS_CREDIT_WINDOW
+        self.bucket_width = self.window / HELIUS_CREDIT_BUCKETS
+        self._buckets = {}  # bucket -> {purpose: [requests, credits, bytes]}
+        self._totals = {}  # purpose -> [requests, credits, bytes] im Fenster
+        self.shed = {}  # purpose -> abgewiesene Requests seit Start
+
+    def cost(self, endpoint: str, body=None) -> float:
+        if endpoint.startswith("rpc:"):
+            return DEFAULT_COST * (len(body) if isinstance(body, list) else 1)
+        return CREDIT_COSTS.get(endpoint, DEFAULT_COST)
+
+    def _prune(self, now: float):
+        oldest = int((now - self.window) / self.bucket_width)
+        for bucket in [b for b in self._buckets if b <= oldest]:
+            for purpose, values in self._buckets.pop(bucket).items():
+                totals = self._totals[purpose]
+                for i, value in enumerate(values):
+                    totals[i] -= value
+
+    def _add(self, purpose: str, requests: int, credits: float, nbytes: int):
+        now = time.time()
+        self._prune(now)
+        bucket = self._buckets.setdefault(int(now / self.bucket_width), {})
+        if purpose not in self._totals:
+            self._totals[purpose] = [0, 0.0, 0]
+            HELIUS_CREDIT_USAGE.set_function(lambda: self.used(purpose), purpose)
+        for values in (bucket.setdefault(purpose, [0, 0.0, 0]), self._totals[purpose]):
+            values[0] += requests
+            values[1] += credits
+            values[2] += nbytes
+
+    def used(self, purpose: str = None) -> float:
+        # Credits im aktuellen Fenster, für einen Zweck oder gesamt
+        self._prune(time.time())
+        if purpose is not None:
+            return self._totals.get(purpose, (0, 0.0, 0))[1]
+        return sum(values[1] for values in self._totals.values())
+
+    def check(self, purpose: str, cost: float):
+        # None, wenn der Request raus darf, sonst der Grund der Abweisung
+        priority = PRIORITIES.get(purpose, NORMAL)
+        if priority == CRITICAL:
+            return None
+        budget = self.budgets.get(purpose)
+        if budget is not None and self.used(purpose) + cost > budget:
+            return f"credit budget for {purpose} exhausted"
+        if self.budget and self.used() + cost > self.budget * SHED_AT[priority]:
+            return f"credit quota {self.used():.0f}/{self.budget:.0f} reached for {purpose}"
+        return None
+
+    def admit(self, purpose: str, endpoint: str, cost: float):
+        # vor dem Senden: prüfen und gleich verbuchen (Credits fallen auch bei Fehlern an)
+        refused = self.check(purpose, cost)
+        if refused:
+            self.shed[purpose] = self.shed.get(purpose, 0) + 1
+            HELIUS_SHED.inc(purpose)
+            return refused
+        self._add(purpose, 1, cost, 0)
+        HELIUS_CREDITS.inc(purpose, endpoint, amount=cost)
+        return None
+
+    def received(self, purpose: str, nbytes: int):
+        self._add(purpose, 0, 0.0, nbytes)
+        HELIUS_BYTES.inc(purpose, amount=nbytes)
+
+    def usage(self) -> dict:
+        self._prune(time.time())
+        purposes = {
+            purpose: {
+                "requests": values[0],
+                "credits": values[1],
+                "bytes": values[2],
+                "budget": self.budgets.get(purpose),
+                "shed": self.shed.get(purpose, 0),
+            }
+            for purpose, values in sorted(self._totals.items(), key=lambda item: -item[1][1])
+        }
+        for purpose, count in self.shed.items():
+            purposes.setdefault(purpose, {"requests": 0, "credits": 0.0, "bytes": 0,
+                                          "budget": self.budgets.get(purpose), "shed": count})
+        return {"window_seconds": self.window, "budget": self.budget or None, "used": self.used(), "purposes": purposes}
+
+
+def usage_text(ledger: CreditLedger) -> str:
+    # Übersicht für den Admin-Befehl /credits
+    usage = ledger.usage()
+    hours = usage["window_seconds"] / 3600
+    total = f"{usage['used']:.0f}" + (f" / {usage['budget']:.0f}" if usage["budget"] else "")
+    lines = [f"💳 Helius-Credits (letzte {hours:g} h): {total}"]
+    for purpose, row in usage["purposes"].items():
+        budget = f" / {row['budget']:.0f}" if row["budget"] is not None else ""
+        shed = f", {row['shed']} abgewiesen" if row["shed"] else ""
+        lines.append(
+            f"• {purpose}: {row['credits']:.0f}{budget} Credits, {row['requests']} Requests, "
+            f"{row['bytes'] / 1024:.1f} KiB{shed}"
+        )
+    if not usage["purposes"]:
+        lines.append("Noch keine Requests.")
+    return "\n".join(lines)
+
+
+credits = CreditLedger()
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import time
+
+from metrics import ALERT_DIGEST, QUEUE_DEPTH
+from premium import premium
+
+# Digest-Modus gegen Nachrichtenfluten bei Launch-Wellen (ALERT_DIGEST_SECONDS > 0).
+# Pro Nutzer geht höchstens eine Nachricht pro Fenster raus: der erste Alert nach einer Ruhephase
+# sofort, alle weiteren im Fenster gesammelt als eine Nachricht (Token nach größtem Kauf sortiert,
+# pro Token die größten Käufe). Betrifft ein Digest nur Token, die schon in einer Nachricht der
+# letzten ALERT_DIGEST_EDIT_SECONDS standen, wird diese mit edit_message_text aktualisiert statt neu gesendet
+# (nur mit dem Broadcaster im eigenen Prozess, die Shards melden keine message_ids).
+# Premium-Nutzer bekommen weiterhin jeden Alert sofort (ALERT_DIGEST_PREMIUM_INSTANT).
+
+ALERT_DIGEST_SECONDS = float(os.getenv("ALERT_DIGEST_SECONDS", 0))  # 0 = jeder Alert sofort
+ALERT_DIGEST_EDIT_SECONDS = float(os.getenv("ALERT_DIGEST_EDIT_SECONDS", 600))  # 0 = nie bearbeiten
+ALERT_DIGEST_PREMIUM_INSTANT = os.getenv("ALERT_DIGEST_PREMIUM_INSTANT", "1") == "1"
+ALERT_DIGEST_TOP_TOKENS = int(os.getenv("ALERT_DIGEST_TOP_TOKENS", 5))
+ALERT_DIGEST_TOP_BUYS = 3  # Käufe pro Token im Text
+ALERT_DIGEST_MAX_ALERTS = 50  # pro Nachricht gemerkt, für spätere Bearbeitungen
+DIGEST_TICK = 1.0  # Sekunden zwischen Prüfungen auf fällige Digests
+DIGEST_PRUNE_INTERVAL = 60.0
+
+
+def render(alerts) -> str:
+    # Alerts eines Nutzers -> eine Nachricht, Token nach größtem Kauf sortiert
+    by_mint = {}
+    for alert in alerts:
+        by_mint.setdefault(alert.mint, []).append(alert)
+    tokens = sorted(by_mint.values(), key=lambda group: -max(a.sol for a in group))
+    lines = [f"🐋 *Whale-Digest*: {len(alerts)} Alerts zu {len(tokens)} Token"]
+    for group in tokens[:ALERT_DIGEST_TOP_TOKENS]:
+        top = sorted(group, key=lambda a: -a.sol)[:ALERT_DIGEST_TOP_BUYS]
+        buys = ", ".join(f"{a.sol:.2f}" for a in top)
+        more = f" (+{len(group) - len(top)})" if len(group) > len(top) else ""
+        age = min(a.age_minutes for a in group)
+        lines.append(f"• `{group[0].symbol or group[0].mint}`: {buys} SOL{more} · ⏱️ {int(age)} Min")
+    if len(tokens) > ALERT_DIGEST_TOP_TOKENS:
+        lines.append(f"… und {len(tokens) - ALERT_DIGEST_TOP_TOKENS} weitere Token")
+    return "\n".join(lines)
+
+
+class Sent:
+    __slots__ = ("broadcast", "alerts", "at")
+
+    def __init__(self, alerts: tuple, at: float):
+        self.broadcast = None  # Broadcast-Alert der Nachricht, liefert die message_id
+        self.alerts = alerts  # aktueller Inhalt
+        self.at = at
+
+
+class Inbox:
+    __slots__ = ("pending", "origin", "due", "sent_at", "messages")
+
+    def __init__(self):
+        self.pending = []  # gesammelte WhaleAlerts
+        self.origin = None  # früheste Block-Zeit der gesammelten Alerts
+        self.due = None
+        self.sent_at = 0.0  # letzte Nachricht oder Bearbeitung
+        self.messages = {}  # mint -> Sent, letzte Nachricht mit diesem Token
+
+
+class AlertDigest:
+    def __init__(self, broadcaster, parse_mode=None, name: str = "digest", window: float = None,
+                 edit_window: float = None, premium_instant: bool = None):
+        self.broadcaster = broadcaster  # callable -> Broadcaster/ShardedBroadcaster (lazy im Webhook)
+        self.parse_mode = parse_mode
+        self.window = window if window is not None else ALERT_DIGEST_SECONDS
+        self.edit_window = edit_window if edit_window is not None else ALERT_DIGEST_EDIT_SECONDS
+        self.premium_instant = ALERT_DIGEST_PREMIUM_INSTANT if premium_instant is None else premium_instant
+        self._inboxes = {}  # uid -> Inbox
+        self._due = set()  # uids mit gesammelten Alerts
+        self._task = None
+        self._pruned_at = 0.0
+        self.alerts = 0  # Alerts pro Empfänger
+        self.instant = 0
+        self.messages = 0
+        self.edits = 0
+        QUEUE_DEPTH.set_function(lambda: sum(len(self._inboxes[uid].pending) for uid in self._due), name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def deliver(self, alert, origin: float = None):
+        # Ersatz für broadcaster.enqueue in der Pipeline: deliver(alert, origin)
+        if not self.enabled:
+            self.broadcaster().enqueue(alert.text, alert.recipients, parse_mode=self.parse_mode, origin=origin)
+            return
+        self._ensure_task()
+        now = time.monotonic()
+        instant, ready = [], []
+        for uid in alert.recipients:
+            if self.premium_instant and premium.is_premium(uid):
+                instant.append(uid)
+                continue
+            inbox = self._inboxes.get(uid)
+            if inbox is None:
+                inbox = self._inboxes[uid] = Inbox()
+            inbox.pending.append(alert)
+            if origin and (inbox.origin is None or origin < inbox.origin):
+                inbox.origin = origin
+            if inbox.due is None:
+                # nach einer Ruhephase sofort, sonst ein Fenster nach der letzten Nachricht
+                inbox.due = max(now, inbox.sent_at + self.window)
+                self._due.add(uid)
+                if inbox.due <= now:
+                    ready.append(uid)
+        self.alerts += len(alert.recipients) - len(instant)
+        ALERT_DIGEST.inc("queued", amount=len(alert.recipients) - len(instant))
+        if instant:
+            self.instant += len(instant)
+            ALERT_DIGEST.inc("instant", amount=len(instant))
+            self.broadcaster().enqueue(alert.text, instant, parse_mode=self.parse_mode, origin=origin)
+        if ready:
+            self._flush(ready, now)
+
+    def _flush(self, uids, now: float):
+        # fällige Nutzer mit gleichem Text zu einem Broadcast zusammenfassen
+        groups = {}  # (text, bearbeiten) -> [empfänger, edits, origin, inboxes]
+        texts = {}  # Alert-Kombination -> Text, viele Nutzer bekommen dieselben Alerts
+        for uid in uids:
+            inbox = self._inboxes[uid]
+            self._due.discard(uid)
+            pending, inbox.pending, inbox.due = inbox.pending, [], None
+            if not pending:
+                continue
+            message, message_id = self._editable(uid, inbox, pending, now)
+            alerts = tuple(pending)
+            if message_id:
+                alerts = message.alerts + alerts
+                if len(alerts) > ALERT_DIGEST_MAX_ALERTS:
+                    alerts = tuple(sorted(alerts, key=lambda a: -a.sol)[:ALERT_DIGEST_MAX_ALERTS])
+                message.alerts = alerts
+            else:
+                message = Sent(alerts, now)
+                for alert in alerts:
+                    inbox.messages[alert.mint] = message
+            key = tuple(map(id, alerts))
+            text = texts.get(key)
+            if text is None:
+                text = texts[key] = alerts[0].text if len(alerts) == 1 else render(alerts)
+            group = groups.setdefault((text, bool(message_id)), [[], {}, None, []])
+            group[0].append(uid)
+            if message_id:
+                group[1][uid] = message_id
+            if inbox.origin and (group[2] is None or inbox.origin < group[2]):
+                group[2] = inbox.origin
+            inbox.origin = None
+            inbox.sent_at = now
+            group[3].append(message)
+
+        broadcaster = self.broadcaster()
+        for (text, edit), (recipients, edits, origin, messages) in groups.items():
+            sent = broadcaster.enqueue(text, recipients, parse_mode=self.parse_mode, origin=origin,
+                                       edits=edits or None, track=self.edit_window > 0)
+            if edit:
+                self.edits += len(recipients)
+                ALERT_DIGEST.inc("edit", amount=len(recipients))
+                continue
+            self.messages += len(recipients)
+            ALERT_DIGEST.inc("message", amount=len(recipients))
+            for message in messages:
+                message.broadcast = sent
+
+    def _editable(self, uid, inbox: Inbox, pending: list, now: float):
+        # (Sent, message_id), wenn alle neuen Alerts Token einer noch bearbeitbaren Nachricht betreffen
+        if not self.edit_window:
+            return None, None
+        messages = {inbox.messages.get(alert.mint) for alert in pending}
+        if len(messages) != 1:
+            return None, None
+        message = messages.pop()
+        if message is None or message.broadcast is None or now - message.at > self.edit_window:
+            return None, None
+        message_ids = getattr(message.broadcast, "message_ids", None)  # ShardedAlert kennt keine
+        message_id = message_ids.get(uid) if message_ids else None
+        return (message, message_id) if message_id else (None, None)
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(DIGEST_TICK)
+            try:
+                now = time.monotonic()
+                due = [uid for uid in self._due if self._inboxes[uid].due <= now]
+                if due:
+                    self._flush(due, now)
+                self._prune(now)
+            except Exception as e:
+                logging.error(f"Digest error: {e}")
+
+    def _prune(self, now: float):
+        # nicht mehr bearbeitbare Nachrichten und Nutzer ohne offene Alerts außerhalb des Fensters
+        if now - self._pruned_at < DIGEST_PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        stale = []
+        for uid, inbox in self._inboxes.items():
+            for mint in [m for m, message in inbox.messages.items() if now - message.at > self.edit_window]:
+                del inbox.messages[mint]
+            if inbox.due is None and not inbox.messages and now - inbox.sent_at > self.window:
+                stale.append(uid)
+        for uid in stale:
+            del self._inboxes[uid]
+
+    def flush(self):
+        # alles Gesammelte sofort senden (Shutdown, Replay)
+        if self._due:
+            self._flush(list(self._due), time.monotonic())
+
+    async def close(self):
+        self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "users": len(self._inboxes),
+            "pending": sum(len(self._inboxes[uid].pending) for uid in self._due),
+            "alerts": self.alerts,
+            "instant": self.instant,
+            "messages": self.messages,
+            "edits": self.edits,
+        }
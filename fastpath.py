@@ -0,0 +1,39 @@
+import json
+
+# Schneller Vorfilter für Webhook-Bodies: erst auf Bytes prüfen, dann einmal parsen.
+# orjson ist optional (pip install orjson), sonst json aus der Standardbibliothek.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    orjson = None
+
+CANDIDATE_TYPES = (b'"SWAP"', b'"BUY"', b'"CREATE"', b'"TOKEN_MINT"')  # Creates für das Mint-Register
+
+
+def loads(body: bytes):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def may_contain_candidates(body: bytes) -> bool:
+    # Ohne "SWAP"/"BUY" (oder ein Create) irgendwo im Body ist keine Zustellung ein Kandidat; falsch positive
+    # Treffer (z.B. in Instruktionsdaten) landen nur im normalen Pfad
+    return any(marker in body for marker in CANDIDATE_TYPES)
+
+
+def deliveries(body: bytes) -> list:
+    # Helius schickt einzelne Transaktionen oder Arrays; ValueError bei ungültigem JSON
+    data = loads(body)
+    if isinstance(data, dict):
+        return [data]
+    if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+        return data
+    raise ValueError("expected a transaction object or an array of transactions")
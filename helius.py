@@ -0,0 +1,295 @@
+import asyncio
+import os
+import random
+import time
+from json import loads
+from typing import Optional
+
+import aiohttp
+
+from credits import credits, current_purpose
+from metrics import HELIUS_GUARDS, HELIUS_LATENCY, HELIUS_ERRORS, HELIUS_RETRIES
+from resilience import AdaptiveLimiter, CircuitBreaker, EndpointGuard, RetryBudget, OPEN, HALF_OPEN
+
+# Ein gemeinsamer, asynchroner Helius-Client für Bot und Webhook.
+# Eine Session mit Keep-Alive-Pool, damit langsame Antworten den Event-Loop nicht blockieren.
+# Pro Endpoint ein Circuit Breaker (5xx, Timeouts, Verbindungsfehler) und eine adaptive
+# Nebenläufigkeit (halbiert bei 429 und Timeouts, siehe resilience.py); 429, 5xx und
+# Timeouts werden mit Jitter bzw. nach Retry-After wiederholt, solange das Retry-Budget reicht.
+
+DEFAULT_BASE_URL = "https://api.helius.xyz"
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POOL_SIZE = 50
+
+HELIUS_RESILIENCE = os.getenv("HELIUS_RESILIENCE", "1") == "1"
+HELIUS_MAX_RETRIES = int(os.getenv("HELIUS_MAX_RETRIES", 3))
+HELIUS_RETRY_BASE = float(os.getenv("HELIUS_RETRY_BASE", 0.2))
+HELIUS_RETRY_CAP = float(os.getenv("HELIUS_RETRY_CAP", 5))
+HELIUS_RETRY_DEADLINE = float(os.getenv("HELIUS_RETRY_DEADLINE", 15))  # Sekunden ab dem ersten Versuch
+HELIUS_RETRY_RATIO = float(os.getenv("HELIUS_RETRY_RATIO", 0.1))
+HELIUS_RETRY_MIN_PER_SECOND = float(os.getenv("HELIUS_RETRY_MIN_PER_SECOND", 1))
+HELIUS_BREAKER_FAILURES = int(os.getenv("HELIUS_BREAKER_FAILURES", 5))
+HELIUS_BREAKER_COOLDOWN = float(os.getenv("HELIUS_BREAKER_COOLDOWN", 2))
+HELIUS_BREAKER_MAX_COOLDOWN = float(os.getenv("HELIUS_BREAKER_MAX_COOLDOWN", 60))
+HELIUS_CONCURRENCY = int(os.getenv("HELIUS_CONCURRENCY", 16))  # Startwert pro Endpoint
+HELIUS_LATENCY_TARGET = float(os.getenv("HELIUS_LATENCY_TARGET", 2.0))
+HELIUS_QUEUE_TIMEOUT = float(os.getenv("HELIUS_QUEUE_TIMEOUT", 2.0))  # max. Wartezeit auf einen freien Slot
+
+BREAKER_STATES = {OPEN: 2, HALF_OPEN: 1}
+
+
+def _retry_after(value) -> Optional[float]:
+    # nur die Sekunden-Form; HTTP-Datumsangaben nutzt Helius nicht
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class HeliusError(Exception):
+    def __init__(self, status: int, path: str, body: str = "", retry_after: float = None):
+        super().__init__(f"Helius {path} returned {status}: {body[:200]}")
+        self.status = status
+        self.path = path
+        self.body = body
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+class HeliusUnavailableError(HeliusError):
+    # kein Request gesendet, weil der Client Helius gerade schont; nicht als Ergebnis cachen
+    def __init__(self, path: str, reason: str, retry_after: float = None):
+        super().__init__(0, path, reason, retry_after=retry_after)
+
+
+class BudgetExceededError(HeliusUnavailableError):
+    # Credit-Budget des Zwecks oder das Gesamtbudget ist erreicht (credits.py)
+    def __init__(self, path: str, reason: str):
+        super().__init__(path, reason)
+
+
+class CircuitOpenError(HeliusUnavailableError):
+    # der Endpoint ist nach wiederholten Fehlern gesperrt
+    def __init__(self, path: str, retry_in: float):
+        super().__init__(path, f"circuit open, retry in {retry_in:.1f}s", retry_after=retry_in)
+
+
+class HeliusClient:
+    def __init__(self, api_key=None, base_url=None, rpc_url=None, timeout=None, pool_size=None, resilient=None):
+        # Werte aus der Umgebung erst bei Benutzung lesen, damit load_dotenv() vorher laufen kann
+        self._api_key = api_key
+        self._base_url = base_url
+        self._rpc_url = rpc_url
+        self._timeout = timeout
+        self._pool_size = pool_size
+        self._session = None
+        self._lock = asyncio.Lock()
+        self.resilient = HELIUS_RESILIENCE if resilient is None else resilient
+        self.retry_budget = RetryBudget(HELIUS_RETRY_RATIO, HELIUS_RETRY_MIN_PER_SECOND)
+        self._guards = {}  # endpoint -> EndpointGuard
+
+    @property
+    def api_key(self):
+        return self._api_key or os.getenv("HELIUS_API_KEY")
+
+    @property
+    def base_url(self):
+        return (self._base_url or os.getenv("HELIUS_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+
+    @property
+    def rpc_url(self):
+        return self._rpc_url or os.getenv("RPC_URL")
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout or float(os.getenv("HELIUS_TIMEOUT", DEFAULT_TIMEOUT))
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    pool_size = self._pool_size or int(os.getenv("HELIUS_POOL_SIZE", DEFAULT_POOL_SIZE))
+                    connector = aiohttp.TCPConnector(limit=pool_size, ttl_dns_cache=300, keepalive_timeout=60)
+                    self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def warm_up(self, timeout: float = 5.0):
+        # DNS und TLS-Verbindungen vorab aufbauen (HEAD kostet keine Credits); Fehler sind egal
+        session = await self.session()
+        for url in filter(None, (self.base_url, self.rpc_url)):
+            try:
+                async with session.head(url, timeout=aiohttp.ClientTimeout(total=timeout)):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def guard(self, endpoint: str) -> EndpointGuard:
+        guard = self._guards.get(endpoint)
+        if guard is None:
+            pool_size = self._pool_size or int(os.getenv("HELIUS_POOL_SIZE", DEFAULT_POOL_SIZE))
+            guard = self._guards[endpoint] = EndpointGuard(
+                endpoint,
+                CircuitBreaker(endpoint, HELIUS_BREAKER_FAILURES, HELIUS_BREAKER_COOLDOWN, HELIUS_BREAKER_MAX_COOLDOWN),
+                AdaptiveLimiter(min(HELIUS_CONCURRENCY, pool_size), 1, pool_size, HELIUS_LATENCY_TARGET),
+            )
+            HELIUS_GUARDS.set_function(lambda: guard.limiter.limit, endpoint, "limit")
+            HELIUS_GUARDS.set_function(lambda: guard.limiter.inflight, endpoint, "inflight")
+            HELIUS_GUARDS.set_function(lambda: BREAKER_STATES.get(guard.breaker.state, 0), endpoint, "breaker")
+        return guard
+
+    def stats(self) -> dict:
+        return {endpoint: guard.stats() for endpoint, guard in self._guards.items()}
+
+    async def _send(self, method: str, url: str, endpoint: str, *, params=None, json=None, timeout=None):
+        purpose = current_purpose()
+        refused = credits.admit(purpose, endpoint, credits.cost(endpoint, json))
+        if refused:
+            HELIUS_ERRORS.inc(endpoint, "budget")
+            raise BudgetExceededError(endpoint, refused)
+        session = await self.session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        start = time.perf_counter()
+        try:
+            async with session.request(method, url, params=params, json=json, timeout=client_timeout) as resp:
+                body = await resp.read()
+                credits.received(purpose, len(body))
+                if resp.status != 200:
+                    HELIUS_ERRORS.inc(endpoint, str(resp.status))
+                    raise HeliusError(
+                        resp.status, endpoint, body.decode(errors="replace"),
+                        retry_after=_retry_after(resp.headers.get("Retry-After")),
+                    )
+                return loads(body) if body.strip() else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            HELIUS_ERRORS.inc(endpoint, type(e).__name__)
+            raise
+        finally:
+            HELIUS_LATENCY.observe(time.perf_counter() - start, endpoint)
+
+    async def _request(self, method: str, url: str, endpoint: str, *, params=None, json=None, timeout=None):
+        if not self.resilient:
+            return await self._send(method, url, endpoint, params=params, json=json, timeout=timeout)
+        guard = self.guard(endpoint)
+        deadline = time.monotonic() + HELIUS_RETRY_DEADLINE
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            if not guard.breaker.allow():
+                HELIUS_ERRORS.inc(endpoint, "circuit_open")
+                raise CircuitOpenError(endpoint, guard.breaker.retry_in())
+            try:
+                await asyncio.wait_for(
+                    guard.limiter.acquire(), max(0.0, min(HELIUS_QUEUE_TIMEOUT, deadline - time.monotonic()))
+                )
+            except asyncio.TimeoutError:
+                HELIUS_ERRORS.inc(endpoint, "concurrency_limit")
+                raise HeliusUnavailableError(endpoint, f"concurrency limit {int(guard.limiter.limit)} reached") from None
+            start = time.monotonic()
+            try:
+                result = await self._send(method, url, endpoint, params=params, json=json, timeout=timeout)
+            except HeliusUnavailableError:
+                raise  # nichts gesendet (Budget), sagt nichts über den Endpoint aus
+            except HeliusError as e:
+                error, retry_after = e, e.retry_after
+                if not e.retryable or e.status == 429:
+                    # Helius antwortet: 4xx liegt an der Anfrage, 429 ist ein Ratensignal für das Limit
+                    guard.breaker.success()
+                    if not e.retryable:
+                        raise
+                    guard.limiter.decrease()
+                else:
+                    guard.breaker.failure(retry_after)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error, retry_after = e, None
+                if isinstance(e, asyncio.TimeoutError):
+                    guard.limiter.decrease()
+                guard.breaker.failure()
+            else:
+                guard.limiter.on_success(time.monotonic() - start)
+                guard.breaker.success()
+                return result
+            finally:
+                await guard.limiter.release()
+
+            attempt += 1
+            # volles Jitter, mindestens Retry-After
+            delay = max(retry_after or 0.0, random.uniform(0, min(HELIUS_RETRY_CAP, HELIUS_RETRY_BASE * 2 ** attempt)))
+            if (
+                attempt > HELIUS_MAX_RETRIES
+                or time.monotonic() + delay > deadline
+                or not self.retry_budget.can_retry()
+            ):
+                raise error
+            HELIUS_RETRIES.inc(endpoint)
+            await asyncio.sleep(delay)
+
+    async def api(self, method: str, path: str, *, params=None, json=None, timeout=None, endpoint=None):
+        query = {k: v for k, v in (params or {}).items() if v is not None}
+        if self.api_key:
+            query["api-key"] = self.api_key
+        return await self._request(
+            method, f"{self.base_url}{path}", endpoint or path, params=query, json=json, timeout=timeout
+        )
+
+    async def rpc(self, method: str, params=None, timeout=None):
+        if not self.rpc_url:
+            raise HeliusError(0, method, "RPC_URL not configured")
+        body = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}
+        data = await self._request("POST", self.rpc_url, f"rpc:{method}", json=body, timeout=timeout)
+        if not isinstance(data, dict):  # leerer Body oder JSON null
+            raise HeliusError(200, method, f"unexpected RPC response: {data!r}")
+        if "error" in data:
+            raise HeliusError(200, method, str(data["error"]))
+        return data.get("result")
+
+    async def rpc_batch(self, calls, timeout=None):
+        # calls: Liste von (method, params); Ergebnis in gleicher Reihenfolge, Fehler als HeliusError-Objekt
+        if not self.rpc_url:
+            raise HeliusError(0, "batch", "RPC_URL not configured")
+        body = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, (method, params) in enumerate(calls)]
+        data = await self._request("POST", self.rpc_url, "rpc:batch", json=body, timeout=timeout)
+        if not isinstance(data, list):
+            raise HeliusError(200, "batch", f"unexpected RPC response: {data!r}")
+        results = [None] * len(calls)
+        for item in data:
+            if "error" in item:
+                results[item["id"]] = HeliusError(200, calls[item["id"]][0], str(item["error"]))
+            else:
+                results[item["id"]] = item.get("result")
+        return results
+
+    async def address_transactions(self, address: str, *, before=None, until=None, limit=None, timeout=None):
+        params = {"before": before, "until": until, "limit": limit}
+        return await self.api(
+            "GET", f"/v0/addresses/{address}/transactions", params=params, timeout=timeout, endpoint="address_transactions"
+        )
+
+    async def balances(self, wallet: str, timeout=None):
+        return await self.api("GET", f"/v0/addresses/{wallet}/balances", timeout=timeout, endpoint="balances")
+
+    async def token_metadata(self, mints, timeout=None):
+        return await self.api(
+            "POST", "/v0/tokens/metadata", json={"mintAccounts": list(mints)}, timeout=timeout, endpoint="token_metadata"
+        )
+
+    async def transactions(self, signatures, timeout=None):
+        return await self.api(
+            "POST", "/v0/transactions/", json={"transactions": list(signatures)}, timeout=timeout, endpoint="transactions"
+        )
+
+    async def recent_tokens(self, timeout=None):
+        return await self.api("GET", "/v0/tokens/recent", timeout=timeout, endpoint="recent_tokens")
+
+
+# Fehler, die bei einem Helius-Aufruf erwartet werden und vom Aufrufer behandelt werden
+REQUEST_ERRORS = (HeliusError, aiohttp.ClientError, asyncio.TimeoutError, ValueError)
+
+helius = HeliusClient()
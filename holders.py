@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+import time
+
+from coalesce import SingleFlight
+from credits import attribute
+from helius import helius, HeliusError, REQUEST_ERRORS
+from metrics import CACHE_STATS
+
+# Token-Gating mit kurzlebigem Balance-Cache pro Wallet.
+# Interaktive Befehle antworten aus dem Cache; ein Hintergrund-Task prüft alle
+# verifizierten Wallets in Batches (getTokenAccountsByOwner auf RPC_URL) und entzieht den Zugang.
+
+HOLDER_CACHE_TTL = float(os.getenv("HOLDER_CACHE_TTL", 300))
+HOLDER_MIN_AMOUNT = float(os.getenv("HOLDER_MIN_AMOUNT", 10_000))
+HOLDER_RECHECK_INTERVAL = float(os.getenv("HOLDER_RECHECK_INTERVAL", 600))
+HOLDER_RECHECK_BATCH = int(os.getenv("HOLDER_RECHECK_BATCH", 50))
+
+
+def _amount_from_token_accounts(result) -> float:
+    total = 0.0
+    for account in (result or {}).get("value", []):
+        info = account["account"]["data"]["parsed"]["info"]
+        total += float(info["tokenAmount"].get("uiAmount") or 0)
+    return total
+
+
+class HolderService:
+    def __init__(self, token_mint: str = None, min_amount: float = None, ttl: float = None):
+        self.token_mint = token_mint or os.getenv("SPL_TOKEN_ADDRESS")
+        self.min_amount = min_amount if min_amount is not None else HOLDER_MIN_AMOUNT
+        self.ttl = ttl if ttl is not None else HOLDER_CACHE_TTL
+        self._cache = {}  # wallet -> (amount, checked_at)
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def cached_balance(self, wallet: str):
+        item = self._cache.get(wallet)
+        return item[0] if item else None
+
+    def _fresh(self, wallet: str) -> bool:
+        item = self._cache.get(wallet)
+        return item is not None and time.monotonic() - item[1] < self.ttl
+
+    async def balance(self, wallet: str):
+        # Frischer Cache: sofort. Veralteter Cache: sofort, Aktualisierung im Hintergrund.
+        # Kein Cache: Helius fragen. None, wenn gar nichts bekannt ist.
+        if self._fresh(wallet):
+            self.hits += 1
+            return self.cached_balance(wallet)
+        self.misses += 1
+        if wallet in self._cache:
+            asyncio.ensure_future(self._refresh_quietly(wallet))
+            return self.cached_balance(wallet)
+        try:
+            return await self._flight.do(wallet, lambda: self._refresh(wallet))
+        except REQUEST_ERRORS as e:
+            logging.warning("Token check failed for %s: %s", wallet, e)
+            return None
+
+    async def is_holder(self, wallet: str) -> bool:
+        amount = await self.balance(wallet)
+        return amount is not None and amount >= self.min_amount
+
+    async def _refresh(self, wallet: str) -> float:
+        if helius.rpc_url:
+            result = await helius.rpc(
+                "getTokenAccountsByOwner",
+                [wallet, {"mint": self.token_mint}, {"encoding": "jsonParsed"}],
+            )
+            amount = _amount_from_token_accounts(result)
+        else:
+            balances = await helius.balances(wallet)
+            amount = 0.0
+            for token in balances.get("tokens", []):
+                if token.get("mint") == self.token_mint:
+                    amount += int(token.get("amount", 0)) / (10 ** int(token.get("decimals", 0)))
+        self._cache[wallet] = (amount, time.monotonic())
+        return amount
+
+    async def _refresh_quietly(self, wallet: str):
+        try:
+            await self._flight.do(wallet, lambda: self._refresh(wallet))
+        except REQUEST_ERRORS as e:
+            logging.warning("Background token check failed for %s: %s", wallet, e)
+
+    async def refresh_batch(self, wallets):
+        # Ein JSON-RPC-Batch für viele Wallets; Fehler einzelner Wallets lassen den Cache unverändert
+        if not helius.rpc_url:
+            await asyncio.gather(*(self._refresh_quietly(w) for w in wallets))
+            return
+        calls = [("getTokenAccountsByOwner", [w, {"mint": self.token_mint}, {"encoding": "jsonParsed"}]) for w in wallets]
+        results = await helius.rpc_batch(calls)
+        now = time.monotonic()
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, HeliusError):
+                logging.warning("Token check failed for %s: %s", wallet, result)
+                continue
+            self._cache[wallet] = (_amount_from_token_accounts(result), now)
+
+    async def revalidate(self, verified_users, on_revoke):
+        # verified_users: user_id -> wallet; on_revoke(user_id, wallet) wird für zu kleine Bestände gerufen
+        entries = list(verified_users.items())
+        for i in range(0, len(entries), HOLDER_RECHECK_BATCH):
+            batch = entries[i:i + HOLDER_RECHECK_BATCH]
+            try:
+                await self.refresh_batch(sorted({wallet for _, wallet in batch}))
+            except REQUEST_ERRORS as e:
+                logging.warning("Holder revalidation batch failed: %s", e)
+                continue
+            for user_id, wallet in batch:
+                amount = self.cached_balance(wallet)
+                if amount is not None and amount < self.min_amount:
+                    await on_revoke(user_id, wallet)
+
+    async def run(self, verified_users, on_revoke, interval: float = None):
+        while True:
+            await asyncio.sleep(interval or HOLDER_RECHECK_INTERVAL)
+            try:
+                with attribute("holder_recheck"):
+                    await self.revalidate(verified_users, on_revoke)
+            except Exception as e:
+                logging.error(f"Holder revalidation error: {e}")
+
+
+holders = HolderService()
+CACHE_STATS.set_function(lambda: len(holders._cache), "holders", "size")
+CACHE_STATS.set_function(lambda: holders.hits, "holders", "hits")
+CACHE_STATS.set_function(lambda: holders.misses, "holders", "misses")
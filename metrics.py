@@ -0,0 +1,159 @@
+import logging
+import os
+from bisect import bisect_left
+
+# Prometheus-Metriken ohne zusätzliche Abhängigkeit.
+# inc()/observe() sind nur Dict-Zugriffe und bleiben deshalb im Hot Path aktiv.
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # Polling-Bot: 0 = kein eigener HTTP-Server
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+REGISTRY = []
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        for label_values, value in self._values.items():
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._functions = {}
+        REGISTRY.append(self)
+
+    def set(self, value: float, *label_values):
+        self._values[label_values] = value
+
+    def set_function(self, fn, *label_values):
+        # Wert wird erst beim Abruf von /metrics berechnet
+        self._functions[label_values] = fn
+
+    def samples(self):
+        for label_values, value in self._values.items():
+            yield self.name, _labels(self.labels, label_values), value
+        for label_values, fn in self._functions.items():
+            try:
+                value = fn()
+            except Exception as e:
+                logging.warning(f"Gauge {self.name} failed: {e}")
+                continue
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label_values -> [bucket_counts..., +Inf], sum
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values):
+        entry = self._values.get(label_values)
+        if entry is None:
+            entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        for label_values, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                names = self.labels + ("le",)
+                yield self.name + "_bucket", _labels(names, label_values + (bound,)), cumulative
+            yield self.name + "_sum", _labels(self.labels, label_values), total
+            yield self.name + "_count", _labels(self.labels, label_values), cumulative
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+async def start_server(port: int = None):
+    # /metrics für Prozesse ohne FastAPI (Polling-Bot)
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port or METRICS_PORT).start()
+    logging.info(f"Metrics auf Port {port or METRICS_PORT}")
+    return runner
+
+
+FILTER_OUTCOMES = Counter("whalerider_filter_outcomes_total", "Whale filter decisions by outcome", ["outcome"])
+WEBHOOK_REQUESTS = Counter("whalerider_webhook_requests_total", "Webhook deliveries by response status", ["status"])
+HELIUS_LATENCY = Histogram("whalerider_helius_request_seconds", "Helius request latency", ["endpoint"])
+HELIUS_ERRORS = Counter("whalerider_helius_errors_total", "Failed Helius requests", ["endpoint", "reason"])
+HELIUS_RETRIES = Counter("whalerider_helius_retries_total", "Helius request retries", ["endpoint"])
+HELIUS_GUARDS = Gauge(
+    "whalerider_helius_guard", "Adaptive concurrency limit, in-flight requests and breaker state", ["endpoint", "stat"]
+)
+HELIUS_CREDITS = Counter(
+    "whalerider_helius_credits_total", "Estimated Helius credits by call site and endpoint", ["purpose", "endpoint"]
+)
+HELIUS_BYTES = Counter("whalerider_helius_response_bytes_total", "Helius response bytes by call site", ["purpose"])
+HELIUS_SHED = Counter("whalerider_helius_shed_total", "Helius requests refused by credit budgets", ["purpose"])
+HELIUS_CREDIT_USAGE = Gauge(
+    "whalerider_helius_credits_window", "Estimated Helius credits in the current budget window", ["purpose"]
+)
+TELEGRAM_LATENCY = Histogram("whalerider_telegram_send_seconds", "Telegram sendMessage latency")
+TELEGRAM_SENDS = Counter("whalerider_telegram_sends_total", "Telegram sends by result", ["result"])
+ALERT_DIGEST = Counter("whalerider_alert_digest_total", "Per-user alerts and messages in digest mode", ["result"])
+BROADCAST_DURATION = Histogram(
+    "whalerider_broadcast_seconds", "Alert enqueue to last recipient", buckets=SLOW_BUCKETS
+)
+ALERT_END_TO_END = Histogram(
+    "whalerider_alert_end_to_end_seconds", "On-chain block time to first Telegram delivery", buckets=SLOW_BUCKETS
+)
+BURN_VERIFICATIONS = Counter("whalerider_burn_verifications_total", "Burn transaction checks by result", ["result"])
+QUEUE_DEPTH = Gauge("whalerider_queue_depth", "Items waiting per queue", ["queue"])
+CACHE_STATS = Gauge("whalerider_cache", "Cache counters and hit ratio", ["cache", "stat"])
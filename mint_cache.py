@@ -0,0 +1,193 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from coalesce import BatchLoader, SingleFlight
+from credits import attribute
+from helius import helius, HeliusUnavailableError, REQUEST_ERRORS
+from metrics import CACHE_STATS
+import registry
+
+# Cache für Mint-Alter und Pump.fun-Metadaten.
+# Reihenfolge: LRU im Speicher -> Mint-Register (SQLite, registry.py) -> Helius, dessen Ergebnis
+# ins Register nachgetragen wird. Erstellungszeit und Authority ändern sich nie, daher werden
+# sie dauerhaft gehalten; nur fehlgeschlagene Lookups laufen nach MINT_CACHE_ERROR_TTL Sekunden ab.
+# Lehnt der Helius-Client selbst ab (Circuit Breaker offen, Limit voll), wird nichts gecacht:
+# sobald Helius wieder erreichbar ist, soll die Mint sofort geprüft werden.
+
+PUMP_AUTH = "TSLvdd1pWpHVjahSpsvCXUbgwsL3JAcvokwaKt1eokM"
+MINT_CACHE_SIZE = int(os.getenv("MINT_CACHE_SIZE", 10_000))
+MINT_CACHE_ERROR_TTL = float(os.getenv("MINT_CACHE_ERROR_TTL", 30))
+# Mint-Historie rückwärts blättern, bis sie zu Ende ist oder älter als der Horizont;
+# danach zählt die älteste gesehene Signatur (obere Schranke, für den Altersfilter genügt das)
+MINT_HISTORY_MAX_PAGES = int(os.getenv("MINT_HISTORY_MAX_PAGES", 5))
+MINT_HISTORY_HORIZON = float(os.getenv("MINT_HISTORY_HORIZON", 86400))
+SIGNATURES_PAGE = 1000  # Obergrenze von getSignaturesForAddress
+TRANSACTIONS_PAGE = 100  # Seitengröße von /v0/addresses/{address}/transactions
+
+_MISSING = object()
+_FAILED = object()
+
+
+class MintLookupError(Exception):
+    @property
+    def unavailable(self) -> bool:
+        # Helius wurde gar nicht gefragt (Circuit Breaker offen, Limit voll)
+        return isinstance(self.__cause__, HeliusUnavailableError)
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is not None:
+            value, expires_at = item
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+mint_cache = LRUCache(MINT_CACHE_SIZE)
+for _stat in ("size", "hits", "misses", "evictions", "hit_ratio"):
+    CACHE_STATS.set_function(lambda stat=_stat: mint_cache.stats()[stat], "mint", _stat)
+
+
+def parse_timestamp(raw) -> datetime:
+    # Helius liefert je nach Endpoint Unix-Sekunden oder ISO-Strings
+    if isinstance(raw, (int, float)):
+        return datetime.fromtimestamp(raw, tz=timezone.utc)
+    ts = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+async def _fetch_metadata_batch(mints):
+    with attribute("metadata"):
+        metas = await helius.token_metadata(mints)
+    results = {}
+    for mint, meta in zip(mints, metas or ()):
+        if not isinstance(meta, dict):
+            continue  # null für unbekannte Mints: fehlt im Ergebnis und landet im Negativ-Cache
+        # Helius liefert die Mint als "account"; sonst gilt die Reihenfolge der Anfrage
+        results[meta.get("account") or meta.get("mint") or mint] = meta
+    return results
+
+
+async def _fetch_creation(mint: str):
+    # (Erstellungszeit, Slot) aus der ältesten Signatur der Mint; über RPC kostet eine Seite
+    # mit 1000 Signaturen einen Credit, die Enhanced-API-Seite mit 100 Transaktionen deutlich mehr
+    horizon = time.time() - MINT_HISTORY_HORIZON
+    oldest, before = None, None
+    for _ in range(MINT_HISTORY_MAX_PAGES):
+        if helius.rpc_url:
+            options = {"limit": SIGNATURES_PAGE, **({"before": before} if before else {})}
+            page = await helius.rpc("getSignaturesForAddress", [mint, options])
+            page_size, timestamp_key = SIGNATURES_PAGE, "blockTime"
+        else:
+            page = await helius.address_transactions(mint, before=before)
+            page_size, timestamp_key = TRANSACTIONS_PAGE, "timestamp"
+        if not page:
+            break
+        oldest = page[-1]
+        before = oldest.get("signature")
+        # ohne Signatur lässt sich nicht weiterblättern
+        if not before or len(page) < page_size or oldest[timestamp_key] < horizon:
+            break
+    if oldest is None:
+        raise IndexError("mint has no transactions")
+    return parse_timestamp(oldest.get("blockTime") or oldest["timestamp"]), oldest.get("slot")
+
+
+history_flight = SingleFlight()
+metadata_loader = BatchLoader(_fetch_metadata_batch)
+
+
+async def get_mint_timestamp(mint: str) -> datetime:
+    key = ("created", mint)
+    cached = mint_cache.get(key, _MISSING)
+    if cached is _FAILED:
+        raise MintLookupError(f"mint history for {mint} unavailable (cached)")
+    if cached is not _MISSING:
+        return cached
+    record = registry.lookup(mint)
+    if record is not None and record.created_at is not None:
+        mint_cache.set(key, record.created_at)
+        return record.created_at
+
+    try:
+        # Für die Mint-Historie gibt es keinen Batch-Endpoint, daher nur Single-Flight
+        with attribute("mint_timestamp"):
+            ts, slot = await history_flight.do(mint, lambda: _fetch_creation(mint))
+    except (*REQUEST_ERRORS, IndexError, KeyError, TypeError) as e:
+        if not isinstance(e, HeliusUnavailableError):
+            mint_cache.set(key, _FAILED, ttl=MINT_CACHE_ERROR_TTL)
+        raise MintLookupError(f"mint history for {mint} unavailable: {e}") from e
+
+    registry.record(mint, created_at=ts, slot=slot)
+    mint_cache.set(key, ts)
+    return ts
+
+
+async def get_mint_metadata(mint: str) -> dict:
+    # Liefert {"pump": bool, "symbol": str}; "nicht Pump.fun" wird ebenso dauerhaft gecacht
+    key = ("meta", mint)
+    cached = mint_cache.get(key, _MISSING)
+    if cached is _FAILED:
+        raise MintLookupError(f"metadata for {mint} unavailable (cached)")
+    if cached is not _MISSING:
+        return cached
+    record = registry.lookup(mint)
+    if record is not None and record.pump is not None and (record.symbol or not record.pump):
+        # Herkunft lokal bekannt; ohne Symbol (Create aus dem Webhook) holt Helius es nach
+        info = {"pump": record.pump, "symbol": record.symbol or mint[:6]}
+        mint_cache.set(key, info)
+        return info
+
+    try:
+        meta = await metadata_loader.load(mint)
+    except (*REQUEST_ERRORS, IndexError, KeyError, TypeError) as e:
+        if not isinstance(e, HeliusUnavailableError):
+            mint_cache.set(key, _FAILED, ttl=MINT_CACHE_ERROR_TTL)
+        raise MintLookupError(f"metadata for {mint} unavailable: {e}") from e
+
+    info = {
+        "pump": meta.get("updateAuthority") == PUMP_AUTH,
+        "symbol": meta.get("symbol") or mint[:6],
+    }
+    registry.record(mint, pump=info["pump"], symbol=meta.get("symbol") or None)
+    mint_cache.set(key, info)
+    return info
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+
+import registry
+from metrics import FILTER_OUTCOMES, QUEUE_DEPTH
+from state import STATE_ERRORS, state
+from whales import candidate, evaluate, evaluate_window, observe, threshold, token_candidate
+from windows import WindowSignal
+from workqueue import WorkQueue, DROP_OLDEST
+
+# Eine Erkennungs-Pipeline für alle Einstiege: Webhook, Websocket-Stream, Wallet-Polling
+# (whalerider_bot.py) und /v0/tokens/recent (whalerider_bot1.py).
+#
+#   Quelle -> günstige Filter -> Aggregation -> Anreicherung -> Routing -> Versand
+#
+# Create-Ereignisse landen vorab im Mint-Register (registry.py), damit spätere Käufe das Alter
+# lokal nachschlagen. accept() läuft im Aufrufer und macht keine Upstream-Aufrufe: Parsen, Deduplizierung,
+# rollende Fenster (sehen jeden Kauf, auch unter der Schwelle) und die SOL-Schwelle.
+# Erst was das übersteht, geht in den Worker-Pool; dort laufen Cooldown, Mint-Alter und
+# Metadaten (Helius), Matcher und Text, mehrere Transaktionen gleichzeitig.
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 1000))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 8))
+PIPELINE_QUEUE_POLICY = os.getenv("PIPELINE_QUEUE_POLICY", DROP_OLDEST)  # oder "shed"
+PIPELINE_SHED_SOL = float(os.getenv("PIPELINE_SHED_SOL", 20))
+DELIVERY_TTL_SECONDS = 3600  # Helius und Poller liefern dieselbe Signatur auch mehrfach
+# vorübergehende Fehler: die Zustellung wird wieder freigegeben, eine Wiederholung zählt nicht als Duplikat
+RETRYABLE_OUTCOMES = ("helius unavailable", "mint lookup failed", "meta fetch failed")
+STATE_UNAVAILABLE = "state unavailable"  # Deduplizierung nicht möglich, Absender soll wiederholen
+
+
+def delivery_key(c) -> str:
+    return f"delivery:{c.signature}"
+
+
+class Pipeline:
+    def __init__(self, deliver, name: str = "pipeline", maxsize: int = None, workers: int = None,
+                 policy: str = None, shed_threshold: float = None):
+        self.deliver = deliver  # deliver(alert, origin), z.B. an den Broadcaster
+        self.name = name
+        self.queue = WorkQueue(
+            self.process,
+            maxsize=maxsize or PIPELINE_QUEUE_SIZE,
+            workers=workers or PIPELINE_WORKERS,
+            policy=policy or PIPELINE_QUEUE_POLICY,
+            shed_threshold=shed_threshold if shed_threshold is not None else PIPELINE_SHED_SOL,
+            name=f"{name} queue",
+            on_drop=self._dropped,
+        )
+        QUEUE_DEPTH.set_function(lambda: self.queue.depth, name)
+
+    # --- Quellen ---
+
+    async def accept_transaction(self, tx: dict) -> str:
+        # Enhanced Transaction aus Webhook, Stream oder Wallet-Polling
+        registry.observe_transaction(tx)
+        status, c = candidate(tx)
+        if status:
+            FILTER_OUTCOMES.inc(status)
+            return status
+        return await self.accept(c)
+
+    async def accept_token(self, token: dict) -> str:
+        # Eintrag aus /v0/tokens/recent
+        status, c = token_candidate(token)
+        if status:
+            FILTER_OUTCOMES.inc(status)
+            return status
+        registry.observe_token(c)
+        return await self.accept(c)
+
+    # --- Stufen ---
+
+    async def accept(self, c) -> str:
+        # günstige Stufen; Rückgabe ist der Status für den Aufrufer ("queued", "shed" oder Filtergrund)
+        try:
+            if c.signature and not await state.acquire(delivery_key(c), DELIVERY_TTL_SECONDS):
+                # Wiederholungen zählen weder für die Fenster noch als neuer Kandidat
+                return "duplicate"
+        except STATE_ERRORS as e:
+            logging.warning(f"Zustand nicht erreichbar, {c.signature} wird nicht angenommen: {e}")
+            return STATE_UNAVAILABLE
+        for signal in observe(c):
+            self.queue.submit(signal)
+        status = threshold(c)
+        if status:
+            FILTER_OUTCOMES.inc(status)
+            return status
+        if not self.queue.submit(c, weight=c.sol):
+            await self._release(c)
+            return "shed"
+        return "queued"
+
+    async def process(self, item):
+        # teure Stufen im Worker; item: Candidate oder WindowSignal aus den rollenden Fenstern
+        if isinstance(item, WindowSignal):
+            status, alert = await evaluate_window(item)
+            origin, label = item.ts, f"{item.kind}-window {item.mint}"
+        else:
+            try:
+                status, alert = await evaluate(item)
+            except Exception:
+                await self._release(item)
+                raise
+            if status in RETRYABLE_OUTCOMES:
+                await self._release(item)
+            origin, label = item.ts, item.signature or item.mint
+        if alert:
+            self.deliver(alert, origin)
+        else:
+            logging.info(f"{label}: {status}")
+
+    async def _release(self, c):
+        # Kandidat nicht bearbeitet: dieselbe Signatur darf erneut angenommen werden
+        if not c.signature:
+            return
+        try:
+            await state.release(delivery_key(c))
+        except Exception as e:
+            logging.warning(f"Zustellung {c.signature} nicht freigegeben: {e}")
+
+    def _dropped(self, item):
+        if not isinstance(item, WindowSignal):
+            asyncio.ensure_future(self._release(item))
+
+    # --- Lebenszyklus ---
+
+    def start(self):
+        self.queue.start()
+
+    async def join(self):
+        await self.queue.join()
+
+    async def close(self):
+        await self.queue.close()
+
+    def stats(self) -> dict:
+        return self.queue.stats()
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+from collections import deque
+
+from helius import helius
+
+# Inkrementelles Polling einer Adresse: nur Transaktionen nach dem gespeicherten Cursor
+# werden geladen (Helius "until"), bei Bursts wird mit "before" weitergeblättert. Reichen
+# POLL_MAX_PAGES nicht, bleibt der Rest als Lücke (before, until) gespeichert und wird in den
+# nächsten Polls nachgeladen, damit kein Kauf verloren geht.
+
+POLL_PAGE_LIMIT = int(os.getenv("POLL_PAGE_LIMIT", 100))
+POLL_MAX_PAGES = int(os.getenv("POLL_MAX_PAGES", 10))
+SEEN_INDEX_SIZE = int(os.getenv("SEEN_INDEX_SIZE", 10_000))
+POLL_MAX_GAPS = 10  # offene Lücken pro Adresse, darüber fällt die älteste weg
+
+
+class SeenIndex:
+    # Exakte Deduplizierung mit fester Obergrenze: Ringpuffer + Set, keine False Positives.
+    # Die ältesten Einträge fallen nach maxlen neuen Signaturen heraus.
+    def __init__(self, maxlen: int = SEEN_INDEX_SIZE):
+        self.maxlen = maxlen
+        self._order = deque()
+        self._keys = set()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key) -> bool:
+        # True, wenn der Schlüssel neu war
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self.maxlen:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+class AddressPoller:
+    def __init__(self, address: str, store, cursor_key: str, page_limit: int = None, max_pages: int = None):
+        self.address = address
+        self.store = store
+        self.cursor_key = cursor_key
+        self.page_limit = page_limit or POLL_PAGE_LIMIT
+        self.max_pages = max_pages or POLL_MAX_PAGES
+        self.cursor = store.get_meta(cursor_key)
+        self.gaps = json.loads(store.get_meta(f"{cursor_key}_gaps", "[]"))  # [[before, until], ...], älteste zuerst
+        self.seen = SeenIndex()
+        self._pending_cursor = None
+        self._pending_gaps = None
+
+    async def _pages(self, before, until, budget: int):
+        # (Transaktionen neueste zuerst, before zum Weiterblättern oder None wenn vollständig, Seiten)
+        txs, pages = [], 0
+        while pages < budget:
+            page = await helius.address_transactions(self.address, before=before, until=until, limit=self.page_limit)
+            pages += 1
+            if not page:
+                return txs, None, pages
+            txs.extend(page)
+            # ohne Cursor (erster Start) reicht die neueste Seite
+            before = page[-1].get("signature")
+            if until is None or len(page) < self.page_limit or not before:
+                return txs, None, pages
+        return txs, before, pages
+
+    async def poll(self):
+        # Liefert neue Transaktionen, älteste zuerst. Cursor und Lücken werden erst mit commit() gespeichert.
+        # Neue Transaktionen haben Vorrang; übrige Seiten gehen in Lücken früherer Bursts.
+        txs, rest, used = await self._pages(None, self.cursor, self.max_pages)
+        if txs:
+            self._pending_cursor = txs[0].get("signature")
+        gaps = [list(gap) for gap in self.gaps]
+        remaining = self.max_pages - used
+        while gaps and remaining > 0:
+            before, until = gaps[-1]  # jüngste Lücke zuerst
+            gap_txs, gap_rest, pages = await self._pages(before, until, remaining)
+            remaining -= pages
+            txs.extend(gap_txs)
+            if gap_rest:
+                gaps[-1][0] = gap_rest
+            else:
+                gaps.pop()
+        if rest:
+            logging.warning(f"Poller {self.address}: mehr als {self.max_pages} Seiten neu, Rest folgt beim nächsten Poll")
+            gaps.append([rest, self.cursor])
+            if len(gaps) > POLL_MAX_GAPS:
+                logging.error(f"Poller {self.address}: zu viele offene Lücken, älteste wird verworfen")
+                gaps.pop(0)
+
+        self._pending_gaps = gaps
+        return [tx for tx in reversed(txs) if tx.get("signature") and self.seen.add(tx["signature"])]
+
+    def commit(self):
+        if self._pending_cursor:
+            self.cursor = self._pending_cursor
+            self.store.set_meta(self.cursor_key, self.cursor)
+            self._pending_cursor = None
+        if self._pending_gaps is not None and self._pending_gaps != self.gaps:
+            self.gaps = self._pending_gaps
+            self.store.set_meta(f"{self.cursor_key}_gaps", json.dumps(self.gaps))
+        self._pending_gaps = None
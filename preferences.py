@@ -0,0 +1,252 @@
+import os
+import time
+from bisect import bisect_left, bisect_right
+
+# Alert-Einstellungen pro Nutzer (Min-SOL, max. Token-Alter, beobachtete Mints/Wallets)
+# und ein Matcher, der jeden Alert nur an passende Abonnenten verteilt.
+# Indizes: nach min_sol und max_age sortierte Listen plus Hash-Indizes auf Mint/Wallet,
+# damit pro Alert nicht die Regeln aller Nutzer geprüft werden müssen.
+
+PREMIUM_MIN_SOL = float(os.getenv("PREMIUM_MIN_SOL", 1))
+PREMIUM_MAX_AGE_MINUTES = int(os.getenv("PREMIUM_MAX_AGE_MINUTES", 240))
+WATCH_LIMIT = int(os.getenv("ALERT_WATCH_LIMIT", 20))
+WATCH_KINDS = ("mints", "wallets")
+MATCHER_CHECK_INTERVAL = 1.0  # Sekunden zwischen Prüfungen auf geänderte Einstellungen
+MATCHER_REBUILD_INTERVAL = 300  # Premium-Abläufe sind keine Schreibzugriffe
+
+SOL_CHOICES = (1, 5, 10, 25, 50, 100)
+AGE_CHOICES = (15, 30, 60, 120, 240)
+
+
+class Rule:
+    __slots__ = ("min_sol", "max_age", "mints", "wallets")
+
+    def __init__(self, min_sol: float, max_age: float, mints=(), wallets=()):
+        self.min_sol = min_sol
+        self.max_age = max_age
+        self.mints = frozenset(mints)
+        self.wallets = frozenset(wallets)
+
+    @property
+    def watching(self) -> bool:
+        return bool(self.mints or self.wallets)
+
+
+class SubscriptionMatcher:
+    def __init__(self, subscribers, preferences, premium, min_sol: float, max_age: float):
+        self.subscribers = subscribers
+        self.preferences = preferences  # user_id -> {"min_sol", "max_age", "mints", "wallets"}
+        self.premium = premium  # PremiumLedger aus premium.py
+        self.default_min_sol = min_sol
+        self.default_max_age = max_age
+        self._key = None
+        self._checked_at = 0.0
+        self._rules = {}  # nur Abonnenten mit abweichenden Einstellungen
+        self._defaults = []  # Abonnenten ohne eigene Regel
+        self._sol_keys, self._sol_users = [], []
+        self._age_keys, self._age_users = [], []
+        self._by_mint = {}
+        self._by_wallet = {}
+        self._min_sol = min_sol
+        self._max_age = max_age
+        self.rebuilds = 0
+
+    # --- Grenzen pro Nutzer ---
+
+    def limits(self, user_id) -> tuple:
+        # (kleinstes min_sol, größtes max_age); lockerer als der Standard nur mit Premium
+        if self.is_premium(user_id):
+            return min(PREMIUM_MIN_SOL, self.default_min_sol), max(PREMIUM_MAX_AGE_MINUTES, self.default_max_age)
+        return self.default_min_sol, self.default_max_age
+
+    def is_premium(self, user_id) -> bool:
+        return self.premium.is_premium(user_id)
+
+    def rule_for(self, user_id, prefs: dict = None) -> Rule:
+        prefs = prefs if prefs is not None else self.preferences.get(user_id) or {}
+        sol_floor, age_ceiling = self.limits(user_id)
+        min_sol = max(sol_floor, prefs.get("min_sol") or self.default_min_sol)
+        max_age = min(age_ceiling, prefs.get("max_age") or self.default_max_age)
+        return Rule(min_sol, max_age, prefs.get("mints", ()), prefs.get("wallets", ()))
+
+    # --- Index ---
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < MATCHER_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        # len() lädt die Snapshots neu, falls ein anderer Prozess geschrieben hat
+        len(self.subscribers), len(self.preferences)
+        key = (
+            self.subscribers.generation,
+            self.preferences.generation,
+            self.premium.generation,
+            int(now // MATCHER_REBUILD_INTERVAL),
+        )
+        if key != self._key:
+            self._rebuild()
+            self._key = key
+
+    def _rebuild(self):
+        rules = {}
+        for user_id, prefs in self.preferences.items():
+            if user_id not in self.subscribers:
+                continue
+            rule = self.rule_for(user_id, prefs)
+            if rule.watching or rule.min_sol != self.default_min_sol or rule.max_age != self.default_max_age:
+                rules[user_id] = rule
+
+        by_sol = sorted((rule.min_sol, uid) for uid, rule in rules.items())
+        by_age = sorted((rule.max_age, uid) for uid, rule in rules.items())
+        by_mint, by_wallet = {}, {}
+        for uid, rule in rules.items():
+            for mint in rule.mints:
+                by_mint.setdefault(mint, set()).add(uid)
+            for wallet in rule.wallets:
+                by_wallet.setdefault(wallet, set()).add(uid)
+
+        self._rules = rules
+        self._defaults = [uid for uid in self.subscribers if uid not in rules]
+        self._sol_keys, self._sol_users = [s for s, _ in by_sol], [u for _, u in by_sol]
+        self._age_keys, self._age_users = [a for a, _ in by_age], [u for _, u in by_age]
+        self._by_mint, self._by_wallet = by_mint, by_wallet
+        self._min_sol = min([self.default_min_sol] + self._sol_keys[:1])
+        self._max_age = max([self.default_max_age] + self._age_keys[-1:])
+        self.rebuilds += 1
+
+    @property
+    def min_sol(self) -> float:
+        # kleinste Schwelle über alle Abonnenten, für den globalen Vorfilter
+        self._refresh()
+        return self._min_sol
+
+    @property
+    def max_age(self) -> float:
+        self._refresh()
+        return self._max_age
+
+    def match(self, mint: str, buyer: str, sol: float, age_minutes: float, default_ok: bool = None):
+        # Empfänger eines Alerts. default_ok: der Aufrufer hat seine eigenen Standardfilter
+        # schon angewendet (Polling-Jobs); sonst gelten die Standardschwellen.
+        # Ohne abweichende Einstellungen wird das Abonnenten-Set selbst zurückgegeben.
+        self._refresh()
+        if default_ok is None:
+            default_ok = sol >= self.default_min_sol and age_minutes <= self.default_max_age
+
+        custom = []
+        if self._rules:
+            # Nutzer mit min_sol <= sol sind ein Präfix, Nutzer mit max_age >= age ein Suffix;
+            # nur der kleinere Ausschnitt wird einzeln geprüft
+            by_sol = self._sol_users[:bisect_right(self._sol_keys, sol)]
+            by_age = self._age_users[bisect_left(self._age_keys, age_minutes):]
+            candidates = by_sol if len(by_sol) <= len(by_age) else by_age
+            watched = self._by_mint.get(mint, set()) | self._by_wallet.get(buyer, set())
+            for uid in candidates:
+                rule = self._rules[uid]
+                if rule.min_sol > sol or rule.max_age < age_minutes:
+                    continue
+                if rule.watching and uid not in watched:
+                    continue
+                custom.append(uid)
+
+        if not default_ok:
+            return custom
+        if not self._rules:
+            return self.subscribers
+        return self._defaults + custom if custom else self._defaults
+
+    def stats(self) -> dict:
+        self._refresh()
+        return {
+            "custom_rules": len(self._rules),
+            "watched_mints": len(self._by_mint),
+            "watched_wallets": len(self._by_wallet),
+            "min_sol": self._min_sol,
+            "max_age": self._max_age,
+            "rebuilds": self.rebuilds,
+        }
+
+    # --- Einstellungen ändern ---
+
+    def update(self, user_id, **changes) -> dict:
+        prefs = dict(self.preferences.get(user_id) or {})
+        prefs.update(changes)
+        self.preferences[user_id] = prefs
+        self._checked_at = 0.0
+        return prefs
+
+    def watch(self, user_id, kind: str, value: str) -> bool:
+        # kind: "mints" oder "wallets"; False wenn die Liste voll ist
+        if kind not in WATCH_KINDS:
+            raise ValueError(f"unknown watch kind {kind!r}")
+        prefs = self.preferences.get(user_id) or {}
+        values = list(prefs.get(kind, []))
+        if value in values:
+            return True
+        if len(values) >= WATCH_LIMIT:
+            return False
+        self.update(user_id, **{kind: values + [value]})
+        return True
+
+    def reset(self, user_id):
+        self.preferences.pop(user_id, None)
+        self._checked_at = 0.0
+
+
+# --- Inline-Keyboard für /menu ---
+
+def settings_text(matcher: SubscriptionMatcher, user_id) -> str:
+    rule = matcher.rule_for(user_id)
+    sol_floor, age_ceiling = matcher.limits(user_id)
+    lines = [
+        "⚙️ *Alert-Einstellungen*",
+        f"Min. Kauf: {rule.min_sol:g} SOL",
+        f"Max. Token-Alter: {rule.max_age:g} Minuten",
+        f"Beobachtete Mints: {len(rule.mints)}",
+        f"Beobachtete Wallets: {len(rule.wallets)}",
+    ]
+    if rule.watching:
+        lines.append("Nur Alerts für beobachtete Mints/Wallets.")
+    if not matcher.is_premium(user_id):
+        lines.append(f"🔓 Unter {sol_floor:g} SOL oder über {age_ceiling:g} Minuten nur mit Premium.")
+    return "\n".join(lines)
+
+
+def settings_keyboard(matcher: SubscriptionMatcher, user_id):
+    # aiogram erst hier importieren: der Webhook braucht den Matcher, aber keine Tastaturen
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+    sol_floor, age_ceiling = matcher.limits(user_id)
+    keyboard = InlineKeyboardMarkup(row_width=3)
+    keyboard.row(*(
+        InlineKeyboardButton(f"≥{sol:g} SOL", callback_data=f"prefs_sol:{sol}")
+        for sol in SOL_CHOICES if sol >= sol_floor
+    ))
+    keyboard.row(*(
+        InlineKeyboardButton(f"≤{age} Min", callback_data=f"prefs_age:{age}")
+        for age in AGE_CHOICES if age <= age_ceiling
+    ))
+    keyboard.row(
+        InlineKeyboardButton("➕ Mint beobachten", callback_data="prefs_watch:mints"),
+        InlineKeyboardButton("➕ Wallet beobachten", callback_data="prefs_watch:wallets"),
+    )
+    keyboard.row(
+        InlineKeyboardButton("🗑 Watchlist leeren", callback_data="prefs_clear"),
+        InlineKeyboardButton("↩️ Standard", callback_data="prefs_reset"),
+    )
+    return keyboard
+
+
+def apply_choice(matcher: SubscriptionMatcher, user_id, data: str):
+    # verarbeitet prefs_sol/prefs_age/prefs_clear/prefs_reset; Werte außerhalb der Grenzen
+    # werden beim Matching ohnehin auf die erlaubten Grenzen gezogen
+    action, _, value = data.partition(":")
+    if action == "prefs_sol":
+        matcher.update(user_id, min_sol=float(value))
+    elif action == "prefs_age":
+        matcher.update(user_id, max_age=int(value))
+    elif action == "prefs_clear":
+        matcher.update(user_id, mints=[], wallets=[])
+    elif action == "prefs_reset":
+        matcher.reset(user_id)
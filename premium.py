@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime
+
+from metrics import CACHE_STATS
+from storage import premium_users
+
+# Premium-Ledger über premium_users (SQLite): O(1)-Abfrage aus einem Dict user_id -> Ablaufzeit
+# und ein Min-Heap mit Warnungen und Abläufen, damit der Scheduler nur fällige Einträge anfasst.
+# Der Heap wird nur neu aufgebaut, wenn sich premium_users geändert hat (heapify, O(n)).
+
+PREMIUM_WARN_HOURS = float(os.getenv("PREMIUM_WARN_HOURS", 24))
+PREMIUM_CHECK_INTERVAL = 1.0  # Sekunden zwischen Prüfungen auf Schreibzugriffe anderer Prozesse
+PREMIUM_MAX_SLEEP = 60.0
+
+WARN, EXPIRE = "warn", "expire"
+
+
+def _timestamp(value: datetime) -> float:
+    return value.timestamp() if value.tzinfo else (value - datetime(1970, 1, 1)).total_seconds()
+
+
+class PremiumLedger:
+    def __init__(self, users, warn_hours: float = None):
+        self.users = users  # PremiumUsers: user_id -> Ablauf (naive UTC)
+        self.warn_seconds = (warn_hours if warn_hours is not None else PREMIUM_WARN_HOURS) * 3600
+        self._expiry = {}  # user_id -> Ablauf als Unix-Zeit
+        self._events = []  # Heap aus (zeitpunkt, art, user_id, ablauf)
+        self._generation = None
+        self._checked_at = 0.0
+        self._wakeup = asyncio.Event()
+        self.rebuilds = 0
+        self.warned = 0
+        self.expired = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at >= PREMIUM_CHECK_INTERVAL:
+            self._checked_at = now
+            len(self.users)  # lädt den Snapshot neu, falls ein anderer Prozess geschrieben hat
+        if self.users.generation != self._generation:
+            self._rebuild()
+
+    def _rebuild(self):
+        now = time.time()
+        expiry, events = {}, []
+        for user_id, expires_at in self.users.items():
+            ts = _timestamp(expires_at)
+            expiry[user_id] = ts
+            if ts - self.warn_seconds > now:
+                events.append((ts - self.warn_seconds, WARN, user_id, ts))
+            events.append((ts, EXPIRE, user_id, ts))  # schon abgelaufene feuern sofort
+        heapq.heapify(events)
+        self._expiry, self._events = expiry, events
+        self._generation = self.users.generation
+        self.rebuilds += 1
+        self._wakeup.set()
+
+    @property
+    def generation(self) -> int:
+        self._refresh()
+        return self._generation
+
+    def is_premium(self, user_id) -> bool:
+        self._refresh()
+        return self._expiry.get(user_id, 0) > time.time()
+
+    def expires_at(self, user_id):
+        # Ablauf als naive UTC-Datetime, None ohne aktives Premium
+        self._refresh()
+        ts = self._expiry.get(user_id, 0)
+        return datetime.utcfromtimestamp(ts) if ts > time.time() else None
+
+    def __len__(self):
+        self._refresh()
+        now = time.time()
+        return sum(1 for ts in self._expiry.values() if ts > now)
+
+    def due(self, now: float = None) -> list:
+        # fällige (art, user_id, ablauf); Einträge für inzwischen verlängertes Premium fallen weg
+        self._refresh()
+        now = now or time.time()
+        fired = []
+        while self._events and self._events[0][0] <= now:
+            _, kind, user_id, ts = heapq.heappop(self._events)
+            if self._expiry.get(user_id) == ts:
+                fired.append((kind, user_id, ts))
+        return fired
+
+    def remove(self, user_id):
+        # abgelaufenen Eintrag löschen; eigener Schreibzugriff löst keinen Neuaufbau aus
+        generation = self.users.generation
+        self.users.pop(user_id, None)
+        self._expiry.pop(user_id, None)
+        if self._generation == generation and self.users.generation == generation + 1:
+            self._generation = self.users.generation
+
+    def next_event_in(self) -> float:
+        if not self._events:
+            return PREMIUM_MAX_SLEEP
+        return min(PREMIUM_MAX_SLEEP, max(0.0, self._events[0][0] - time.time()))
+
+    async def run(self, notify):
+        # notify(user_id, text); nur ein Prozess (der Bot) sollte Warnungen verschicken
+        while True:
+            try:
+                for kind, user_id, ts in self.due():
+                    if kind == WARN:
+                        self.warned += 1
+                        hours = max(1, round((ts - time.time()) / 3600))
+                        await notify(user_id, f"⏳ Dein Premium läuft in {hours} Stunden ab. Verlängern mit /burn.")
+                    else:
+                        self.expired += 1
+                        self.remove(user_id)
+                        await notify(user_id, "🔓 Dein Premium ist abgelaufen. Verwende /burn für Zugang.")
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.next_event_in())
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                logging.error(f"Premium scheduler error: {e}")
+                await asyncio.sleep(PREMIUM_MAX_SLEEP)
+
+
+premium = PremiumLedger(premium_users)
+CACHE_STATS.set_function(lambda: len(premium), "premium", "active")
+CACHE_STATS.set_function(lambda: premium.rebuilds, "premium", "rebuilds")
+CACHE_STATS.set_function(lambda: premium.warned, "premium", "warned")
+CACHE_STATS.set_function(lambda: premium.expired, "premium", "expired")
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+from metrics import CACHE_STATS
+from storage import MintRecord, mint_registry
+
+# Lokales Mint-Register (Tabelle mints in storage.py), gefüllt aus Create-Ereignissen:
+# Pump.fun-CreateEvents aus den Websocket-Logs (ohne Helius-Aufruf), Create-Transaktionen aus
+# Webhook und Polling sowie /v0/tokens/recent. Unbekannte Mints trägt mint_cache.py nach dem
+# Lookup bei Helius nach. Einträge älter als MINT_REGISTRY_MAX_AGE_DAYS werden regelmäßig gelöscht.
+
+MINT_REGISTRY_MAX_AGE_DAYS = float(os.getenv("MINT_REGISTRY_MAX_AGE_DAYS", 7))
+MINT_REGISTRY_PRUNE_INTERVAL = float(os.getenv("MINT_REGISTRY_PRUNE_INTERVAL", 3600))
+
+PUMP_PROGRAM_ID = os.getenv("PUMP_PROGRAM_ID", "6EF8rrnyN8Dk5ztPvdBCyy52dTZkUx4ZLfG4yzjSqbTC")
+PUMP_CREATE_TYPES = ("CREATE", "TOKEN_MINT")
+CREATE_EVENT_DISCRIMINATOR = hashlib.sha256(b"event:CreateEvent").digest()[:8]  # Anchor-Event
+EVENT_PREFIX = "Program data: "
+MAX_CLOCK_SKEW = 86400  # Event-Zeitstempel weiter weg von der lokalen Uhr gelten als ungültig
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+stats = {"hits": 0, "misses": 0, "recorded": 0, "pruned": 0}
+
+
+def b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    digits = []
+    while n:
+        n, rest = divmod(n, 58)
+        digits.append(B58_ALPHABET[rest])
+    zeros = len(data) - len(data.lstrip(b"\0"))
+    return "1" * zeros + "".join(reversed(digits))
+
+
+def is_create_log(logs) -> bool:
+    return any("Instruction: Create" in line for line in logs or ())
+
+
+def _string(data: bytes, offset: int):
+    # Borsh-String: u32 Länge + UTF-8
+    (length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    return data[offset:offset + length].decode("utf-8", errors="replace"), offset + length
+
+
+def parse_create_event(data: bytes, slot: int = None, now: float = None):
+    # Pump.fun CreateEvent: name, symbol, uri, mint, bonding_curve, user[, creator, timestamp, ...];
+    # MintRecord oder None für andere Events
+    if data[:8] != CREATE_EVENT_DISCRIMINATOR:
+        return None
+    now = now or time.time()
+    _, offset = _string(data, 8)
+    symbol, offset = _string(data, offset)
+    _, offset = _string(data, offset)
+    if len(data) < offset + 96:
+        return None
+    mint = b58encode(data[offset:offset + 32])
+    creator = b58encode(data[offset + 64:offset + 96])
+    offset += 96
+    created = now
+    if len(data) >= offset + 40:
+        # neueres Layout mit creator und timestamp
+        creator = b58encode(data[offset:offset + 32])
+        (timestamp,) = struct.unpack_from("<q", data, offset + 32)
+        if abs(timestamp - now) < MAX_CLOCK_SKEW:
+            created = timestamp
+    return MintRecord(mint, datetime.fromtimestamp(created, tz=timezone.utc), slot, symbol or None, creator, True)
+
+
+def program_data(logs, program_id: str = None):
+    # "Program data:"-Zeilen, die program_id selbst geloggt hat. logsSubscribe liefert alle Logs
+    # einer Transaktion, die das Programm erwähnt; Events anderer Programme (auch gefälschte
+    # CreateEvents) werden über den Aufruf-Stapel ("Program <id> invoke" / "success") ausgefiltert.
+    program_id = program_id or PUMP_PROGRAM_ID
+    stack = []
+    for line in logs or ():
+        if line.startswith(EVENT_PREFIX):
+            if stack and stack[-1] == program_id:
+                yield line[len(EVENT_PREFIX):]
+            continue
+        parts = line.split(" ", 3)
+        if len(parts) < 3 or parts[0] != "Program":
+            continue
+        if parts[2] == "invoke":
+            stack.append(parts[1])
+        elif parts[2] in ("success", "failed:") and stack and stack[-1] == parts[1]:
+            stack.pop()
+
+
+def records_from_logs(logs, slot: int = None, program_id: str = None) -> list:
+    records = []
+    for data in program_data(logs, program_id):
+        try:
+            record = parse_create_event(base64.b64decode(data), slot)
+        except (binascii.Error, struct.error, ValueError):
+            continue
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def record_from_transaction(tx: dict):
+    # Enhanced Transaction eines Pump.fun-Creates -> MintRecord, sonst None
+    if tx.get("type") not in PUMP_CREATE_TYPES or tx.get("source") != "PUMP_FUN":
+        return None
+    mint = next((t.get("mint") for t in tx.get("tokenTransfers", []) if t.get("mint")), None)
+    if not mint:
+        return None
+    timestamp = tx.get("timestamp")
+    created = datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp else datetime.now(timezone.utc)
+    return MintRecord(mint, created, tx.get("slot"), None, tx.get("feePayer"), True)
+
+
+def _record(records: list):
+    if records:
+        mint_registry.record_many(records)
+        stats["recorded"] += len(records)
+
+
+def observe_logs(logs, slot: int = None, program_id: str = None):
+    # Websocket-Logs (logsSubscribe); kostet keinen Helius-Credit
+    _record(records_from_logs(logs, slot, program_id))
+
+
+def observe_transaction(tx: dict) -> bool:
+    record = record_from_transaction(tx)
+    if record is None:
+        return False
+    _record([record])
+    return True
+
+
+def observe_token(c):
+    # Candidate aus /v0/tokens/recent mit Erstellungszeit und Symbol
+    if c.created is not None:
+        _record([MintRecord(c.mint, c.created, None, c.symbol, None, None)])
+
+
+def lookup(mint: str):
+    record = mint_registry.get(mint)
+    stats["hits" if record is not None else "misses"] += 1
+    return record
+
+
+def record(mint: str, **fields):
+    mint_registry.record(mint, **fields)
+    stats["recorded"] += 1
+
+
+def prune(max_age_days: float = None) -> int:
+    days = max_age_days if max_age_days is not None else MINT_REGISTRY_MAX_AGE_DAYS
+    removed = mint_registry.prune(timedelta(days=days))
+    stats["pruned"] += removed
+    return removed
+
+
+async def run(interval: float = None):
+    while True:
+        try:
+            removed = prune()
+            if removed:
+                logging.info(f"Mint-Register: {removed} alte Einträge gelöscht")
+        except Exception as e:
+            logging.error(f"Mint registry prune error: {e}")
+        await asyncio.sleep(interval or MINT_REGISTRY_PRUNE_INTERVAL)
+
+
+for _stat in stats:
+    CACHE_STATS.set_function(lambda stat=_stat: stats[stat], "mint_registry", _stat)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+# Bausteine gegen Überlast bei Helius: Circuit Breaker pro Endpoint, AIMD-Nebenläufigkeit
+# (additiv hoch bei schnellen Antworten, halbiert bei 429/Timeouts/langsamen Antworten)
+# und ein Retry-Budget, damit Wiederholungen die Last bei einem Ausfall nicht vervielfachen.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int, cooldown: float, max_cooldown: float):
+        self.name = name
+        self.threshold = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0  # aufeinanderfolgende Fehler
+        self.open_until = 0.0
+        self.opened = 0
+        self._probing = 0.0  # Startzeit des laufenden Probe-Requests, 0 = keiner
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self._probing = 0.0
+        # halb offen: genau ein Probe-Request, der Rest wartet auf dessen Ergebnis;
+        # ein abgebrochener Probe blockiert höchstens einen Cooldown lang
+        now = time.monotonic()
+        if self._probing and now - self._probing < self.cooldown:
+            return False
+        self._probing = now
+        return True
+
+    def success(self):
+        if self.state != CLOSED:
+            logging.info(f"Circuit {self.name} wieder geschlossen")
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._probing = 0.0
+
+    def failure(self, retry_after: float = None):
+        # retry_after (Retry-After von Helius) verlängert die Sperre, wenn der Breaker öffnet;
+        # ein einzelnes 429 sperrt den Endpoint nicht
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # Probe fehlgeschlagen: länger offen bleiben
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open(max(self.cooldown, retry_after or 0))
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self._open(max(self.cooldown, retry_after or 0))
+
+    def _open(self, seconds: float):
+        if self.state != OPEN:
+            self.opened += 1
+            logging.warning(f"Circuit {self.name} offen für {seconds:.1f}s")
+        self.state = OPEN
+        self.open_until = time.monotonic() + seconds
+        self._probing = 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - time.monotonic()) if self.state == OPEN else 0.0
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float, decrease_interval: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_interval = decrease_interval  # höchstens eine Halbierung pro Intervall
+        self.inflight = 0
+        self._condition = asyncio.Condition()
+        self._decreased_at = 0.0
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.inflight < int(self.limit))
+            self.inflight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.inflight -= 1
+            self._condition.notify(max(1, int(self.limit) - self.inflight))
+
+    def on_success(self, latency: float):
+        if latency > self.latency_target:
+            self.decrease()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def decrease(self):
+        now = time.monotonic()
+        if now - self._decreased_at < self.decrease_interval:
+            return
+        self._decreased_at = now
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+class RetryBudget:
+    # Retries höchstens ratio * Requests im Fenster, plus ein kleiner Sockel für wenig Verkehr
+    def __init__(self, ratio: float, min_per_second: float, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self.denied = 0
+
+    def _prune(self, now: float):
+        cutoff = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def can_retry(self) -> bool:
+        now = time.monotonic()
+        self._prune(now)
+        allowed = self.min_per_second * self.window + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            self.denied += 1
+            return False
+        self._retries.append(now)
+        return True
+
+
+class EndpointGuard:
+    def __init__(self, name: str, breaker: CircuitBreaker, limiter: AdaptiveLimiter):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "limit": self.limiter.limit,
+            "inflight": self.limiter.inflight,
+            "opened": self.breaker.opened,
+        }
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+
+from broadcast import Broadcaster, TELEGRAM_GLOBAL_RATE, api_server
+from metrics import ALERT_END_TO_END, BROADCAST_DURATION, TELEGRAM_SENDS
+
+# Versand über mehrere Prozesse für sehr große Abonnentenlisten.
+# Die Abonnenten werden per Hash der User-ID auf BROADCAST_SHARDS Prozesse verteilt;
+# jeder Shard hat eigene Event-Loop, eigene aiohttp-Session und optional ein eigenes Bot-Token.
+# Der Webhook/Poller legt jeden Alert genau einmal in die Queue jedes Shards, die Shards
+# lesen ihre Teilmenge selbst aus dem Store (SQLite) und senden parallel.
+
+BROADCAST_SHARDS = int(os.getenv("BROADCAST_SHARDS", 0))  # 0/1 = Versand im eigenen Prozess
+BROADCAST_BOT_TOKENS = [t for t in os.getenv("BROADCAST_BOT_TOKENS", "").split(",") if t.strip()]
+
+
+def shard_of(uid, count: int) -> int:
+    # stabil über Prozesse hinweg (hash() von str ist pro Prozess zufällig)
+    return zlib.crc32(str(uid).encode()) % count
+
+
+class ShardedAlert:
+    def __init__(self, shards: int, origin: float = None):
+        self.origin = origin
+        self.pending = shards
+        self.sent = 0
+        self.failed = 0
+        self.first_sent_at = None
+        self.enqueued_at = time.monotonic()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def _report(self, sent: int, failed: int, first_sent_at: float):
+        self.sent += sent
+        self.failed += failed
+        if first_sent_at and (self.first_sent_at is None or first_sent_at < self.first_sent_at):
+            self.first_sent_at = first_sent_at
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished_at = time.monotonic()
+            self.done.set()
+            BROADCAST_DURATION.observe(self.finished_at - self.enqueued_at)
+            if self.origin and self.first_sent_at:
+                ALERT_END_TO_END.observe(self.first_sent_at - self.origin)
+
+    @property
+    def latency(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.enqueued_at
+
+
+class ShardedBroadcaster:
+    # gleiche Schnittstelle wie Broadcaster: enqueue(), queue_depth, join(), close()
+    def __init__(self, subscribers, shards: int = None, tokens=None, api_server: str = None,
+                 concurrency: int = None, global_rate: float = None):
+        self.subscribers = subscribers  # PersistentSet; die Shards lesen dieselbe Tabelle
+        self.shards = shards or BROADCAST_SHARDS
+        tokens = tokens or BROADCAST_BOT_TOKENS or [os.getenv("TELEGRAM_API_TOKEN")]
+        self.tokens = [tokens[i % len(tokens)] for i in range(self.shards)]
+        self.api_server = api_server
+        self.concurrency = concurrency
+        self.global_rate = global_rate or TELEGRAM_GLOBAL_RATE
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues = []
+        self._processes = []
+        self._results = None
+        self._reader = None
+        self._loop = None
+        self._alerts = {}  # alert_id -> ShardedAlert
+        self._next_id = 0
+
+    def _shard_rate(self, token: str) -> float:
+        # Shards mit demselben Token teilen sich dessen globales Limit
+        return self.global_rate / self.tokens.count(token)
+
+    def start(self):
+        if self._processes:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._results = self._ctx.Queue()
+        for index, token in enumerate(self.tokens):
+            queue = self._ctx.Queue()
+            process = self._ctx.Process(
+                target=run_shard,
+                args=(index, self.shards, token, queue, self._results, self.subscribers.store.path,
+                      self.api_server, self.concurrency, self._shard_rate(token)),
+                name=f"broadcast-shard-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._queues.append(queue)
+            self._processes.append(process)
+        self._reader = threading.Thread(target=self._read_results, name="broadcast-results", daemon=True)
+        self._reader.start()
+        logging.info(f"Broadcast mit {self.shards} Shards gestartet")
+
+    def _read_results(self):
+        while True:
+            report = self._results.get()
+            if report is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_report, *report)
+
+    def _on_report(self, alert_id, shard, sent, failed, first_sent_at):
+        TELEGRAM_SENDS.inc("ok", amount=sent)
+        TELEGRAM_SENDS.inc("error", amount=failed)
+        alert = self._alerts.get(alert_id)
+        if alert is None:
+            return
+        alert._report(sent, failed, first_sent_at)
+        if alert.pending == 0:
+            del self._alerts[alert_id]
+
+    def enqueue(self, text: str, recipients, parse_mode=None, origin: float = None, edits: dict = None,
+                track: bool = False) -> ShardedAlert:
+        # edits/track gibt es nur im eigenen Prozess: die Shards senden immer neu und melden keine message_ids
+        self.start()
+        alert_id = self._next_id
+        self._next_id += 1
+        alert = ShardedAlert(self.shards, origin)
+        self._alerts[alert_id] = alert
+        if recipients is self.subscribers:
+            # alle Abonnenten: nur der Text geht über die Queue, jeder Shard filtert selbst
+            parts = [None] * self.shards
+        else:
+            parts = [[] for _ in range(self.shards)]
+            for uid in recipients:
+                parts[shard_of(uid, self.shards)].append(uid)
+        for queue, part in zip(self._queues, parts):
+            queue.put((alert_id, text, parse_mode, origin, part))
+        return alert
+
+    @property
+    def queue_depth(self) -> int:
+        # offene Alerts (mindestens ein Shard noch nicht fertig)
+        return len(self._alerts)
+
+    async def join(self):
+        while self._alerts:
+            await asyncio.sleep(0.05)
+
+    async def close(self, timeout: float = 10):
+        if not self._processes:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Broadcast beim Beenden abgebrochen, {self.queue_depth} Alerts offen")
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            await self._loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._processes = []
+        self._queues = []
+
+    def stats(self) -> dict:
+        return {
+            "shards": self.shards,
+            "alive": sum(p.is_alive() for p in self._processes),
+            "open_alerts": len(self._alerts),
+        }
+
+
+def create_broadcaster(bot, subscribers):
+    if BROADCAST_SHARDS > 1:
+        return ShardedBroadcaster(subscribers)
+    return Broadcaster(bot, on_unreachable=subscribers.discard)
+
+
+def run_shard(index, count, token, queue, results, db_path, base_url, concurrency, global_rate):
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_shard_main(index, count, token, queue, results, db_path, base_url, concurrency, global_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _shard_main(index, count, token, queue, results, db_path, base_url, concurrency, global_rate):
+    from aiogram import Bot
+    from storage import PersistentSet, Store
+
+    bot = Bot(token=token, server=api_server(base_url))
+    store = Store(db_path)
+    subscribers = PersistentSet(store, "subscribers")
+    broadcaster = Broadcaster(
+        bot, concurrency=concurrency, global_rate=global_rate, on_unreachable=subscribers.discard
+    )
+    loop = asyncio.get_running_loop()
+    reports = []
+
+    async def report(alert_id, alert):
+        await alert.done.wait()
+        results.put((alert_id, index, alert.sent, alert.failed, alert.first_sent_at))
+
+    while True:
+        item = await loop.run_in_executor(None, queue.get)
+        if item is None:
+            break
+        alert_id, text, parse_mode, origin, recipients = item
+        if recipients is None:
+            recipients = [uid for uid in subscribers if shard_of(uid, count) == index]
+        alert = broadcaster.enqueue(text, recipients, parse_mode=parse_mode, origin=origin)
+        reports = [r for r in reports if not r.done()]
+        reports.append(asyncio.ensure_future(report(alert_id, alert)))
+
+    await broadcaster.close()
+    await asyncio.gather(*reports, return_exceptions=True)
+    session = await bot.get_session()
+    await session.close()
+    store.close()
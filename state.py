@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import os
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+# Gemeinsamer Zustand für Cooldowns pro Mint und Idempotenz von Webhook-Zustellungen.
+# "memory" reicht für einen einzelnen Prozess; für mehrere uvicorn-Worker auf einem Host
+# "sqlite", für mehrere Instanzen "redis" (jeder Server mit Redis-Protokoll).
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_DB = os.getenv("STATE_DB")  # Standard: whalerider-state.db neben WHALERIDER_DB
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+
+class MemoryState:
+    def __init__(self):
+        self._keys = {}  # key -> expires_at
+        self._heap = []  # (expires_at, key), zum Aufräumen ohne Vollscan
+
+    def _prune(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._keys.get(key) == expires_at:
+                del self._keys[key]
+
+    async def active(self, key: str) -> bool:
+        now = time.monotonic()
+        self._prune(now)
+        return key in self._keys
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        # setzt den Schlüssel nur, wenn er nicht (mehr) existiert; True bei Erfolg
+        now = time.monotonic()
+        self._prune(now)
+        if key in self._keys:
+            return False
+        expires_at = now + ttl
+        self._keys[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        return True
+
+    async def release(self, key: str):
+        self._keys.pop(key, None)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def close(self):
+        pass
+
+
+def state_db() -> str:
+    # eigene Datei: jeder Cooldown und jede Zustellung wäre sonst ein Commit in der Store-Datei
+    # von storage.py und würde dort die Snapshot-Prüfung bei jedem Zugriff anstoßen
+    if STATE_DB:
+        return STATE_DB
+    root, ext = os.path.splitext(os.getenv("WHALERIDER_DB", "whalerider.db"))
+    return f"{root}-state{ext or '.db'}"
+
+
+class SQLiteState:
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = None):
+        self._path = path
+        self._conn = None
+        self._ops = 0
+
+    @property
+    def path(self) -> str:
+        return self._path or state_db()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("CREATE TABLE IF NOT EXISTS state_keys (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS state_keys_expires_at ON state_keys (expires_at)")
+            self._conn = conn
+        return self._conn
+
+    def _maybe_prune(self, now: float):
+        self._ops += 1
+        if self._ops % self.PRUNE_EVERY == 0:
+            self.conn.execute("DELETE FROM state_keys WHERE expires_at <= ?", (now,))
+
+    async def active(self, key: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM state_keys WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        # Upsert, der nur abgelaufene Schlüssel überschreibt; atomar über alle Prozesse
+        now = time.time()
+        cur = self.conn.execute(
+            "INSERT INTO state_keys (key, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at WHERE state_keys.expires_at <= ?",
+            (key, now + ttl, now),
+        )
+        self._maybe_prune(now)
+        return cur.rowcount == 1
+
+    async def release(self, key: str):
+        self.conn.execute("DELETE FROM state_keys WHERE key = ?", (key,))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisState:
+    # Minimaler RESP-Client: SET NX PX / EXISTS / DEL über eine Verbindung
+    def __init__(self, url: str = None):
+        parsed = urlparse(url or REDIS_URL)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", self.db)
+
+    async def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode()
+        if prefix == b"-":
+            raise RedisError(body.decode())
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            return (await self._reader.readexactly(size + 2))[:-2].decode()
+        if prefix == b"*":
+            size = int(body)
+            return None if size < 0 else [await self._read_reply() for _ in range(size)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    async def command(self, *args):
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    await self._connect()
+                return await self._send(*args)
+            except BaseException:
+                # auch bei Abbruch oder Fehlerantwort: eine ungelesene Antwort würde sonst
+                # beim nächsten Befehl gelesen
+                self.close()
+                raise
+
+    async def active(self, key: str) -> bool:
+        return await self.command("EXISTS", key) == 1
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        return await self.command("SET", key, "1", "NX", "PX", int(ttl * 1000)) == "OK"
+
+    async def release(self, key: str):
+        await self.command("DEL", key)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# Fehler des Zustands-Backends; Aufrufer melden sie als vorübergehend statt mit HTTP 500
+STATE_ERRORS = (RedisError, OSError, EOFError, asyncio.TimeoutError, sqlite3.Error)
+
+
+def create_state(backend: str = None):
+    backend = backend or STATE_BACKEND
+    if backend == "sqlite":
+        return SQLiteState()
+    if backend == "redis":
+        return RedisState()
+    return MemoryState()
+
+
+state = create_state()
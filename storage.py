@@ -1,27 +1,407 @@
 import json
+import logging
 import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
 
+# Gemeinsamer Speicher für Bot und Webhook: SQLite im WAL-Modus.
+# Jede Tabelle wird als In-Memory-Snapshot gehalten und nur neu geladen, wenn ein anderer Prozess
+# genau diese Tabelle geändert hat: PRAGMA data_version meldet fremde Commits, Trigger zählen
+# pro Tabelle eine Version in table_versions hoch.
+
+DB_FILE = os.getenv("WHALERIDER_DB", "whalerider.db")
+
+# Alte Dateien, die beim ersten Start übernommen werden
 STORAGE_FILE = "subscribers.json"
+LEGACY_SUBS_FILE = "whale_subs.json"
+LEGACY_USERS_FILE = "whale_users.txt"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (user_id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS verified_users (user_id INTEGER PRIMARY KEY, wallet TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS premium_users (user_id INTEGER PRIMARY KEY, expires_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS premium_users_expires_at ON premium_users (expires_at);
+CREATE TABLE IF NOT EXISTS user_sessions (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS alert_preferences (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS burn_redemptions (
+    signature TEXT PRIMARY KEY, user_id INTEGER NOT NULL, wallet TEXT NOT NULL,
+    status TEXT NOT NULL, submitted_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS mints (
+    mint TEXT PRIMARY KEY, created_at REAL, slot INTEGER, symbol TEXT, creator TEXT, pump INTEGER,
+    recorded_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS mints_created_at ON mints (created_at);
+CREATE TABLE IF NOT EXISTS table_versions (tbl TEXT PRIMARY KEY, version INTEGER NOT NULL);
+"""
+
+# Tabellen mit In-Memory-Snapshot (PersistentSet/PersistentDict)
+SNAPSHOT_TABLES = ("subscribers", "verified_users", "premium_users", "user_sessions", "alert_preferences")
+SCHEMA += "".join(
+    f"INSERT OR IGNORE INTO table_versions (tbl, version) VALUES ('{table}', 0);\n"
+    + "".join(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} AFTER {op} ON {table} "
+        f"BEGIN UPDATE table_versions SET version = version + 1 WHERE tbl = '{table}'; END;\n"
+        for op in ("INSERT", "UPDATE", "DELETE")
+    )
+    for table in SNAPSHOT_TABLES
+)
+
+
+def _encode_datetime(value: datetime) -> float:
+    # naive Datetimes sind UTC (datetime.utcnow() im Bot)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _decode_datetime(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _read_legacy_ids():
+    ids = set()
+    for path in (STORAGE_FILE, LEGACY_SUBS_FILE):
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    ids.update(int(uid) for uid in json.load(f))
+                except (ValueError, TypeError):
+                    pass
+    if os.path.exists(LEGACY_USERS_FILE):
+        with open(LEGACY_USERS_FILE, "r") as f:
+            ids.update(int(line.strip()) for line in f if line.strip().isdigit())
+    return ids
+
+
+class Store:
+    def __init__(self, path: str = None):
+        self._path = path
+        self._conn = None
+        self._data_version = None
+        self._table_versions = {}
+
+    @property
+    def path(self) -> str:
+        # erst bei Benutzung lesen: Module, die storage.py früh importieren, legen den Pfad nicht fest
+        return self._path or os.getenv("WHALERIDER_DB", DB_FILE)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._migrate_legacy()
+        return self._conn
+
+    def data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def table_version(self, table: str) -> int:
+        # neu gelesen nur nach fremden Commits; eigene Schreibzugriffe meldet written()
+        version = self.data_version()
+        if version != self._data_version:
+            self._table_versions = dict(self.conn.execute("SELECT tbl, version FROM table_versions"))
+            self._data_version = version
+        return self._table_versions.get(table, 0)
+
+    def written(self, table: str) -> int:
+        # Version nach einem eigenen Schreibzugriff
+        row = self.conn.execute("SELECT version FROM table_versions WHERE tbl = ?", (table,)).fetchone()
+        self._table_versions[table] = row[0] if row else 0
+        return self._table_versions[table]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._data_version = None
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _migrate_legacy(self):
+        if self.get_meta("legacy_migrated"):
+            return
+        ids = _read_legacy_ids()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", ((uid,) for uid in ids))
+            self.set_meta("legacy_migrated", datetime.utcnow().isoformat())
+        if ids:
+            logging.info("Migrated %s subscribers from legacy files into %s", len(ids), self.path)
+
+
+class PersistentSet:
+    def __init__(self, store: Store, table: str):
+        self.store = store
+        self.table = table
+        self._data = set()
+        self._version = None
+        self.generation = 0  # steigt bei jeder Änderung, für abgeleitete Indizes
+
+    def _snapshot(self) -> set:
+        version = self.store.table_version(self.table)
+        if version != self._version:
+            rows = self.store.conn.execute(f"SELECT user_id FROM {self.table}")
+            self._data = {row[0] for row in rows}
+            self._version = version
+            self.generation += 1
+        return self._data
+
+    def _written(self, rows: int):
+        # nur die eigenen Zeilen dazwischen: Snapshot ist aktuell, sonst beim nächsten Zugriff neu laden
+        version = self.store.written(self.table)
+        if version == self._version + rows:
+            self._version = version
+
+    def __contains__(self, key):
+        return key in self._snapshot()
+
+    def __iter__(self):
+        return iter(self._snapshot())
+
+    def __len__(self):
+        return len(self._snapshot())
+
+    def add(self, key):
+        data = self._snapshot()
+        cursor = self.store.conn.execute(f"INSERT OR IGNORE INTO {self.table} (user_id) VALUES (?)", (key,))
+        data.add(key)
+        self._written(cursor.rowcount)
+        self.generation += 1
+
+    def discard(self, key):
+        data = self._snapshot()
+        cursor = self.store.conn.execute(f"DELETE FROM {self.table} WHERE user_id = ?", (key,))
+        data.discard(key)
+        self._written(cursor.rowcount)
+        self.generation += 1
+
+    def remove(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.discard(key)
+
+
+class PersistentDict:
+    def __init__(self, store: Store, table: str, column: str, encode=None, decode=None):
+        self.store = store
+        self.table = table
+        self.column = column
+        self.encode = encode or (lambda v: v)
+        self.decode = decode or (lambda v: v)
+        self._data = {}
+        self._version = None
+        self.generation = 0  # steigt bei jeder Änderung, für abgeleitete Indizes
+
+    def _snapshot(self) -> dict:
+        version = self.store.table_version(self.table)
+        if version != self._version:
+            rows = self.store.conn.execute(f"SELECT user_id, {self.column} FROM {self.table}")
+            self._data = {user_id: self.decode(value) for user_id, value in rows}
+            self._version = version
+            self.generation += 1
+        return self._data
+
+    def _written(self, rows: int):
+        version = self.store.written(self.table)
+        if version == self._version + rows:
+            self._version = version
+
+    def __contains__(self, key):
+        return key in self._snapshot()
+
+    def __getitem__(self, key):
+        return self._snapshot()[key]
+
+    def __iter__(self):
+        return iter(self._snapshot())
+
+    def __len__(self):
+        return len(self._snapshot())
+
+    def get(self, key, default=None):
+        return self._snapshot().get(key, default)
+
+    def items(self):
+        return self._snapshot().items()
+
+    def __setitem__(self, key, value):
+        data = self._snapshot()
+        cursor = self.store.conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (user_id, {self.column}) VALUES (?, ?)",
+            (key, self.encode(value)),
+        )
+        data[key] = value
+        self._written(cursor.rowcount)
+        self.generation += 1
+
+    def pop(self, key, default=None):
+        data = self._snapshot()
+        cursor = self.store.conn.execute(f"DELETE FROM {self.table} WHERE user_id = ?", (key,))
+        self._written(cursor.rowcount)
+        self.generation += 1
+        return data.pop(key, default)
+
+
+class PremiumUsers(PersistentDict):
+    def __init__(self, store: Store):
+        super().__init__(store, "premium_users", "expires_at", _encode_datetime, _decode_datetime)
+
+    def expired(self, now: datetime = None):
+        # nutzt den Index auf expires_at statt alle Nutzer zu prüfen
+        now = now or datetime.utcnow()
+        rows = self.store.conn.execute(
+            "SELECT user_id FROM premium_users WHERE expires_at <= ?", (_encode_datetime(now),)
+        )
+        return [row[0] for row in rows]
+
+    def extend(self, user_id: int, duration: timedelta, now: datetime = None) -> datetime:
+        # stapelt auf ein noch laufendes Premium statt es zu überschreiben
+        now = now or datetime.utcnow()
+        current = self.get(user_id)
+        expiry = max(now, current) + duration if current else now + duration
+        self[user_id] = expiry
+        return expiry
+
+
+class BurnRedemptions:
+    # Eingelöste und laufende Burn-Transaktionen; der Primärschlüssel auf der Signatur
+    # verhindert, dass ein TX-Hash zweimal Premium bringt (auch zwischen Bot-Prozessen)
+    def __init__(self, store: Store):
+        self.store = store
+
+    def claim(self, signature: str, user_id: int, wallet: str) -> bool:
+        # True, wenn die Signatur neu war und jetzt als "pending" reserviert ist
+        cursor = self.store.conn.execute(
+            "INSERT OR IGNORE INTO burn_redemptions (signature, user_id, wallet, status, submitted_at) "
+            "VALUES (?, ?, ?, 'pending', ?)",
+            (signature, user_id, wallet, _encode_datetime(datetime.utcnow())),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, signature: str):
+        # (user_id, status) oder None
+        return self.store.conn.execute(
+            "SELECT user_id, status FROM burn_redemptions WHERE signature = ?", (signature,)
+        ).fetchone()
+
+    def pending(self):
+        # (signature, user_id, wallet, submitted_at) aller noch nicht entschiedenen Burns
+        rows = self.store.conn.execute(
+            "SELECT signature, user_id, wallet, submitted_at FROM burn_redemptions WHERE status = 'pending'"
+        )
+        return [(sig, uid, wallet, _decode_datetime(ts)) for sig, uid, wallet, ts in rows]
+
+    def release(self, signature: str):
+        # abgelehnte oder nie bestätigte Signaturen wieder freigeben
+        self.store.conn.execute("DELETE FROM burn_redemptions WHERE signature = ? AND status = 'pending'", (signature,))
+
+    def redeem(self, signature: str, premium_users: PremiumUsers, duration: timedelta):
+        # Signatur als eingelöst markieren und Premium verlängern, in einer Transaktion.
+        # None, wenn die Signatur schon eingelöst oder nicht mehr reserviert war
+        with self.store.conn:
+            self.store.conn.execute("BEGIN IMMEDIATE")
+            row = self.store.conn.execute(
+                "SELECT user_id FROM burn_redemptions WHERE signature = ? AND status = 'pending'", (signature,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.store.conn.execute("UPDATE burn_redemptions SET status = 'redeemed' WHERE signature = ?", (signature,))
+            return premium_users.extend(row[0], duration)
+
+
+MintRecord = namedtuple("MintRecord", "mint created_at slot symbol creator pump")
+
+MINT_UPSERT = (
+    "INSERT INTO mints (mint, created_at, slot, symbol, creator, pump, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(mint) DO UPDATE SET "
+    "created_at = CASE WHEN mints.created_at IS NULL OR excluded.created_at < mints.created_at "
+    "THEN COALESCE(excluded.created_at, mints.created_at) ELSE mints.created_at END, "
+    "slot = COALESCE(mints.slot, excluded.slot), symbol = COALESCE(excluded.symbol, mints.symbol), "
+    "creator = COALESCE(mints.creator, excluded.creator), pump = COALESCE(mints.pump, excluded.pump)"
+)
+
+
+class MintRegistry:
+    # Bekannte Mints mit Erstellungszeit, Slot, Symbol, Creator und Pump.fun-Herkunft.
+    # Direkte Abfragen über den Primärschlüssel statt Snapshot: die Tabelle wächst mit jedem Create.
+    # Felder können fehlen (None), z.B. das Symbol bei Creates aus dem Webhook.
+    def __init__(self, store: Store):
+        self.store = store
+
+    def get(self, mint: str):
+        # MintRecord (created_at als UTC-Datetime) oder None
+        row = self.store.conn.execute(
+            "SELECT mint, created_at, slot, symbol, creator, pump FROM mints WHERE mint = ?", (mint,)
+        ).fetchone()
+        if row is None:
+            return None
+        mint, created_at, slot, symbol, creator, pump = row
+        created = datetime.fromtimestamp(created_at, tz=timezone.utc) if created_at is not None else None
+        return MintRecord(mint, created, slot, symbol, creator, None if pump is None else bool(pump))
+
+    def record(self, mint: str, created_at: datetime = None, slot: int = None, symbol: str = None,
+               creator: str = None, pump: bool = None):
+        # Upsert: die früheste Erstellungszeit gewinnt, bekannte Felder werden nur ergänzt
+        self.record_many([MintRecord(mint, created_at, slot, symbol, creator, pump)])
+
+    def record_many(self, records):
+        now = datetime.now(timezone.utc).timestamp()
+        rows = [
+            (r.mint, _encode_datetime(r.created_at) if r.created_at else None, r.slot, r.symbol, r.creator,
+             None if r.pump is None else int(r.pump), now)
+            for r in records
+        ]
+        with self.store.conn:
+            self.store.conn.execute("BEGIN")  # ein Commit für alle Zeilen
+            self.store.conn.executemany(MINT_UPSERT, rows)
+
+    def prune(self, max_age: timedelta) -> int:
+        # Mints älter als max_age löschen; ohne Erstellungszeit zählt der Zeitpunkt des Eintrags
+        cutoff = _encode_datetime(datetime.utcnow() - max_age)
+        cursor = self.store.conn.execute(
+            "DELETE FROM mints WHERE created_at < ? OR (created_at IS NULL AND recorded_at < ?)", (cutoff, cutoff)
+        )
+        return cursor.rowcount
+
+    def __len__(self):
+        return self.store.conn.execute("SELECT COUNT(*) FROM mints").fetchone()[0]
+
+
+store = Store()
+subscribers = PersistentSet(store, "subscribers")
+verified_users = PersistentDict(store, "verified_users", "wallet")
+premium_users = PremiumUsers(store)
+burn_redemptions = BurnRedemptions(store)
+mint_registry = MintRegistry(store)
+user_sessions = PersistentDict(store, "user_sessions", "data", json.dumps, json.loads)
+alert_preferences = PersistentDict(store, "alert_preferences", "data", json.dumps, json.loads)
+
 
 def load_users():
-    if not os.path.exists(STORAGE_FILE):
-        return set()
-    with open(STORAGE_FILE, "r") as f:
-        try:
-            return set(json.load(f))
-        except:
-            return set()
+    return set(subscribers)
 
 def save_users(users: set):
-    with open(STORAGE_FILE, "w") as f:
-        json.dump(list(users), f)
+    current = set(subscribers)
+    for user_id in current - users:
+        subscribers.discard(user_id)
+    for user_id in users - current:
+        subscribers.add(user_id)
 
 def add_user(user_id: int):
-    users = load_users()
-    users.add(user_id)
-    save_users(users)
+    subscribers.add(user_id)
 
 def remove_user(user_id: int):
-    users = load_users()
-    users.discard(user_id)
-    save_users(users)
+    subscribers.discard(user_id)
@@ -0,0 +1,328 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import random
+import struct
+import time
+from collections import deque
+
+import aiohttp
+
+from coalesce import BatchLoader
+from credits import attribute
+from helius import helius, REQUEST_ERRORS
+from poller import POLL_PAGE_LIMIT, SeenIndex
+import registry
+from whales import Candidate, threshold
+
+# Echtzeit-Erkennung über den Solana-Websocket (logsSubscribe auf das Pump.fun-Programm)
+# statt Polling. Käufe werden aus dem TradeEvent in den Logs dekodiert und laufen ohne
+# Helius-Aufruf in die Pipeline; nur Käufe ohne lesbares Event werden per Helius als Enhanced
+# Transaction nachgeladen (ohne on_candidate nur die über der SOL-Schwelle).
+# Der Cursor (letzte Signatur, bis zu der alles verarbeitet ist) rückt nur lückenlos in
+# Eingangsreihenfolge vor und wird höchstens alle STREAM_CURSOR_COMMIT_SECONDS gespeichert.
+
+PUMP_PROGRAM_ID = registry.PUMP_PROGRAM_ID
+STREAM_MAX_BACKOFF = float(os.getenv("STREAM_MAX_BACKOFF", 60))
+STREAM_BACKFILL_MAX_PAGES = int(os.getenv("STREAM_BACKFILL_MAX_PAGES", 10))
+STREAM_CURSOR_COMMIT_SECONDS = float(os.getenv("STREAM_CURSOR_COMMIT_SECONDS", 1))
+STREAM_CURSOR_KEY = "stream_last_signature"
+LATENCY_SAMPLES = 1000
+TRADE_EVENT_DISCRIMINATOR = hashlib.sha256(b"event:TradeEvent").digest()[:8]  # Anchor-Event
+
+
+def ws_url_from_rpc(rpc_url: str) -> str:
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+def is_buy_log(logs) -> bool:
+    # günstiger Vorfilter auf den Programm-Logs, bevor Helius gefragt wird
+    return any("Instruction: Buy" in line for line in logs or ())
+
+
+def parse_notification(data):
+    # logsNotification -> (slot, signatur, err, logs); None für unvollständige Nachrichten
+    params = data.get("params") if isinstance(data, dict) else None
+    result = params.get("result") if isinstance(params, dict) else None
+    if not isinstance(result, dict):
+        return None
+    value, context = result.get("value"), result.get("context")
+    if not isinstance(value, dict) or not isinstance(context, dict):
+        return None
+    signature, logs = value.get("signature"), value.get("logs")
+    if not isinstance(signature, str) or not isinstance(logs, list):
+        return None
+    return context.get("slot"), signature, value.get("err"), [line for line in logs if isinstance(line, str)]
+
+
+def parse_trade_event(data: bytes):
+    # Pump.fun TradeEvent: mint, sol_amount, token_amount, is_buy, user, timestamp, ...;
+    # (mint, käufer, sol, is_buy, timestamp) oder None für andere Events
+    if data[:8] != TRADE_EVENT_DISCRIMINATOR or len(data) < 97:
+        return None
+    (sol_amount,) = struct.unpack_from("<Q", data, 40)
+    (timestamp,) = struct.unpack_from("<q", data, 89)
+    return registry.b58encode(data[8:40]), registry.b58encode(data[57:89]), sol_amount / 1e9, bool(data[56]), timestamp
+
+
+def buy_from_logs(logs, signature: str, program_id: str = None):
+    # Candidate aus den TradeEvents des Pump-Programms (Käufe des ersten Mints summiert wie
+    # bei den nativeTransfers der Enhanced Transaction); None ohne lesbares Kauf-Event
+    buys = []
+    for data in registry.program_data(logs, program_id):
+        try:
+            event = parse_trade_event(base64.b64decode(data))
+        except (binascii.Error, struct.error, ValueError):
+            continue
+        if event is not None and event[3]:
+            buys.append(event)
+    if not buys:
+        return None
+    mint, buyer, _, _, timestamp = buys[0]
+    sol = sum(event[2] for event in buys if event[0] == mint)
+    return Candidate(signature, mint, buyer, sol, timestamp or None)
+
+
+async def _fetch_transactions(signatures):
+    with attribute("stream"):
+        txs = await helius.transactions(signatures)
+    return {tx.get("signature"): tx for tx in txs if tx}
+
+
+class LatencyStats:
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self.size = size
+        self.samples = []
+        self.count = 0
+
+    def add(self, seconds: float):
+        if len(self.samples) >= self.size:
+            self.samples[self.count % self.size] = seconds
+        else:
+            self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> dict:
+        return {"count": self.count, "p50": self.percentile(50), "p99": self.percentile(99)}
+
+
+class WhaleStream:
+    def __init__(self, on_transaction, ws_url=None, program_id=None, store=None, on_candidate=None):
+        # on_transaction(tx) / on_candidate(candidate) -> bool, True wenn der Kauf zur Anreicherung
+        # angenommen wurde; ohne on_candidate wird jeder Kauf über der Schwelle nachgeladen
+        self.on_transaction = on_transaction
+        self.on_candidate = on_candidate
+        self.ws_url = ws_url or os.getenv("RPC_WS_URL") or ws_url_from_rpc(os.getenv("RPC_URL", ""))
+        self.program_id = program_id or PUMP_PROGRAM_ID
+        self.store = store
+        self.last_slot = None
+        self.last_signature = store.get_meta(STREAM_CURSOR_KEY) if store else None
+        self.tx_loader = BatchLoader(_fetch_transactions)
+        self.detection_latency = LatencyStats()  # Notification empfangen -> Alert eingereiht
+        self.chain_latency = LatencyStats()      # Block-Zeit -> Alert eingereiht
+        self.decoded = 0   # Käufe aus dem TradeEvent
+        self.fetched = 0   # Käufe über Helius nachgeladen
+        self.skipped = 0   # unter der Schwelle, nicht nachgeladen
+        self.malformed = 0
+        self._seen = SeenIndex()
+        self._tasks = set()
+        self._inflight = deque()  # [signatur, fertig] in Eingangsreihenfolge
+        self._saved_signature = self.last_signature
+        self._saved_at = 0.0
+
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                session = await helius.session()
+                async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+                    backoff = 1
+                    await self._subscribe(ws)
+                    if self.last_signature:
+                        # Cursor bleibt vor neuen Käufen stehen, bis der Backfill durch ist
+                        self._spawn(self._backfill(self._track(None)))
+                    await self._read(ws)
+                logging.warning("Websocket geschlossen, verbinde neu")
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"Websocket-Fehler: {e}")
+            except Exception as e:
+                logging.error(f"Stream-Fehler: {e}")
+            self._commit_cursor(force=True)
+            await asyncio.sleep(backoff + random.uniform(0, backoff / 2))
+            backoff = min(backoff * 2, STREAM_MAX_BACKOFF)
+
+    async def _subscribe(self, ws):
+        await ws.send_json({
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "logsSubscribe",
+            "params": [{"mentions": [self.program_id]}, {"commitment": "confirmed"}],
+        })
+
+    async def _read(self, ws):
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                if message.type == aiohttp.WSMsgType.ERROR:
+                    raise aiohttp.ClientError(str(ws.exception()))
+                continue
+            try:
+                data = json.loads(message.data)
+            except ValueError:
+                self._malformed(message.data)
+                continue
+            if not isinstance(data, dict) or data.get("method") != "logsNotification":
+                continue
+            notification = parse_notification(data)
+            if notification is None:
+                self._malformed(message.data)
+                continue
+            slot, signature, err, logs = notification
+            if err is not None:
+                continue
+            if registry.is_create_log(logs):
+                # CreateEvent direkt aus den Logs ins Mint-Register, ohne Helius-Aufruf
+                try:
+                    registry.observe_logs(logs, slot, self.program_id)
+                except Exception as e:
+                    logging.error(f"Mint-Register aus Stream-Logs fehlgeschlagen: {e}")
+            if not is_buy_log(logs):
+                continue
+            self.last_slot = slot
+            if not self._seen.add(signature):
+                continue
+            buy = buy_from_logs(logs, signature, self.program_id)
+            if buy is not None and self.on_candidate is None and threshold(buy):
+                self.skipped += 1
+                continue
+            self._spawn(self._handle(signature, time.monotonic(), self._track(signature), buy))
+
+    def _malformed(self, raw):
+        self.malformed += 1
+        logging.warning(f"Unvollständige Stream-Nachricht übersprungen: {str(raw)[:200]}")
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, signature: str, received_at: float, entry: list, buy: Candidate = None):
+        try:
+            if buy is not None and self.on_candidate is not None:
+                self.decoded += 1
+                accepted, timestamp = await self.on_candidate(buy), buy.ts
+            else:
+                try:
+                    tx = await self.tx_loader.load(signature)
+                except (*REQUEST_ERRORS, KeyError) as e:
+                    logging.warning(f"Transaktion {signature} nicht ladbar: {e}")
+                    return
+                self.fetched += 1
+                accepted, timestamp = await self.on_transaction(tx), tx.get("timestamp")
+            if accepted:
+                self._observe(received_at, timestamp)
+        except Exception as e:
+            logging.error(f"Stream-Verarbeitung von {signature} fehlgeschlagen: {e}")
+        finally:
+            self._done(entry)
+
+    def _observe(self, received_at: float, timestamp):
+        self.detection_latency.add(time.monotonic() - received_at)
+        if timestamp:
+            self.chain_latency.add(time.time() - timestamp)
+        if self.detection_latency.count % 100 == 0:
+            logging.info(f"Stream-Latenz: {self.stats()}")
+
+    # --- Cursor ---
+
+    def _track(self, signature) -> list:
+        entry = [signature, False]
+        self._inflight.append(entry)
+        return entry
+
+    def _done(self, entry: list):
+        # Cursor nur bis zum ältesten noch nicht verarbeiteten Eintrag
+        entry[1] = True
+        while self._inflight and self._inflight[0][1]:
+            signature = self._inflight.popleft()[0]
+            if signature:
+                self.last_signature = signature
+        self._commit_cursor()
+
+    def _commit_cursor(self, force: bool = False):
+        # gebündelt statt einem Commit pro Transaktion; nach einem Absturz wird höchstens
+        # STREAM_CURSOR_COMMIT_SECONDS erneut verarbeitet (Duplikate fängt die Pipeline ab)
+        if not self.store or self.last_signature == self._saved_signature:
+            return
+        now = time.monotonic()
+        if not force and now - self._saved_at < STREAM_CURSOR_COMMIT_SECONDS:
+            return
+        try:
+            self.store.set_meta(STREAM_CURSOR_KEY, self.last_signature)
+        except Exception as e:
+            logging.error(f"Stream-Cursor nicht gespeichert: {e}")
+            return
+        self._saved_signature, self._saved_at = self.last_signature, now
+
+    async def _backfill(self, entry: list):
+        # alles seit der letzten verarbeiteten Signatur nachholen (Verbindungsabbruch/Neustart),
+        # mit before weiterblättern bis zum Cursor oder STREAM_BACKFILL_MAX_PAGES
+        until, before, txs = self.last_signature, None, []
+        try:
+            for _ in range(STREAM_BACKFILL_MAX_PAGES):
+                with attribute("stream"):
+                    page = await helius.address_transactions(
+                        self.program_id, before=before, until=until, limit=POLL_PAGE_LIMIT
+                    )
+                txs.extend(page or ())
+                before = page[-1].get("signature") if page else None
+                if not before or len(page) < POLL_PAGE_LIMIT:
+                    break
+            else:
+                logging.warning(
+                    f"Backfill: mehr als {STREAM_BACKFILL_MAX_PAGES} Seiten seit {until}, "
+                    f"Transaktionen vor {before} werden nicht nachgeholt"
+                )
+        except REQUEST_ERRORS as e:
+            logging.warning(f"Backfill nach {len(txs)} Transaktionen abgebrochen: {e}")
+        try:
+            now = time.monotonic()
+            for tx in reversed(txs):
+                signature = tx.get("signature")
+                if not signature or not self._seen.add(signature):
+                    continue
+                try:
+                    if await self.on_transaction(tx):
+                        self._observe(now, tx.get("timestamp"))
+                except Exception as e:
+                    logging.error(f"Backfill von {signature} fehlgeschlagen: {e}")
+        finally:
+            self._done(entry)
+
+    def stats(self) -> dict:
+        return {
+            "last_slot": self.last_slot,
+            "last_signature": self.last_signature,
+            "in_flight": len(self._inflight),
+            "decoded": self.decoded,
+            "fetched": self.fetched,
+            "skipped": self.skipped,
+            "malformed": self.malformed,
+            "detection_to_alert": self.detection_latency.summary(),
+            "chain_to_alert": self.chain_latency.summary(),
+        }
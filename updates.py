@@ -0,0 +1,171 @@
+import asyncio
+import importlib
+import logging
+import os
+from collections import deque
+
+from metrics import QUEUE_DEPTH
+from poller import SeenIndex
+
+# Telegram-Updates per Webhook im selben FastAPI/uvicorn-Prozess wie /pumpwhale.
+# TELEGRAM_BOT nennt das Bot-Modul (whalerider_bot oder whalerider_bot1); dessen Dispatcher,
+# Broadcaster und Hintergrund-Tasks laufen dann in der Event-Loop des Webhooks, mit denselben
+# Sessions, Caches und demselben Store. Ohne TELEGRAM_BOT bleibt es beim Polling im Bot-Prozess.
+#
+# Updates verschiedener Chats laufen gleichzeitig (höchstens TELEGRAM_UPDATE_CONCURRENCY),
+# innerhalb eines Chats strikt nacheinander in Eingangsreihenfolge.
+
+TELEGRAM_BOT = os.getenv("TELEGRAM_BOT", "")  # leer = kein Telegram-Webhook
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")  # öffentliche URL von /telegram
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")  # Pflicht, sonst wird jedes Update abgelehnt
+TELEGRAM_UPDATE_CONCURRENCY = int(os.getenv("TELEGRAM_UPDATE_CONCURRENCY", 32))
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+def chat_key(update: dict):
+    # Reihenfolge gilt pro Chat; Callback-Queries hängen am Chat der Nachricht mit dem Button
+    for kind in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        if kind in update:
+            return update[kind].get("chat", {}).get("id")
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message") or {}
+        return message.get("chat", {}).get("id") or callback.get("from", {}).get("id")
+    for kind in ("inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query"):
+        if kind in update:
+            return update[kind].get("from", {}).get("id")
+    return None
+
+
+class ChatSerializer:
+    # pro Schlüssel eine Warteschlange mit höchstens einem aktiven Task; Tasks gibt es nur
+    # für Chats mit offenen Updates, sie enden, sobald deren Warteschlange leer ist
+    def __init__(self, handler, concurrency: int = None):
+        self.handler = handler  # async handler(item)
+        self._semaphore = asyncio.Semaphore(concurrency or TELEGRAM_UPDATE_CONCURRENCY)
+        self._queues = {}  # key -> deque
+        self._tasks = set()
+        self.pending = 0
+        self.processed = 0
+        self.errors = 0
+
+    def submit(self, key, item):
+        self.pending += 1
+        if key is None:
+            key = object()  # ohne Chat keine Reihenfolge nötig
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(item)
+            return
+        self._queues[key] = deque([item])
+        task = asyncio.ensure_future(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key):
+        queue = self._queues[key]
+        try:
+            while queue:
+                item = queue.popleft()
+                async with self._semaphore:
+                    try:
+                        await self.handler(item)
+                    except Exception as e:
+                        self.errors += 1
+                        logging.error(f"Update handler error: {e}")
+                    finally:
+                        self.pending -= 1
+                        self.processed += 1
+        finally:
+            del self._queues[key]
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._queues)
+
+    async def join(self):
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "active_chats": self.active_chats,
+            "processed": self.processed,
+            "errors": self.errors,
+        }
+
+
+class TelegramUpdates:
+    def __init__(self, module_name: str = None):
+        self.module_name = module_name or TELEGRAM_BOT
+        self.module = None
+        self._loading = None
+        self._seen = SeenIndex(10_000)  # Telegram stellt bei langsamer Antwort erneut zu
+        self.serializer = ChatSerializer(self._process)
+        self.duplicates = 0
+        QUEUE_DEPTH.set_function(lambda: self.serializer.pending, "telegram_updates")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.module_name)
+
+    async def load(self):
+        # Bot-Modul (aiogram, Dispatcher, Handler) im Thread importieren; nur einmal
+        if self.module is None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(asyncio.to_thread(importlib.import_module, self.module_name))
+            self.module = await self._loading
+        return self.module
+
+    async def start(self):
+        # Hintergrund-Tasks des Bots starten und den Webhook bei Telegram eintragen
+        module = await self.load()
+        module.start_background(sources=False)  # Käufe kommen über /pumpwhale
+        if not TELEGRAM_WEBHOOK_SECRET:
+            logging.error("TELEGRAM_WEBHOOK_SECRET fehlt, /telegram lehnt alle Updates ab")
+        if TELEGRAM_WEBHOOK_URL:
+            await module.bot.set_webhook(
+                TELEGRAM_WEBHOOK_URL,
+                secret_token=TELEGRAM_WEBHOOK_SECRET,
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=40,
+            )
+            logging.info(f"Telegram-Webhook gesetzt: {TELEGRAM_WEBHOOK_URL}")
+        else:
+            logging.warning("TELEGRAM_WEBHOOK_URL fehlt, Webhook muss von Hand gesetzt sein")
+
+    def authorized(self, secret: str) -> bool:
+        # ohne Secret könnte jeder Updates im Namen beliebiger Nutzer schicken
+        return bool(TELEGRAM_WEBHOOK_SECRET) and secret == TELEGRAM_WEBHOOK_SECRET
+
+    def submit(self, update: dict) -> bool:
+        # False für bereits gesehene update_ids; ohne update_id keine Deduplizierung
+        update_id = update.get("update_id")
+        if update_id is not None and not self._seen.add(update_id):
+            self.duplicates += 1
+            return False
+        self.serializer.submit(chat_key(update), update)
+        return True
+
+    async def _process(self, update: dict):
+        module = await self.load()
+        from aiogram import Bot, Dispatcher, types
+
+        # aiogram erwartet Bot und Dispatcher im Kontext, wie in dessen eigenem Webhook-Handler
+        Bot.set_current(module.bot)
+        Dispatcher.set_current(module.dp)
+        await module.dp.process_update(types.Update.to_object(update))
+
+    async def close(self):
+        await self.serializer.join()
+        if self.module is not None:
+            await self.module.pipeline.close()
+            await self.module.digest.close()
+
+    def stats(self) -> dict:
+        return {"module": self.module_name, "loaded": self.module is not None,
+                "duplicates": self.duplicates, **self.serializer.stats()}
+
+
+telegram_updates = TelegramUpdates()
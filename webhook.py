@@ -1,109 +1,227 @@
 import os
 import logging
-from datetime import datetime, timezone
-from fastapi import FastAPI, Request, Header, HTTPException
-from aiogram import Bot
-import requests
+from fastapi import FastAPI, Request, Header, HTTPException, Response
 import asyncio
+import importlib
+import time
+
+from fastpath import deliveries, dumps, loads, may_contain_candidates
+from credits import credits
+from digest import AlertDigest
+from helius import helius
+from metrics import FILTER_OUTCOMES, QUEUE_DEPTH, WEBHOOK_REQUESTS, render as render_metrics
+from storage import store, subscribers
+from state import state
+from mint_cache import mint_cache, metadata_loader
+from pipeline import STATE_UNAVAILABLE, Pipeline
+import registry
+from updates import telegram_updates
+from whales import matcher
+from windows import aggregator
 
 # Initialisierung
+# Kaltstart (Render free): aiogram, Bot und Broadcaster werden erst im Warm-up bzw. beim ersten
+# Alert geladen, /healthz und /pumpwhale antworten schon vorher.
+# Mit TELEGRAM_BOT läuft der Bot im selben Prozess (updates.py): Telegram-Updates kommen über
+# /telegram, Bot und Broadcaster gehören dann dem Bot-Modul.
 logging.basicConfig(level=logging.INFO)
-bot = Bot(token=os.getenv("TELEGRAM_API_TOKEN"))
 app = FastAPI()
-
-PUMP_AUTH = "TSLvdd1pWpHVjahSpsvCXUbgwsL3JAcvokwaKt1eokM"
-RATE_LIMIT_SECONDS = 30  # mindestens 30 Sekunden Pause zwischen Alerts pro Token
-last_alert_time = {}     # mint -> datetime
-
-
-def load_telegram_users():
+bot = None
+broadcaster = None
+
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 8))
+WEBHOOK_QUEUE_POLICY = os.getenv("WEBHOOK_QUEUE_POLICY", "drop_oldest")  # oder "shed"
+WEBHOOK_SHED_SOL = float(os.getenv("WEBHOOK_SHED_SOL", 20))
+WEBHOOK_WARMUP = os.getenv("WEBHOOK_WARMUP", "1") == "1"  # 0 = alles erst bei Bedarf laden
+WARMUP_MODULES = ("aiogram", "broadcast", "shards")
+
+warmup = {"started": time.monotonic(), "done": None, "error": None}
+
+
+def get_broadcaster():
+    # Abonnenten kommen aus dem gemeinsamen Store (whale_users.txt wird beim ersten Start migriert)
+    global bot, broadcaster
+    if broadcaster is None and telegram_updates.enabled:
+        module = importlib.import_module(telegram_updates.module_name)  # meist schon im Warm-up geladen
+        bot, broadcaster = module.bot, module.broadcaster
+    elif broadcaster is None:
+        from aiogram import Bot
+        from broadcast import api_server
+        from shards import create_broadcaster
+
+        bot = Bot(token=os.getenv("TELEGRAM_API_TOKEN"), server=api_server())
+        broadcaster = create_broadcaster(bot, subscribers)
+    return broadcaster
+
+
+async def warm_up():
+    # schwere Imports im Thread, damit der Event-Loop weiter Requests annimmt;
+    # danach Snapshots, Matcher-Index und Verbindungen zu Helius und Telegram
     try:
-        with open("whale_users.txt", "r") as f:
-            return [int(line.strip()) for line in f if line.strip().isdigit()]
-    except FileNotFoundError:
-        return []
-
-
-def get_mint_timestamp(mint):
-    url = f"https://api.helius.xyz/v0/addresses/{mint}/transactions?api-key={os.getenv('HELIUS_API_KEY')}"
-    txs = requests.get(url).json()
-    ts = datetime.fromisoformat(txs[-1]["timestamp"].replace("Z", "+00:00"))
-    return ts
-
-
-@app.post("/pumpwhale")
-async def pump_webhook(payload: dict, authorization: str = Header(None)):
-    if authorization != os.getenv("AUTH_HEADER"):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    tx_type = payload.get("type")
-    if tx_type not in ("BUY", "SWAP"):
-        return {"status": "ignored"}
-
-    token_transfers = payload.get("tokenTransfers", [])
-    if not token_transfers:
-        return {"status": "no token transfers"}
+        for name in WARMUP_MODULES:
+            await asyncio.to_thread(importlib.import_module, name)
+        if telegram_updates.enabled:
+            await telegram_updates.load()
+        get_broadcaster()
+        len(subscribers)
+        matcher.min_sol
+        await state.active("warmup")
+        await helius.warm_up()
+        try:
+            await bot.get_me()
+        except Exception as e:
+            logging.info(f"Telegram warm-up fehlgeschlagen: {e}")
+        warmup["done"] = time.monotonic()
+        logging.info(f"Warm-up fertig nach {warmup['done'] - warmup['started']:.2f}s")
+    except Exception as e:
+        warmup["error"] = str(e)
+        logging.error(f"Warm-up error: {e}")
+
+
+# Versand direkt oder gesammelt pro Nutzer (ALERT_DIGEST_SECONDS); Anreicherung und Versand
+# laufen in den Workern der Pipeline, nicht im Request. Mit TELEGRAM_BOT gehören Pipeline und
+# Digest dem Bot-Modul (ein Digest pro Nutzer, sonst doppelte Nachrichten), siehe get_pipeline().
+if telegram_updates.enabled:
+    digest = pipeline = None
+else:
+    digest = AlertDigest(get_broadcaster, parse_mode="Markdown", name="webhook digest")
+    pipeline = Pipeline(
+        digest.deliver,
+        name="webhook",
+        maxsize=WEBHOOK_QUEUE_SIZE,
+        workers=WEBHOOK_WORKERS,
+        policy=WEBHOOK_QUEUE_POLICY,
+        shed_threshold=WEBHOOK_SHED_SOL,
+    )
 
-    mint = token_transfers[0].get("mint")
-    if not mint:
-        return {"status": "no mint"}
 
-    # Ratenbegrenzung
-    now = datetime.now(timezone.utc)
-    last_sent = last_alert_time.get(mint)
-    if last_sent and (now - last_sent).total_seconds() < RATE_LIMIT_SECONDS:
-        return {"status": "rate limited"}
+async def get_pipeline() -> Pipeline:
+    global digest, pipeline
+    if pipeline is None:
+        module = await telegram_updates.load()  # meist schon im Warm-up geladen
+        digest, pipeline = module.digest, module.pipeline
+    return pipeline
+QUEUE_DEPTH.set_function(lambda: broadcaster.queue_depth if broadcaster else 0, "broadcast")
 
-    # Volumen prüfen
-    native_transfers = payload.get("nativeTransfers", [])
-    sol_sent = sum(t.get("amount", 0) for t in native_transfers) / 1e9
-    if sol_sent < 10:
-        return {"status": "unter 10 SOL"}
 
-    # Alter prüfen
+async def start_telegram():
     try:
-        mint_time = get_mint_timestamp(mint)
+        await telegram_updates.start()
     except Exception as e:
-        logging.warning(f"Mint-Zeit konnte nicht ermittelt werden: {e}")
-        return {"status": "mint lookup failed"}
-
-    age = (now - mint_time).total_seconds() / 60
-    if age > 60:
-        return {"status": "Token zu alt"}
-
-    # Metadaten holen
+        logging.error(f"Telegram start error: {e}")
+
+
+@app.on_event("startup")
+async def start_workers():
+    if pipeline is not None:
+        pipeline.start()
+    if telegram_updates.enabled:
+        asyncio.ensure_future(start_telegram())  # startet auch registry.run() im Bot-Modul
+    else:
+        asyncio.ensure_future(registry.run())
+    if WEBHOOK_WARMUP:
+        asyncio.ensure_future(warm_up())
+
+
+@app.get("/healthz")
+async def healthz():
+    # antwortet sofort, auch während des Warm-ups
+    return {"status": "ok", "warm": warmup["done"] is not None}
+
+
+@app.on_event("shutdown")
+async def close_sessions():
+    if telegram_updates.module is not None:
+        await telegram_updates.close()  # schließt auch Pipeline und Digest des Bot-Moduls
+    elif not telegram_updates.enabled:
+        await pipeline.close()
+        await digest.close()
+    if broadcaster:
+        await broadcaster.close()
+    await helius.close()
+    if bot:
+        session = await bot.get_session()
+        await session.close()
+    store.close()
+    state.close()
+
+
+@app.get("/stats")
+async def stats(authorization: str = Header(None)):
+    if authorization != os.getenv("AUTH_HEADER"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return {
+        "mint_cache": mint_cache.stats(),
+        "metadata_batches": {"batches": metadata_loader.batches, "mints": metadata_loader.keys_loaded},
+        "queue": pipeline.stats() if pipeline else None,
+        "broadcast_queue": broadcaster.queue_depth if broadcaster else 0,
+        "preferences": matcher.stats(),
+        "windows": aggregator.stats(),
+        "helius": helius.stats(),
+        "credits": credits.usage(),
+        "digest": digest.stats() if digest else None,
+        "telegram": telegram_updates.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+IGNORED_RESPONSE = b'{"status":"ignored"}'
+OK_RESPONSE = b'{"ok":true}'
+
+
+@app.post("/telegram")
+async def telegram_webhook(request: Request):
+    # sofort bestätigen; die Handler laufen pro Chat geordnet im Hintergrund (updates.py)
+    if not telegram_updates.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not telegram_updates.authorized(request.headers.get("x-telegram-bot-api-secret-token")):
+        raise HTTPException(status_code=401, detail="Unauthorized")
     try:
-        meta = requests.post(
-            f"https://api.helius.xyz/v0/tokens/metadata?api-key={os.getenv('HELIUS_API_KEY')}",
-            json={"mintAccounts": [mint]}
-        ).json()[0]
-    except Exception as e:
-        logging.warning(f"Metadatenfehler: {e}")
-        return {"status": "meta fetch failed"}
-
-    if meta.get("updateAuthority") != PUMP_AUTH:
-        return {"status": "nicht Pump.fun"}
-
-    symbol = meta.get("symbol", mint[:6])
-    buyer = payload.get("feePayer", "Unbekannt")
-    fire = "🔥" * min(int(sol_sent), 5)
-
-    msg = (
-        f"🐋 *Whale Alert*\n"
-        f"Token: `{symbol}`\n"
-        f"Gekauft von: `{buyer}`\n"
-        f"Betrag: {sol_sent:.2f} SOL\n"
-        f"⏱️ Alter: {int(age)} Minuten\n"
-        f"{fire}"
-    )
+        update = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    if not isinstance(update, dict) or not isinstance(update.get("update_id"), int):
+        # ohne update_id keine Deduplizierung; Telegram schickt sie immer mit
+        raise HTTPException(status_code=400, detail="Invalid update")
+    telegram_updates.submit(update)
+    return Response(OK_RESPONSE, media_type="application/json")
 
-    TELEGRAM_USERS = load_telegram_users()
 
-    for uid in TELEGRAM_USERS:
-        try:
-            await bot.send_message(uid, msg, parse_mode="Markdown")
-        except Exception as e:
-            logging.warning(f"Fehler beim Senden an {uid}: {e}")
+@app.post("/pumpwhale")
+async def pump_webhook(request: Request):
+    # Roher Body statt payload: dict, damit FastAPI nicht jede Zustellung voll parst und validiert;
+    # Antworten als fertige Bytes ohne FastAPI-Serialisierung
+    if request.headers.get("authorization") != os.getenv("AUTH_HEADER"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
 
-    last_alert_time[mint] = now
-    return {"status": "sent"}
+    body = await request.body()
+    if not may_contain_candidates(body):
+        # kein BUY/SWAP/Create im ganzen Body: ohne JSON-Parsing verwerfen (gezählt pro Request)
+        FILTER_OUTCOMES.inc("ignored")
+        WEBHOOK_REQUESTS.inc("ignored")
+        return Response(IGNORED_RESPONSE, media_type="application/json")
+    try:
+        payloads = deliveries(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    if body.lstrip()[:1] == b"[":
+        statuses = [await handle_delivery(payload) for payload in payloads]
+        result = {"status": "batch", "results": statuses}
+    else:
+        statuses = [await handle_delivery(payloads[0])]
+        result = {"status": statuses[0]}
+    # ohne Deduplizierung nichts annehmen: 503, damit Helius die Zustellung wiederholt
+    status_code = 503 if STATE_UNAVAILABLE in statuses else 200
+    return Response(dumps(result), status_code=status_code, media_type="application/json")
+
+
+async def handle_delivery(payload: dict) -> str:
+    status = await (await get_pipeline()).accept_transaction(payload)
+    WEBHOOK_REQUESTS.inc(status)
+    return status
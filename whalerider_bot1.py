@@ -1,38 +1,59 @@
 import os
 import logging
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from aiogram import Bot, Dispatcher, types
 from aiogram.contrib.middlewares.logging import LoggingMiddleware
 from aiogram.types import ParseMode, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils import executor
+from aiogram.utils.exceptions import MessageNotModified
 from dotenv import load_dotenv
 import asyncio
 
+# .env laden, bevor die eigenen Module ihre Konfiguration lesen
 load_dotenv()
 
+from broadcast import api_server
+from burns import burns, BURN_ADDRESS
+from credits import attribute, credits, usage_text
+from digest import AlertDigest
+from helius import helius, REQUEST_ERRORS
+from holders import holders, HOLDER_MIN_AMOUNT
+import metrics
+from metrics import QUEUE_DEPTH
+from pipeline import Pipeline
+from preferences import WATCH_KINDS, apply_choice, settings_keyboard, settings_text
+from premium import premium
+import registry
+from shards import create_broadcaster
+from storage import store, user_sessions, verified_users, subscribers as whale_alert_subs
+from whales import matcher
+
 API_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
-TOKEN_MINT = os.getenv("SPL_TOKEN_ADDRESS")
-RPC_URL = os.getenv("RPC_URL")
-HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
 BOT_WALLET_ADDRESS = os.getenv("BOT_WALLET_ADDRESS")
-BURN_ADDRESS = "11111111111111111111111111111111"
+WHALE_SOURCE = os.getenv("WHALE_SOURCE", "poll")  # "poll" (/v0/tokens/recent) oder "webhook" (/pumpwhale)
+ADMIN_USER_IDS = {int(i) for i in os.getenv("ADMIN_USER_IDS", "").split(",") if i.strip().isdigit()}
 
-bot = Bot(token=API_TOKEN)
+bot = Bot(token=API_TOKEN, server=api_server())
 dp = Dispatcher(bot)
 dp.middleware.setup(LoggingMiddleware())
 logging.basicConfig(level=logging.INFO)
 
-user_sessions = {}
-premium_users = {}  # telegram_user_id -> expiry datetime
-whale_alert_subs = set()
-verified_users = {}  # telegram_user_id -> wallet_address
+# user_sessions, premium_users (telegram_user_id -> expiry datetime),
+# verified_users (telegram_user_id -> wallet_address) und whale_alert_subs liegen in storage.py
+broadcaster = create_broadcaster(bot, whale_alert_subs)
+QUEUE_DEPTH.set_function(lambda: broadcaster.queue_depth, "broadcast")
+digest = AlertDigest(lambda: broadcaster, parse_mode=ParseMode.MARKDOWN, name="alerts digest")
+pipeline = Pipeline(digest.deliver, name="alerts")
 
 async def ensure_verified(message: types.Message):
     user_id = message.from_user.id
     if user_id in verified_users:
         wallet = verified_users[user_id]
-        if check_token_holding(wallet):
+        holding = await check_token_holding(wallet)
+        if holding is None:
+            await message.reply(HELIUS_UNAVAILABLE)
+            return False
+        if holding:
             return True
         else:
             verified_users.pop(user_id, None)
@@ -42,49 +63,25 @@ async def ensure_verified(message: types.Message):
         await message.reply("Bitte starte mit /start, um deine Wallet zu verifizieren.")
         return False
 
-def check_token_holding(wallet_address: str, min_amount: int = 10_000) -> bool:
-    url = f"https://api.helius.xyz/v0/addresses/{wallet_address}/balances?api-key={HELIUS_API_KEY}"
-    resp = requests.get(url)
-    if resp.status_code != 200:
-        logging.warning("Token check failed for %s with status %s", wallet_address, resp.status_code)
-        return False
-    tokens = resp.json().get("tokens", [])
-    for token in tokens:
-        if token.get("mint") == TOKEN_MINT:
-            try:
-                raw_amount = int(token.get("amount", 0))
-                decimals = int(token.get("decimals", 0))
-                real_amount = raw_amount / (10 ** decimals)
-                logging.info("Wallet %s holds %.2f tokens", wallet_address, real_amount)
-                return real_amount >= min_amount
-            except Exception as e:
-                logging.error("Error parsing token amount: %s", e)
-    logging.info("No matching token found in wallet %s", wallet_address)
-    return False
-
-def check_burn_transaction(tx_hash: str, wallet_address: str) -> bool:
-    url = f"https://api.helius.xyz/v0/transactions/?api-key={HELIUS_API_KEY}"
-    response = requests.post(url, json={"transactions": [tx_hash]})
-    if response.status_code != 200:
-        logging.warning(f"Burn tx check failed for tx {tx_hash}")
-        return False
-    tx = response.json()[0]
-    for transfer in tx.get("tokenTransfers", []):
-        if (
-            transfer.get("mint") == TOKEN_MINT and
-            transfer.get("fromUserAccount") == wallet_address and
-            transfer.get("toUserAccount") == BURN_ADDRESS
-        ):
-            amount = int(transfer.get("tokenAmount", 0))
-            return amount >= 100000
-    return False
+HELIUS_UNAVAILABLE = "⚠️ Helius ist gerade nicht erreichbar, dein Bestand kann nicht geprüft werden. Bitte versuche es in ein paar Minuten erneut."
+
+async def check_token_holding(wallet_address: str, min_amount: float = HOLDER_MIN_AMOUNT):
+    # antwortet aus dem Holder-Cache, Helius wird nur bei unbekannten Wallets direkt gefragt;
+    # None, wenn der Bestand unbekannt ist (Helius-Ausfall) - dann weder Zugang entziehen noch verweigern
+    with attribute("holding"):
+        amount = await holders.balance(wallet_address)
+    return None if amount is None else amount >= min_amount
 
 @dp.message_handler(commands=['start', 'menu'])
 async def handle_start(message: types.Message):
     user_id = message.from_user.id
     if user_id in verified_users:
         wallet = verified_users[user_id]
-        if not check_token_holding(wallet):
+        holding = await check_token_holding(wallet)
+        if holding is None:
+            await message.reply(HELIUS_UNAVAILABLE)
+            return
+        if not holding:
             verified_users.pop(user_id, None)
             await message.reply("❌ Deine Wallet hält aktuell weniger als 10.000 Tokens. Bitte erneut /start nutzen, wenn du später wieder Zugang möchtest.")
             return
@@ -92,7 +89,8 @@ async def handle_start(message: types.Message):
         keyboard.add(
             InlineKeyboardButton("📊 Balance anzeigen", callback_data="balance"),
             InlineKeyboardButton("🔥 Premiumstatus", callback_data="premium_status"),
-            InlineKeyboardButton("🚨 Whale Alerts", callback_data="alerts_toggle")
+            InlineKeyboardButton("🚨 Whale Alerts", callback_data="alerts_toggle"),
+            InlineKeyboardButton("⚙️ Alert-Einstellungen", callback_data="prefs")
         )
         await message.reply(f"✅ Willkommen zurück! Deine Wallet `{wallet}` ist verifiziert.", parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
     else:
@@ -112,6 +110,13 @@ async def start_burn(message: types.Message):
     )
     user_sessions[message.from_user.id] = {"stage": "awaiting_burn_tx"}
 
+@dp.message_handler(commands=["credits"])
+async def credits_cmd(message: types.Message):
+    # Helius-Verbrauch pro Aufrufstelle, nur für ADMIN_USER_IDS
+    if message.from_user.id not in ADMIN_USER_IDS:
+        return
+    await message.reply(usage_text(credits))
+
 @dp.message_handler()
 async def handle_message(message: types.Message):
     user_id = message.from_user.id
@@ -122,7 +127,11 @@ async def handle_message(message: types.Message):
         if len(text) < 32 or len(text) > 44:
             await message.reply("❌ Ungültige Wallet-Adresse.")
             return
-        if not check_token_holding(text):
+        holding = await check_token_holding(text)
+        if holding is None:
+            await message.reply(HELIUS_UNAVAILABLE)
+            return
+        if not holding:
             await message.reply("❌ Deine Wallet hält nicht genug Tokens (min. 10.000).")
             return
         verified_users[user_id] = text
@@ -134,11 +143,26 @@ async def handle_message(message: types.Message):
         if not wallet:
             await message.reply("❌ Wallet nicht gefunden. Bitte mit /start erneut verifizieren.")
             return
-        if check_burn_transaction(text, wallet):
-            premium_users[user_id] = datetime.utcnow() + timedelta(days=7)
-            await message.reply("✅ Premium für 7 Tage aktiviert. Viel Spaß!")
+        # Prüfung läuft im Hintergrund (burns.py), das Ergebnis kommt als eigene Nachricht
+        result = burns.submit(text, user_id, wallet)
+        if result == "invalid":
+            await message.reply("❌ Das ist kein gültiger TX-Hash.")
+            return
+        if result == "duplicate":
+            await message.reply("❌ Diese Transaktion wurde bereits eingelöst.")
+        elif result == "pending":
+            await message.reply("⏳ Diese Transaktion wird bereits geprüft.")
+        else:
+            await message.reply("⏳ Transaktion erhalten. Sobald sie bestätigt ist, bekommst du eine Nachricht.")
+        user_sessions.pop(user_id, None)
+    elif session.get("stage") == "awaiting_watch":
+        if len(text) < 32 or len(text) > 44:
+            await message.reply("❌ Ungültige Adresse.")
+            return
+        if matcher.watch(user_id, session.get("kind", "mints"), text):
+            await message.reply(f"✅ `{text}` wird beobachtet. Einstellungen unter /menu.", parse_mode=ParseMode.MARKDOWN)
         else:
-            await message.reply("❌ Ungültige Transaktion. Stelle sicher, dass du 100k Tokens an die Burn-Adresse gesendet hast.")
+            await message.reply("❌ Deine Watchlist ist voll. Leere sie unter /menu.")
         user_sessions.pop(user_id, None)
     else:
         await message.reply("❓ Bitte nutze /start oder /menu.")
@@ -149,31 +173,60 @@ async def balance_cb(call: types.CallbackQuery):
     if not wallet:
         await call.message.answer("❌ Wallet nicht gefunden. Bitte erneut verifizieren.")
         return
-    url = f"https://api.helius.xyz/v0/addresses/{wallet}/balances?api-key={HELIUS_API_KEY}"
-    resp = requests.get(url)
-    if resp.status_code != 200:
+    with attribute("balance"):  # niedrigste Priorität, fällt bei knappem Credit-Budget zuerst weg
+        amount = await holders.balance(wallet)
+    if amount is None:
         await call.message.answer("Fehler beim Abrufen der Wallet-Daten.")
         return
-    tokens = resp.json().get("tokens", [])
-    for token in tokens:
-        if token.get("mint") == TOKEN_MINT:
-            raw_amount = int(token["amount"])
-            decimals = int(token.get("decimals", 0))
-            amount = raw_amount / (10 ** decimals)
-            await call.message.answer(f"📊 Deine Balance: {amount:.2f} Token")
-            return
+    if amount > 0:
+        await call.message.answer(f"📊 Deine Balance: {amount:.2f} Token")
+        return
     await call.message.answer("Keine Token gefunden.")
 
 @dp.callback_query_handler(lambda c: c.data == "premium_status")
 async def premium_cb(call: types.CallbackQuery):
     user_id = call.from_user.id
-    expiry = premium_users.get(user_id)
-    if expiry and expiry > datetime.utcnow():
+    expiry = premium.expires_at(user_id)
+    if expiry:
         remaining = expiry - datetime.utcnow()
         await call.message.answer(f"✅ Dein Premium ist aktiv für noch {remaining.days} Tage und {remaining.seconds//3600} Stunden.")
     else:
         await call.message.answer("🔓 Kein aktives Premium. Verwende /burn für Zugang.")
 
+@dp.callback_query_handler(lambda c: c.data == "prefs")
+async def prefs_cb(call: types.CallbackQuery):
+    user_id = call.from_user.id
+    if user_id not in verified_users:
+        await call.message.answer("❌ Wallet nicht gefunden.")
+        return
+    await call.message.answer(
+        settings_text(matcher, user_id), parse_mode=ParseMode.MARKDOWN, reply_markup=settings_keyboard(matcher, user_id)
+    )
+
+@dp.callback_query_handler(lambda c: c.data.startswith("prefs_"))
+async def prefs_change_cb(call: types.CallbackQuery):
+    user_id = call.from_user.id
+    if user_id not in verified_users:
+        await call.answer("❌ Wallet nicht gefunden.")
+        return
+    if call.data.startswith("prefs_watch:"):
+        kind = call.data.split(":", 1)[1]
+        if kind not in WATCH_KINDS:
+            await call.answer("❌ Unbekannte Auswahl.")
+            return
+        user_sessions[user_id] = {"stage": "awaiting_watch", "kind": kind}
+        await call.message.answer("Sende die Mint-Adresse:" if kind == "mints" else "Sende die Wallet-Adresse:")
+        await call.answer()
+        return
+    apply_choice(matcher, user_id, call.data)
+    try:
+        await call.message.edit_text(
+            settings_text(matcher, user_id), parse_mode=ParseMode.MARKDOWN, reply_markup=settings_keyboard(matcher, user_id)
+        )
+    except MessageNotModified:
+        pass
+    await call.answer("✅ Gespeichert")
+
 @dp.callback_query_handler(lambda c: c.data == "alerts_toggle")
 async def toggle_alerts_cb(call: types.CallbackQuery):
     user_id = call.from_user.id
@@ -185,41 +238,57 @@ async def toggle_alerts_cb(call: types.CallbackQuery):
         await call.message.answer("✅ Whale Alerts aktiviert. Du wirst benachrichtigt, wenn große Käufe stattfinden.")
 
 async def whale_alert_job():
-    seen = set()
+    # /v0/tokens/recent pollen; Filter, Anreicherung und Versand macht die gemeinsame Pipeline
     while True:
         try:
-            url = f"https://api.helius.xyz/v0/tokens/recent?api-key={HELIUS_API_KEY}"
-            resp = requests.get(url)
-            if resp.status_code != 200:
-                logging.warning("Failed to fetch recent tokens")
+            try:
+                with attribute("poller"):
+                    tokens = await helius.recent_tokens()
+            except REQUEST_ERRORS as e:
+                logging.warning("Failed to fetch recent tokens: %s", e)
                 await asyncio.sleep(60)
                 continue
-            tokens = resp.json()
-            now = datetime.utcnow()
             for token in tokens:
-                created = datetime.fromisoformat(token.get("createdAt", "").replace("Z", ""))
-                if now - created > timedelta(hours=1):
-                    continue
-                mint = token.get("mint")
-                symbol = token.get("symbol", "N/A")
-                volume = token.get("whaleVolume", 0)
-                if volume >= 1:  # Lowered from 10 to 1
-                    emoji_count = min(int(volume), 5)
-                    fire = '🔥' * emoji_count
-                    msg = f"""🐋 Whale Alert
-Token: `{symbol}`
-Volume: {volume:.2f} SOL
-{fire}"""
-                    for uid in whale_alert_subs:
-                        try:
-                            await bot.send_message(uid, msg, parse_mode=ParseMode.MARKDOWN)
-                        except Exception as e:
-                            logging.error(f"Send error to {uid}: {e}")
+                await pipeline.accept_token(token)
         except Exception as e:
             logging.error(f"Whale job error: {e}")
         await asyncio.sleep(300)
 
+async def revoke_holder(user_id, wallet):
+    verified_users.pop(user_id, None)
+    try:
+        await bot.send_message(user_id, "❌ Deine Wallet hält aktuell weniger als 10.000 Tokens. Bitte erneut /start nutzen, wenn du später wieder Zugang möchtest.")
+    except Exception as e:
+        logging.warning(f"Revoke notice to {user_id} failed: {e}")
+
+async def notify_user(user_id, text):
+    try:
+        await bot.send_message(user_id, text)
+    except Exception as e:
+        logging.warning(f"Notice to {user_id} failed: {e}")
+
+async def on_shutdown(dp):
+    await pipeline.close()
+    await digest.close()
+    await broadcaster.close()
+    await helius.close()
+    store.close()
+
+def start_background(loop=None, sources: bool = True):
+    # Hintergrund-Tasks; beim Polling hier, im Webhook-Modus startet sie updates.py in der Loop von uvicorn.
+    # sources=False: keine eigene Whale-Quelle, der Webhook speist die Pipeline dieses Moduls
+    loop = loop or asyncio.get_event_loop()
+    loop.create_task(holders.run(verified_users, revoke_holder))
+    loop.create_task(burns.run(notify_user))
+    loop.create_task(premium.run(notify_user))
+    loop.create_task(registry.run())
+    if sources and WHALE_SOURCE != "webhook":
+        loop.create_task(whale_alert_job())
+
 if __name__ == "__main__":
+    # Polling für die lokale Entwicklung; produktiv mit TELEGRAM_BOT=whalerider_bot1 über uvicorn webhook:app
     loop = asyncio.get_event_loop()
-    loop.create_task(whale_alert_job())
-    executor.start_polling(dp, skip_updates=True)
+    if metrics.METRICS_PORT:
+        loop.create_task(metrics.start_server())
+    start_background(loop)
+    executor.start_polling(dp, skip_updates=True, on_shutdown=on_shutdown)
@@ -0,0 +1,212 @@
+import logging
+import os
+from collections import namedtuple
+import time
+from datetime import datetime, timezone
+
+from mint_cache import get_mint_timestamp, get_mint_metadata, MintLookupError
+from metrics import FILTER_OUTCOMES
+from preferences import SubscriptionMatcher
+from premium import premium
+from state import state
+from storage import alert_preferences, subscribers
+from windows import aggregator, WindowSignal
+
+# Stufen der Whale-Erkennung (Filter, Anreicherung, Routing, Text); die Reihenfolge und
+# Nebenläufigkeit steuert pipeline.py, gemeinsam für Webhook, Stream und beide Bots
+
+RATE_LIMIT_SECONDS = 30  # mindestens 30 Sekunden Pause zwischen Alerts pro Token
+WINDOW_COOLDOWN_SECONDS = 300  # Fenster-Alerts pro Mint bzw. Käufer, über alle Worker
+MIN_SOL = float(os.getenv("WHALE_MIN_SOL", 10))
+MAX_AGE_MINUTES = float(os.getenv("WHALE_MAX_AGE_MINUTES", 60))
+
+# Standardschwellen gelten für alle ohne eigene Einstellungen; die globalen Filter
+# verwenden die lockersten Schwellen aller Abonnenten (matcher.min_sol / matcher.max_age)
+matcher = SubscriptionMatcher(subscribers, alert_preferences, premium, MIN_SOL, MAX_AGE_MINUTES)
+
+WhaleAlert = namedtuple("WhaleAlert", "text recipients mint buyer sol age_minutes symbol", defaults=(None,))
+
+# Einheitlicher Kandidat aus allen Quellen (Webhook, Stream, Wallet-Polling, /tokens/recent).
+# created/symbol sind gesetzt, wenn die Quelle sie schon kennt; dann entfallen die Helius-Lookups.
+Candidate = namedtuple("Candidate", "signature mint buyer sol ts created symbol", defaults=(None, None, None))
+
+
+def candidate(tx: dict):
+    # Enhanced Transaction -> (status, Candidate); status None = Kauf mit Mint
+    tx_type = tx.get("type")
+    if tx_type not in ("BUY", "SWAP"):
+        return "ignored", None
+
+    token_transfers = tx.get("tokenTransfers", [])
+    if not token_transfers:
+        return "no token transfers", None
+
+    mint = token_transfers[0].get("mint")
+    if not mint:
+        return "no mint", None
+
+    native_transfers = tx.get("nativeTransfers", [])
+    sol_sent = sum(t.get("amount", 0) for t in native_transfers) / 1e9
+    return None, Candidate(tx.get("signature"), mint, tx.get("feePayer"), sol_sent, tx.get("timestamp"))
+
+
+def token_candidate(token: dict):
+    # Eintrag aus /v0/tokens/recent -> (status, Candidate); whaleVolume ist das Volumen in SOL
+    mint = token.get("mint")
+    if not mint:
+        return "no mint", None
+    try:
+        created = datetime.fromisoformat(token.get("createdAt", "").replace("Z", "+00:00"))
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+    except ValueError:
+        created = None  # Alter dann über die Mint-Historie
+    return None, Candidate(None, mint, None, float(token.get("whaleVolume") or 0), None, created, token.get("symbol"))
+
+
+def threshold(c: Candidate):
+    # Volumen gegen die lockerste Schwelle aller Abonnenten; None = weiter
+    min_sol = matcher.min_sol
+    if c.sol < min_sol:
+        return f"unter {min_sol:g} SOL"
+    return None
+
+
+def prefilter(tx: dict):
+    # Günstige Prüfungen ohne Upstream-Aufrufe. Liefert (status, mint, sol); status None = Kandidat
+    status, c = candidate(tx)
+    if status:
+        return status, None, 0.0
+    return threshold(c), c.mint, c.sol
+
+
+def observe(c: Candidate) -> list:
+    # jeder einzelne Kauf geht in die rollenden Fenster, auch unter der Einzelschwelle;
+    # /tokens/recent liefert nur Summen und bleibt draußen
+    if not c.signature:
+        return []
+    return aggregator.add(c.mint, c.buyer, c.sol, c.ts or time.time())
+
+
+async def _token_checks(mint: str, now: datetime, created: datetime = None):
+    # Alter und Pump.fun-Herkunft; liefert (status, alter_in_minuten, metadaten), status None = ok
+    if created is None:
+        try:
+            created = await get_mint_timestamp(mint)
+        except MintLookupError as e:
+            logging.warning(f"Mint-Zeit konnte nicht ermittelt werden: {e}")
+            return "helius unavailable" if e.unavailable else "mint lookup failed", None, None
+
+    age = (now - created).total_seconds() / 60
+    if age > matcher.max_age:
+        return "Token zu alt", age, None
+
+    # Metadaten holen
+    try:
+        meta = await get_mint_metadata(mint)
+    except MintLookupError as e:
+        logging.warning(f"Metadatenfehler: {e}")
+        return "helius unavailable" if e.unavailable else "meta fetch failed", age, None
+
+    if not meta["pump"]:
+        return "nicht Pump.fun", age, meta
+    return None, age, meta
+
+
+async def evaluate(c: Candidate, now: datetime = None):
+    # Liefert (status, alert); alert (WhaleAlert mit Text und Empfängern) nur bei status "sent"
+    status, alert = await _evaluate(c, now)
+    FILTER_OUTCOMES.inc(status)
+    return status, alert
+
+
+async def evaluate_transaction(tx: dict, now: datetime = None):
+    # alle Stufen für eine Enhanced Transaction am Stück (Replay, Benchmarks)
+    status, c = candidate(tx)
+    if not status:
+        status = threshold(c)
+    if status:
+        FILTER_OUTCOMES.inc(status)
+        return status, None
+    return await evaluate(c, now)
+
+
+async def _evaluate(c: Candidate, now: datetime = None):
+    # Ratenbegrenzung (erst nur lesen, gesetzt wird sie atomar vor dem Versand)
+    now = now or datetime.now(timezone.utc)
+    cooldown_key = f"cooldown:{c.mint}"
+    if await state.active(cooldown_key):
+        return "rate limited", None
+
+    status, age, meta = await _token_checks(c.mint, now, c.created)
+    if status:
+        return status, None
+
+    recipients = matcher.match(c.mint, c.buyer, c.sol, age)
+    if not recipients:
+        return "keine Empfänger", None
+
+    symbol = c.symbol or meta["symbol"]
+    fire = "🔥" * min(int(c.sol), 5)
+    buyer = f"Gekauft von: `{c.buyer}`\n" if c.buyer else ""  # /tokens/recent kennt keinen Käufer
+
+    msg = (
+        f"🐋 *Whale Alert*\n"
+        f"Token: `{symbol}`\n"
+        f"{buyer}"
+        f"Betrag: {c.sol:.2f} SOL\n"
+        f"⏱️ Alter: {int(age)} Minuten\n"
+        f"{fire}"
+    )
+
+    # ein anderer Worker kann den Mint inzwischen gemeldet haben
+    if not await state.acquire(cooldown_key, RATE_LIMIT_SECONDS):
+        return "rate limited", None
+    return "sent", WhaleAlert(msg, recipients, c.mint, c.buyer, c.sol, age, symbol)
+
+
+async def evaluate_window(signal: WindowSignal, now: datetime = None):
+    # Fenster-Alert (Kaufwelle auf einem Mint oder gesplittete Käufe eines Käufers)
+    status, alert = await _evaluate_window(signal, now)
+    FILTER_OUTCOMES.inc(f"{signal.kind}-window {status}")
+    return status, alert
+
+
+async def _evaluate_window(signal: WindowSignal, now: datetime = None):
+    now = now or datetime.now(timezone.utc)
+    cooldown_key = f"window:{signal.kind}:{signal.mint}:{signal.buyer or ''}"
+    if await state.active(cooldown_key):
+        return "rate limited", None
+
+    status, age, meta = await _token_checks(signal.mint, now)
+    if status:
+        return status, None
+
+    recipients = matcher.match(signal.mint, signal.buyer, signal.volume_5m, age)
+    if not recipients:
+        return "keine Empfänger", None
+
+    symbol = meta["symbol"]
+    fire = "🔥" * min(int(signal.volume_5m // 10), 5)
+    if signal.kind == "buyer":
+        msg = (
+            f"🐋 *Whale Alert (gesplittet)*\n"
+            f"Token: `{symbol}`\n"
+            f"Gekauft von: `{signal.buyer}`\n"
+            f"5 Min: {signal.volume_5m:.2f} SOL in {signal.buys} Käufen\n"
+            f"⏱️ Alter: {int(age)} Minuten\n"
+            f"{fire}"
+        )
+    else:
+        msg = (
+            f"🌊 *Kaufwelle*\n"
+            f"Token: `{symbol}`\n"
+            f"1 Min: {signal.volume_1m:.2f} SOL\n"
+            f"5 Min: {signal.volume_5m:.2f} SOL in {signal.buys} Käufen von {signal.buyers} Wallets\n"
+            f"⏱️ Alter: {int(age)} Minuten\n"
+            f"{fire}"
+        )
+
+    if not await state.acquire(cooldown_key, WINDOW_COOLDOWN_SECONDS):
+        return "rate limited", None
+    return "sent", WhaleAlert(msg, recipients, signal.mint, signal.buyer, signal.volume_5m, age, symbol)
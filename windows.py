@@ -0,0 +1,171 @@
+import os
+from array import array
+from collections import OrderedDict, namedtuple
+
+from metrics import CACHE_STATS
+
+# Rollende Fenster pro Mint und pro (Mint, Käufer) für gesplittete Whale-Käufe und Kaufwellen.
+# Jedes Fenster ist ein Ringpuffer aus WINDOW_BUCKET_SECONDS-Buckets über WINDOW_SPAN_SECONDS;
+# kalte Mints fallen nach Ablauf des Fensters heraus, die Anzahl aktiver Fenster ist begrenzt.
+
+WINDOW_BUCKET_SECONDS = 10
+WINDOW_SPAN_SECONDS = 300
+WINDOW_BUCKETS = WINDOW_SPAN_SECONDS // WINDOW_BUCKET_SECONDS
+WINDOW_MAX_MINTS = int(os.getenv("WINDOW_MAX_MINTS", 5000))
+WINDOW_MAX_BUYERS = int(os.getenv("WINDOW_MAX_BUYERS", 20000))
+WINDOW_MAX_BUYERS_PER_MINT = 256
+
+WINDOW_MINT_SOL_1M = float(os.getenv("WINDOW_MINT_SOL_1M", 50))
+WINDOW_MINT_SOL_5M = float(os.getenv("WINDOW_MINT_SOL_5M", 150))
+WINDOW_MINT_MIN_BUYERS = int(os.getenv("WINDOW_MINT_MIN_BUYERS", 3))
+WINDOW_BUYER_SOL_5M = float(os.getenv("WINDOW_BUYER_SOL_5M", 20))
+WINDOW_REARM_SECONDS = 300  # ein Fenster meldet höchstens einmal pro Zeitraum
+
+WindowSignal = namedtuple("WindowSignal", "kind mint buyer volume_1m volume_5m buys buyers ts")
+
+
+class RollingWindow:
+    __slots__ = ("volume", "count", "volume_sum", "count_sum", "slot", "last_ts", "buyers", "fired_at")
+
+    def __init__(self, track_buyers: bool = False):
+        self.volume = array("d", bytes(8 * WINDOW_BUCKETS))
+        self.count = array("I", bytes(4 * WINDOW_BUCKETS))
+        self.volume_sum = 0.0  # laufende Summen über das ganze Fenster
+        self.count_sum = 0
+        self.slot = None  # Slot des neuesten Buckets
+        self.last_ts = 0.0
+        self.buyers = {} if track_buyers else None  # käufer -> letzter Kauf, älteste zuerst
+        self.fired_at = None
+
+    def _advance(self, slot: int):
+        if self.slot is None:
+            self.slot = slot
+            return
+        if slot <= self.slot:
+            return
+        for i in range(1, min(slot - self.slot, WINDOW_BUCKETS) + 1):
+            idx = (self.slot + i) % WINDOW_BUCKETS
+            if self.count[idx]:
+                self.volume_sum -= self.volume[idx]
+                self.count_sum -= self.count[idx]
+                self.volume[idx] = 0.0
+                self.count[idx] = 0
+        if not self.count_sum:
+            self.volume_sum = 0.0  # Rundungsfehler nicht mitschleppen
+        self.slot = slot
+
+    def add(self, ts: float, sol: float, buyer: str = None):
+        slot = int(ts // WINDOW_BUCKET_SECONDS)
+        self._advance(slot)
+        if self.slot - slot >= WINDOW_BUCKETS:
+            return  # älter als das Fenster
+        idx = slot % WINDOW_BUCKETS
+        self.volume[idx] += sol
+        self.count[idx] += 1
+        self.volume_sum += sol
+        self.count_sum += 1
+        self.last_ts = max(self.last_ts, ts)
+        if self.buyers is not None and buyer:
+            self.buyers.pop(buyer, None)
+            self.buyers[buyer] = ts
+            if len(self.buyers) > WINDOW_MAX_BUYERS_PER_MINT:
+                del self.buyers[next(iter(self.buyers))]
+
+    def totals(self, now: float, seconds: float) -> tuple:
+        # (SOL-Volumen, Anzahl Käufe) der letzten `seconds` Sekunden
+        self._advance(int(now // WINDOW_BUCKET_SECONDS))
+        buckets = -(-int(seconds) // WINDOW_BUCKET_SECONDS)
+        if buckets >= WINDOW_BUCKETS:
+            return self.volume_sum, self.count_sum
+        volume, count = 0.0, 0
+        for i in range(buckets):
+            idx = (self.slot - i) % WINDOW_BUCKETS
+            volume += self.volume[idx]
+            count += self.count[idx]
+        return volume, count
+
+    def unique_buyers(self, now: float, seconds: float) -> int:
+        cutoff = now - WINDOW_SPAN_SECONDS
+        while self.buyers and next(iter(self.buyers.values())) < cutoff:
+            del self.buyers[next(iter(self.buyers))]
+        since = now - seconds
+        return sum(1 for ts in self.buyers.values() if ts >= since)
+
+    def rearm(self, now: float) -> bool:
+        if self.fired_at is not None and now - self.fired_at < WINDOW_REARM_SECONDS:
+            return False
+        self.fired_at = now
+        return True
+
+
+class WindowAggregator:
+    def __init__(self, max_mints: int = None, max_buyers: int = None):
+        self.max_mints = max_mints or WINDOW_MAX_MINTS
+        self.max_buyers = max_buyers or WINDOW_MAX_BUYERS
+        self.mints = OrderedDict()  # mint -> RollingWindow, zuletzt aktiv am Ende
+        self.buyers = OrderedDict()  # (mint, käufer) -> RollingWindow
+        self.evictions = 0
+        self.signals = 0
+
+    def _window(self, table: OrderedDict, key, limit: int, track_buyers: bool) -> RollingWindow:
+        window = table.get(key)
+        if window is None:
+            window = table[key] = RollingWindow(track_buyers)
+            if len(table) > limit:
+                table.popitem(last=False)
+                self.evictions += 1
+        else:
+            table.move_to_end(key)
+        return window
+
+    def _evict_cold(self, table: OrderedDict, now: float):
+        cutoff = now - WINDOW_SPAN_SECONDS
+        while table:
+            window = next(iter(table.values()))
+            if window.last_ts >= cutoff:
+                break
+            table.popitem(last=False)
+            self.evictions += 1
+
+    def add(self, mint: str, buyer: str, sol: float, ts: float) -> list:
+        # zählt einen Kauf und liefert die dadurch ausgelösten WindowSignals
+        self._evict_cold(self.mints, ts)
+        self._evict_cold(self.buyers, ts)
+        signals = []
+
+        window = self._window(self.mints, mint, self.max_mints, track_buyers=True)
+        window.add(ts, sol, buyer)
+        volume_1m, _ = window.totals(ts, 60)
+        volume_5m, buys = window.totals(ts, WINDOW_SPAN_SECONDS)
+        unique = window.unique_buyers(ts, WINDOW_SPAN_SECONDS)
+        if (
+            (volume_1m >= WINDOW_MINT_SOL_1M or volume_5m >= WINDOW_MINT_SOL_5M)
+            and unique >= WINDOW_MINT_MIN_BUYERS
+            and window.rearm(ts)
+        ):
+            signals.append(WindowSignal("mint", mint, None, volume_1m, volume_5m, buys, unique, ts))
+
+        if buyer:
+            window = self._window(self.buyers, (mint, buyer), self.max_buyers, track_buyers=False)
+            window.add(ts, sol)
+            volume_1m, _ = window.totals(ts, 60)
+            volume_5m, buys = window.totals(ts, WINDOW_SPAN_SECONDS)
+            # gesplittete Käufe: erst ab dem zweiten Kauf, ein einzelner großer Kauf ist ein normaler Alert
+            if volume_5m >= WINDOW_BUYER_SOL_5M and buys >= 2 and window.rearm(ts):
+                signals.append(WindowSignal("buyer", mint, buyer, volume_1m, volume_5m, buys, 1, ts))
+
+        self.signals += len(signals)
+        return signals
+
+    def stats(self) -> dict:
+        return {
+            "mints": len(self.mints),
+            "buyers": len(self.buyers),
+            "evictions": self.evictions,
+            "signals": self.signals,
+        }
+
+
+aggregator = WindowAggregator()
+for _stat in ("mints", "buyers", "evictions", "signals"):
+    CACHE_STATS.set_function(lambda stat=_stat: aggregator.stats()[stat], "windows", _stat)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+# Begrenzte In-Process-Warteschlange mit Worker-Pool.
+# Bei Überlauf: "drop_oldest" verwirft den ältesten Eintrag,
+# "shed" lehnt neue Einträge unter shed_threshold ab und verdrängt sonst den ältesten.
+
+DROP_OLDEST = "drop_oldest"
+SHED = "shed"
+
+
+class WorkQueue:
+    def __init__(self, handler, maxsize: int, workers: int, policy: str = DROP_OLDEST,
+                 shed_threshold: float = 0, name: str = "queue", on_drop=None):
+        self.handler = handler  # async handler(item)
+        self.on_drop = on_drop  # on_drop(item) für verdrängte Einträge
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.shed_threshold = shed_threshold
+        self.name = name
+        self._items = deque()  # (enqueued_at, item)
+        self._wakeup = None
+        self._tasks = []
+        self._busy = 0
+        self.accepted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.shed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.ensure_future(self._worker()))
+
+    def submit(self, item, weight: float = None) -> bool:
+        # weight: z.B. SOL-Betrag, entscheidet bei policy "shed"; False wenn abgelehnt
+        self.start()
+        if len(self._items) >= self.maxsize:
+            if self.policy == SHED and weight is not None and weight < self.shed_threshold:
+                self.shed += 1
+                return False
+            _, dropped = self._items.popleft()
+            self.dropped += 1
+            logging.warning(f"{self.name} voll, ältester Eintrag verworfen")
+            if self.on_drop:
+                self.on_drop(dropped)
+        self._items.append((time.monotonic(), item))
+        self.accepted += 1
+        self._wakeup.set()
+        return True
+
+    async def _worker(self):
+        while True:
+            if not self._items:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            enqueued_at, item = self._items.popleft()
+            self.last_lag = time.monotonic() - enqueued_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self._busy += 1
+            try:
+                await self.handler(item)
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"{self.name} Fehler bei der Verarbeitung: {e}")
+            finally:
+                self._busy -= 1
+                self.processed += 1
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    @property
+    def oldest_age(self) -> float:
+        return time.monotonic() - self._items[0][0] if self._items else 0.0
+
+    async def join(self):
+        while self._items or self._busy:
+            await asyncio.sleep(0.01)
+
+    async def close(self, timeout: float = 10):
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self.name} beim Beenden abgebrochen, {self.depth} Einträge offen")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "busy": self._busy,
+            "accepted": self.accepted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "shed": self.shed,
+            "oldest_age": self.oldest_age,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }